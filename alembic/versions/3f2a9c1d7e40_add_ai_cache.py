@@ -0,0 +1,35 @@
+"""add ai_cache table
+
+Revision ID: 3f2a9c1d7e40
+Revises: b693b67d3b9a
+Create Date: 2026-10-16 00:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "3f2a9c1d7e40"
+down_revision: Union[str, Sequence[str], None] = "b693b67d3b9a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ai_cache",
+        sa.Column("key", sa.String(length=64), nullable=False),
+        sa.Column("model", sa.String(length=100), nullable=False),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+    op.create_index(op.f("ix_ai_cache_expires_at"), "ai_cache", ["expires_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_ai_cache_expires_at"), table_name="ai_cache")
+    op.drop_table("ai_cache")
@@ -0,0 +1,50 @@
+"""add ai_jobs table
+
+Revision ID: 8d41b7e2c5a9
+Revises: 3f2a9c1d7e40
+Create Date: 2026-10-16 00:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "8d41b7e2c5a9"
+down_revision: Union[str, Sequence[str], None] = "3f2a9c1d7e40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ai_jobs",
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("owner_id", sa.String(length=36), nullable=False),
+        sa.Column("screenplay_id", sa.String(length=36), nullable=True),
+        sa.Column("kind", sa.String(length=32), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("priority", sa.Integer(), nullable=False),
+        sa.Column("payload", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("result", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("ia_log", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("error", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["owner_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["screenplay_id"], ["screenplays.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_ai_jobs_owner_id"), "ai_jobs", ["owner_id"], unique=False)
+    op.create_index(op.f("ix_ai_jobs_screenplay_id"), "ai_jobs", ["screenplay_id"], unique=False)
+    op.create_index(op.f("ix_ai_jobs_status"), "ai_jobs", ["status"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_ai_jobs_status"), table_name="ai_jobs")
+    op.drop_index(op.f("ix_ai_jobs_screenplay_id"), table_name="ai_jobs")
+    op.drop_index(op.f("ix_ai_jobs_owner_id"), table_name="ai_jobs")
+    op.drop_table("ai_jobs")
@@ -0,0 +1,138 @@
+"""move screenplay collections to child tables
+
+Revision ID: a7d3e9f1c2b4
+Revises: f3c8a2d6b1e7
+Create Date: 2026-10-16 00:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "a7d3e9f1c2b4"
+down_revision: Union[str, Sequence[str], None] = "f3c8a2d6b1e7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Igual que app.db.models.ITEM_ID_LENGTH en esta revisión
+ITEM_ID_LENGTH = 100
+
+# columna JSONB -> (tabla, [(campo, tipo SQL, valor si falta en el JSON)])
+COLLECTIONS = {
+    "characters": (
+        "screenplay_characters",
+        [
+            ("name", "text", "''"),
+            ("bio", "text", None),
+            ("goal", "text", None),
+            ("conflict", "text", None),
+            ("arc", "text", None),
+        ],
+    ),
+    "subplots": (
+        "screenplay_subplots",
+        [("logline", "text", "''"), ("relevance", "text", None)],
+    ),
+    "locations": (
+        "screenplay_locations",
+        [("name", "text", "''"), ("details", "text", None)],
+    ),
+    "scenes": (
+        "screenplay_scenes",
+        [
+            ("header", "text", "''"),
+            ("content", "text", "''"),
+            ("order", "integer", "e.position"),
+        ],
+    ),
+}
+
+
+def _columns(fields) -> list[sa.Column]:
+    types = {"text": sa.Text, "integer": sa.Integer}
+    return [
+        sa.Column(name, types[sql_type](), nullable=default is None)
+        for name, sql_type, default in fields
+    ]
+
+
+def upgrade() -> None:
+    for column, (table, fields) in COLLECTIONS.items():
+        op.create_table(
+            table,
+            sa.Column("screenplay_id", sa.String(length=36), nullable=False),
+            sa.Column("id", sa.String(length=100), nullable=False),
+            sa.Column("position", sa.Integer(), nullable=False),
+            *_columns(fields),
+            sa.ForeignKeyConstraint(["screenplay_id"], ["screenplays.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("screenplay_id", "id"),
+        )
+
+        # Backfill desde el array JSONB, conservando su orden. El JSON no
+        # garantizaba ids únicos ni cortos: un id repetido en el mismo guion
+        # (salvo su primera aparición), vacío o de más de ITEM_ID_LENGTH
+        # caracteres se renombra a "<inicio del id>-<posición>", sin perder el
+        # elemento. Si aun así chocara con otro id, la clave primaria hace
+        # fallar la migración en vez de descartar filas en silencio.
+        names = ", ".join(f'"{name}"' for name, _, _ in fields)
+        values = ", ".join(
+            f"COALESCE((e.value->>'{name}')::{sql_type}, {default})"
+            if default is not None
+            else f"(e.value->>'{name}')::{sql_type}"
+            for name, sql_type, default in fields
+        )
+        op.execute(
+            f"""
+            WITH items AS (
+                SELECT s.id AS screenplay_id, e.value, e.position,
+                       COALESCE(NULLIF(e.value->>'id', ''), e.position::text) AS item_id
+                FROM screenplays s
+                CROSS JOIN LATERAL jsonb_array_elements(
+                    CASE WHEN jsonb_typeof(s.{column}) = 'array' THEN s.{column} ELSE '[]'::jsonb END
+                ) WITH ORDINALITY AS e(value, position)
+            ), ranked AS (
+                SELECT items.*, row_number() OVER (
+                    PARTITION BY screenplay_id, item_id ORDER BY position
+                ) AS seen
+                FROM items
+            )
+            INSERT INTO {table} (screenplay_id, id, position, {names})
+            SELECT e.screenplay_id,
+                   CASE WHEN e.seen = 1 AND length(e.item_id) <= {ITEM_ID_LENGTH}
+                        THEN e.item_id
+                        ELSE LEFT(e.item_id, {ITEM_ID_LENGTH - 20}) || '-' || e.position::text
+                   END,
+                   e.position - 1, {values}
+            FROM ranked e
+            ORDER BY e.screenplay_id, e.position
+            """
+        )
+        op.drop_column("screenplays", column)
+
+
+def downgrade() -> None:
+    for column, (table, fields) in COLLECTIONS.items():
+        op.add_column(
+            "screenplays",
+            sa.Column(
+                column,
+                postgresql.JSONB(astext_type=sa.Text()),
+                server_default=sa.text("'[]'::jsonb"),
+                nullable=False,
+            ),
+        )
+        pairs = ", ".join(f"'{name}', i.\"{name}\"" for name, _, _ in fields)
+        op.execute(
+            f"""
+            UPDATE screenplays s SET {column} = COALESCE(
+                (SELECT jsonb_agg(jsonb_build_object('id', i.id, {pairs}) ORDER BY i.position)
+                 FROM {table} i WHERE i.screenplay_id = s.id),
+                '[]'::jsonb
+            )
+            """
+        )
+        op.alter_column("screenplays", column, server_default=None)
+        op.drop_table(table)
@@ -0,0 +1,54 @@
+"""add ai_logs table
+
+Revision ID: c4e81f0a9b23
+Revises: 8d41b7e2c5a9
+Create Date: 2026-10-16 00:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "c4e81f0a9b23"
+down_revision: Union[str, Sequence[str], None] = "8d41b7e2c5a9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ai_logs",
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("route", sa.String(length=64), nullable=False),
+        sa.Column("model", sa.String(length=100), nullable=False),
+        sa.Column("owner_id", sa.String(length=36), nullable=True),
+        sa.Column("screenplay_id", sa.String(length=36), nullable=True),
+        sa.Column("cache_status", sa.String(length=16), nullable=True),
+        sa.Column("shared", sa.Boolean(), nullable=False),
+        sa.Column("latency", sa.Float(), nullable=False),
+        sa.Column("queue_wait", sa.Float(), nullable=True),
+        sa.Column("cache_wait", sa.Float(), nullable=True),
+        sa.Column("time_to_first_token", sa.Float(), nullable=True),
+        sa.Column("load_duration", sa.Float(), nullable=True),
+        sa.Column("prompt_eval_duration", sa.Float(), nullable=True),
+        sa.Column("eval_duration", sa.Float(), nullable=True),
+        sa.Column("prompt_eval_count", sa.Integer(), nullable=True),
+        sa.Column("eval_count", sa.Integer(), nullable=True),
+        sa.Column("tokens_per_second", sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_ai_logs_created_at"), "ai_logs", ["created_at"], unique=False)
+    op.create_index(op.f("ix_ai_logs_route"), "ai_logs", ["route"], unique=False)
+    op.create_index(op.f("ix_ai_logs_model"), "ai_logs", ["model"], unique=False)
+    op.create_index(op.f("ix_ai_logs_owner_id"), "ai_logs", ["owner_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_ai_logs_owner_id"), table_name="ai_logs")
+    op.drop_index(op.f("ix_ai_logs_model"), table_name="ai_logs")
+    op.drop_index(op.f("ix_ai_logs_route"), table_name="ai_logs")
+    op.drop_index(op.f("ix_ai_logs_created_at"), table_name="ai_logs")
+    op.drop_table("ai_logs")
@@ -0,0 +1,25 @@
+"""add prompt_eval_saved to ai_logs
+
+Revision ID: e2b7d4a1c9f6
+Revises: c4e81f0a9b23
+Create Date: 2026-10-16 00:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "e2b7d4a1c9f6"
+down_revision: Union[str, Sequence[str], None] = "c4e81f0a9b23"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("ai_logs", sa.Column("prompt_eval_saved", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("ai_logs", "prompt_eval_saved")
@@ -0,0 +1,50 @@
+"""add search_items table
+
+Revision ID: f3c8a2d6b1e7
+Revises: e2b7d4a1c9f6
+Create Date: 2026-10-16 00:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "f3c8a2d6b1e7"
+down_revision: Union[str, Sequence[str], None] = "e2b7d4a1c9f6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "search_items",
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("owner_id", sa.String(length=36), nullable=False),
+        sa.Column("screenplay_id", sa.String(length=36), nullable=False),
+        sa.Column("kind", sa.String(length=16), nullable=False),
+        sa.Column("item_id", sa.String(length=100), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("label", sa.String(length=300), nullable=False),
+        sa.Column("snippet", sa.Text(), nullable=False),
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("model", sa.String(length=100), nullable=False),
+        sa.Column("dim", sa.Integer(), nullable=False),
+        sa.Column("vector", sa.LargeBinary(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["owner_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["screenplay_id"], ["screenplays.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("screenplay_id", "kind", "item_id"),
+    )
+    op.create_index(op.f("ix_search_items_owner_id"), "search_items", ["owner_id"], unique=False)
+    op.create_index(
+        op.f("ix_search_items_screenplay_id"), "search_items", ["screenplay_id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_search_items_screenplay_id"), table_name="search_items")
+    op.drop_index(op.f("ix_search_items_owner_id"), table_name="search_items")
+    op.drop_table("search_items")
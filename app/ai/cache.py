@@ -0,0 +1,204 @@
+"""Caché de resultados de generación (opt-in, `settings.ai_cache_enabled`).
+
+La clave es un hash de (modelo, prompt renderizado, temperature, num_predict)
+más el `format` de salida estructurada si lo hay.
+Nivel 1: LRU en memoria del proceso con TTL y límite en bytes.
+Nivel 2: tabla `ai_cache` en Postgres, compartida entre instancias.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from time import monotonic
+from typing import Any, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import delete
+
+from app.db.database import get_session_factory
+from app.db.models import AICacheEntry
+from app.settings import settings
+from app.utils.ollama_client import DEFAULT_MAX_TOKENS, DEFAULT_TEMP
+
+logger = logging.getLogger(__name__)
+
+
+class CacheLog(BaseModel):
+    status: str  # "hit-memory" | "hit-db" | "miss" | "bypass"
+    key: str
+    hits: int
+    misses: int
+
+
+def cache_key(
+    model: str,
+    prompt: str,
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    format: Optional[Any] = None,
+) -> str:
+    # Mismos valores por defecto que OllamaClient._build_payload
+    parts = [
+        model,
+        prompt,
+        float(temperature if temperature is not None else DEFAULT_TEMP),
+        int(max_tokens if max_tokens is not None else DEFAULT_MAX_TOKENS),
+    ]
+    if format is not None:
+        parts.append(format)
+    raw = json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class MemoryLRU:
+    """LRU con TTL por entrada y expulsión por tamaño total en bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[str, tuple[float, str, int]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value, _ = entry
+        if expires_at <= monotonic():
+            self.discard(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        nbytes = len(key) + len(value.encode("utf-8"))
+        if nbytes > self.max_bytes:
+            return
+        self.discard(key)
+        self._entries[key] = (monotonic() + ttl, value, nbytes)
+        self.size += nbytes
+        while self.size > self.max_bytes:
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self.size -= evicted
+
+    def discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+
+@dataclass
+class CachePolicy:
+    ttl: int
+    read: bool = True
+    write: bool = True
+
+
+class GenerationCache:
+    def __init__(self, memory: MemoryLRU, db_enabled: bool = True):
+        self.memory = memory
+        self.db_enabled = db_enabled
+        self.session_factory = get_session_factory()
+        self.hits = 0
+        self.misses = 0
+
+    def policy(
+        self, route: Optional[str], cache_control: Optional[str] = None
+    ) -> Optional[CachePolicy]:
+        """Política para una ruta; None si esa ruta no se cachea."""
+        if not settings.ai_cache_enabled or route is None:
+            return None
+        ttl = settings.ai_cache_route_ttl.get(route)
+        if not ttl:
+            return None
+        directives = {d.strip().lower() for d in (cache_control or "").split(",")}
+        return CachePolicy(
+            ttl=ttl,
+            read="no-cache" not in directives and "no-store" not in directives,
+            write="no-store" not in directives,
+        )
+
+    def log(self, status: str, key: str) -> CacheLog:
+        return CacheLog(status=status, key=key, hits=self.hits, misses=self.misses)
+
+    async def get(self, key: str) -> tuple[Optional[str], Optional[str]]:
+        """Devuelve (texto, nivel) o (None, None)."""
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            return value, "memory"
+        if self.db_enabled:
+            entry = await self._db_get(key)
+            if entry is not None:
+                ttl = (entry.expires_at - _now()).total_seconds()
+                self.memory.set(key, entry.text, ttl)
+                self.hits += 1
+                return entry.text, "db"
+        self.misses += 1
+        return None, None
+
+    async def set(self, key: str, model: str, value: str, ttl: int) -> None:
+        self.memory.set(key, value, ttl)
+        if not self.db_enabled:
+            return
+        try:
+            async with self.session_factory() as session:
+                await session.merge(
+                    AICacheEntry(
+                        key=key,
+                        model=model,
+                        text=value,
+                        expires_at=_now() + timedelta(seconds=ttl),
+                    )
+                )
+                await session.commit()
+        except Exception:
+            # La caché nunca debe romper una generación
+            logger.warning("No se pudo guardar en ai_cache", exc_info=True)
+
+    async def discard(self, key: str) -> None:
+        self.memory.discard(key)
+        if not self.db_enabled:
+            return
+        try:
+            async with self.session_factory() as session:
+                await session.execute(delete(AICacheEntry).where(AICacheEntry.key == key))
+                await session.commit()
+        except Exception:
+            logger.warning("No se pudo borrar de ai_cache", exc_info=True)
+
+    async def _db_get(self, key: str) -> Optional[AICacheEntry]:
+        try:
+            async with self.session_factory() as session:
+                entry = await session.get(AICacheEntry, key)
+                if entry is None:
+                    return None
+                if _aware(entry.expires_at) <= _now():
+                    await session.delete(entry)
+                    await session.commit()
+                    return None
+                entry.expires_at = _aware(entry.expires_at)
+                return entry
+        except Exception:
+            logger.warning("No se pudo leer de ai_cache", exc_info=True)
+            return None
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(dt: datetime) -> datetime:
+    # SQLite devuelve datetimes sin zona horaria
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+generation_cache = GenerationCache(
+    MemoryLRU(settings.ai_cache_memory_max_bytes), db_enabled=settings.ai_cache_db_enabled
+)
@@ -0,0 +1,358 @@
+"""Trabajos de generación asíncronos.
+
+`POST /ai/jobs` guarda el trabajo en `ai_jobs` y responde al momento con su id.
+Un pool de workers en este proceso lo ejecuta con la misma lógica que la ruta
+síncrona (`run_*` de app.ai.router), de modo que el resultado acaba en la misma
+columna del Screenplay. El cliente lo recoge con `GET /ai/jobs/{id}` (long-poll
+con `?wait=`) o con `GET /ai/jobs/{id}/events` (SSE).
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Annotated, Any, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.auth.security import UserPublic, get_current_user
+from app.db.database import get_session, get_session_factory
+from app.db.models import AIJob, Screenplay
+from app.settings import settings
+from app.utils.metrics import callback_gauge
+from app.utils.ollama_client import OllamaClient, get_ollama_client
+from app.utils.responses import FastJSONResponse
+
+from . import router as ai
+from .streaming import sse_event
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/ai/jobs", tags=["AI"], default_response_class=FastJSONResponse)
+
+# kind -> (schema de entrada, ejecutor, ¿escribe en el Screenplay?)
+JOB_KINDS: dict[str, tuple[type[BaseModel], Any, bool]] = {
+    "synopsis": (ai.SynopsisIn, ai.run_synopsis, True),
+    "treatment": (ai.TreatmentIn, ai.run_treatment, True),
+    "turning-points": (ai.TurningPointsIn, ai.run_turning_points, True),
+    "character": (ai.CharacterIn, ai.run_character, True),
+    "location": (ai.LocationIn, ai.run_location, True),
+    "scene": (ai.SceneIn, ai.run_scene, False),
+    "dialogue": (ai.DialogueIn, ai.run_dialogue_polish, False),
+    "review": (ai.ReviewIn, ai.run_review, False),
+}
+
+JobKind = Literal[
+    "synopsis",
+    "treatment",
+    "turning-points",
+    "character",
+    "location",
+    "scene",
+    "dialogue",
+    "review",
+]
+FINISHED = {"succeeded", "failed"}
+# Rango de prioridad aceptado en POST /ai/jobs
+MIN_PRIORITY, MAX_PRIORITY = -10, 10
+# Error de un trabajo que se quedó en 'running' sin worker (reinicio, caída)
+INTERRUPTED = {"status": 503, "detail": "Job interrupted before finishing."}
+# Reintentos de un trabajo rechazado por la cola del modelo (429)
+MAX_BUSY_RETRIES = 5
+# Sondeo de trabajos que corren en otra instancia
+POLL_INTERVAL = 1.0
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobManager:
+    """Cola con prioridad + workers asyncio que ejecutan trabajos de ai_jobs."""
+
+    def __init__(self):
+        self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self.session_factory: Optional[async_sessionmaker] = None
+        self.client: Optional[OllamaClient] = None
+        self._workers: list[asyncio.Task] = []
+        self._events: dict[str, asyncio.Event] = {}
+        self._seq = itertools.count()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(
+        self, session_factory: async_sessionmaker, client: OllamaClient
+    ) -> None:
+        if self.running:
+            return
+        self.session_factory = session_factory
+        self.client = client
+        self.queue = asyncio.PriorityQueue()
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(settings.ai_jobs_workers)
+        ]
+
+    async def recover(self) -> None:
+        """Re-encola los trabajos que quedaron en 'queued' (p. ej. tras reiniciar).
+
+        Los que quedaron en 'running' más de ``ai_jobs_stale_after`` se dan por
+        perdidos y se marcan como fallidos: pueden haber escrito ya en el guion
+        a medias, así que no se repiten.
+        """
+        async with self.session_factory() as session:
+            await fail_stale_jobs(session)
+            rows = await session.execute(
+                select(AIJob.id, AIJob.priority).where(AIJob.status == "queued")
+            )
+            for job_id, priority in rows.all():
+                self.submit(job_id, priority)
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, job_id: str, priority: int = 0) -> None:
+        self._events.setdefault(job_id, asyncio.Event())
+        # PriorityQueue saca el menor: invertimos para que más prioridad vaya antes
+        self.queue.put_nowait((-priority, next(self._seq), job_id))
+
+    def stats(self) -> dict:
+        return {"workers": len(self._workers), "queued": self.queue.qsize()}
+
+    async def wait(self, job_id: str, timeout: float) -> None:
+        """Espera a que termine un trabajo local; si no es local, un intervalo de sondeo."""
+        if timeout <= 0:
+            return
+        event = self._events.get(job_id)
+        if event is None:
+            await asyncio.sleep(min(timeout, POLL_INTERVAL))
+            return
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job_id = await self.queue.get()
+            try:
+                await self._run(job_id)
+            except Exception:
+                logger.exception("Fallo inesperado ejecutando el trabajo %s", job_id)
+            finally:
+                self.queue.task_done()
+                event = self._events.pop(job_id, None)
+                if event is not None:
+                    event.set()
+
+    async def _run(self, job_id: str) -> None:
+        async with self.session_factory() as session:
+            # Reclamo condicional: otra instancia puede haberlo cogido ya
+            claimed = await session.execute(
+                update(AIJob)
+                .where(AIJob.id == job_id, AIJob.status == "queued")
+                .values(status="running", started_at=_now())
+            )
+            await session.commit()
+            if claimed.rowcount != 1:
+                return
+            job = await session.get(AIJob, job_id)
+            # Sin transacción abierta mientras se genera
+            await session.commit()
+            schema, handler, _ = JOB_KINDS[job.kind]
+            try:
+                payload = schema.model_validate(job.payload)
+                result = await self._execute(handler, payload, job.owner_id, session)
+            except HTTPException as e:
+                await session.rollback()
+                job.status, job.error = "failed", {"status": e.status_code, "detail": e.detail}
+            except Exception as e:
+                await session.rollback()
+                job.status, job.error = "failed", {"status": 500, "detail": str(e)}
+            else:
+                encoded = jsonable_encoder(result)
+                job.ia_log = encoded.pop("iaLog", None)
+                job.result = encoded
+                job.status = "succeeded"
+            job.finished_at = _now()
+            await session.commit()
+
+    async def _execute(self, handler, payload, owner_id: str, session: AsyncSession):
+        for attempt in itertools.count():
+            try:
+                return await handler(payload, owner_id, session, self.client)
+            except HTTPException as e:
+                if e.status_code != 429 or attempt >= MAX_BUSY_RETRIES:
+                    raise
+                # La cola del modelo está llena: el worker espera en vez de fallar
+                await asyncio.sleep(float((e.headers or {}).get("Retry-After", 5)))
+
+
+async def fail_stale_jobs(session: AsyncSession, job_id: Optional[str] = None) -> int:
+    """Marca como fallidos los trabajos en 'running' desde hace demasiado.
+
+    Condicional sobre el estado, así que es seguro aunque varias instancias lo
+    hagan a la vez. Con ``job_id`` solo mira ese trabajo.
+    """
+    cutoff = _now() - timedelta(seconds=settings.ai_jobs_stale_after)
+    stmt = (
+        update(AIJob)
+        .where(AIJob.status == "running", AIJob.started_at < cutoff)
+        .values(status="failed", error=INTERRUPTED, finished_at=_now())
+        # Las lecturas posteriores usan populate_existing
+        .execution_options(synchronize_session=False)
+    )
+    if job_id is not None:
+        stmt = stmt.where(AIJob.id == job_id)
+    result = await session.execute(stmt)
+    await session.commit()
+    if result.rowcount:
+        logger.warning("%d trabajo(s) de IA interrumpidos marcados como fallidos", result.rowcount)
+    return result.rowcount
+
+
+job_manager = JobManager()
+callback_gauge(
+    "ai_jobs_queued", "Trabajos de IA esperando worker en este proceso", lambda: job_manager.queue.qsize()
+)
+
+
+# ---------- Schemas ----------
+class JobIn(BaseModel):
+    kind: JobKind
+    payload: dict
+    priority: int = Field(default=0, ge=MIN_PRIORITY, le=MAX_PRIORITY)
+
+
+class JobOut(BaseModel):
+    id: str
+    kind: str
+    status: str
+    priority: int
+    screenplay_id: Optional[str]
+    result: Optional[dict]
+    iaLog: Optional[dict]
+    error: Optional[dict]
+    created_at: str
+    started_at: Optional[str]
+    finished_at: Optional[str]
+
+
+def _iso(dt: Optional[datetime]) -> Optional[str]:
+    return dt.isoformat() if dt else None
+
+
+def _job_out(job: AIJob) -> JobOut:
+    return JobOut(
+        id=job.id,
+        kind=job.kind,
+        status=job.status,
+        priority=job.priority,
+        screenplay_id=job.screenplay_id,
+        result=job.result,
+        iaLog=job.ia_log,
+        error=job.error,
+        created_at=_iso(job.created_at),
+        started_at=_iso(job.started_at),
+        finished_at=_iso(job.finished_at),
+    )
+
+
+async def _get_owned_job(session: AsyncSession, job_id: str, owner_id: str) -> AIJob:
+    job = await session.get(AIJob, job_id, populate_existing=True)
+    if not job or job.owner_id != owner_id:
+        raise HTTPException(404, "Job not found.")
+    return job
+
+
+# ---------- Endpoints ----------
+@router.post("", response_model=JobOut, status_code=202)
+async def create_job(
+    body: JobIn,
+    me: Annotated[UserPublic, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    session_factory: Annotated[async_sessionmaker, Depends(get_session_factory)],
+    ollama: Annotated[OllamaClient, Depends(get_ollama_client)],
+):
+    schema, _, persists = JOB_KINDS[body.kind]
+    try:
+        payload = schema.model_validate(body.payload)
+    except ValidationError as e:
+        raise HTTPException(422, detail=jsonable_encoder(e.errors()))
+    screenplay = await session.get(Screenplay, payload.screenplay_id)
+    owned = screenplay is not None and screenplay.owner_id == me.id
+    if persists and not owned:
+        raise HTTPException(404, "Screenplay not found.")
+    job = AIJob(
+        owner_id=me.id,
+        screenplay_id=payload.screenplay_id if owned else None,
+        kind=body.kind,
+        status="queued",
+        priority=body.priority,
+        payload=payload.model_dump(),
+    )
+    session.add(job)
+    await session.commit()
+    await session.refresh(job)
+    # Sin lifespan (tests) los workers se arrancan con la primera petición
+    await job_manager.start(session_factory, ollama)
+    job_manager.submit(job.id, job.priority)
+    return _job_out(job)
+
+
+@router.get("/{job_id}", response_model=JobOut)
+async def get_job(
+    job_id: str,
+    me: Annotated[UserPublic, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    wait: float = Query(default=0, ge=0, le=60, description="Long-poll: segundos a esperar"),
+):
+    await fail_stale_jobs(session, job_id)
+    job = await _get_owned_job(session, job_id, me.id)
+    deadline = asyncio.get_running_loop().time() + wait
+    while job.status not in FINISHED:
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            break
+        await job_manager.wait(job_id, remaining)
+        job = await _get_owned_job(session, job_id, me.id)
+    return _job_out(job)
+
+
+@router.get("/{job_id}/events", response_class=StreamingResponse)
+async def job_events(
+    job_id: str,
+    me: Annotated[UserPublic, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    session_factory: Annotated[async_sessionmaker, Depends(get_session_factory)],
+):
+    await _get_owned_job(session, job_id, me.id)
+
+    async def events():
+        seq = 0
+        while True:
+            async with session_factory() as s:
+                # Un trabajo huérfano no terminaría nunca: se cierra aquí
+                await fail_stale_jobs(s, job_id)
+                job = _job_out(await _get_owned_job(s, job_id, me.id))
+            if job.status in FINISHED:
+                yield sse_event("done", job.model_dump(), f"{job_id}:{seq}")
+                return
+            yield sse_event("status", {"status": job.status}, f"{job_id}:{seq}")
+            seq += 1
+            # Si el trabajo corre en otra instancia no hay evento local: sondeamos
+            await job_manager.wait(job_id, 15)
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers=ai.SSE_HEADERS
+    )
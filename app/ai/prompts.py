@@ -1,6 +1,23 @@
-SYNOPSIS_PROMPT = """Eres un guionista profesional de Hollywood. Genera una sinopsis en español (máx. 2 párrafos) con gancho comercial.
-Devuelve texto plano, sin encabezados ni otros comentarios.
-Contexto:
+# S1–S3 van en modo sesión (/api/chat): primero el system y el contexto del
+# guion, que no cambian de una llamada a la siguiente, y al final la tarea.
+# Así Ollama reutiliza la evaluación del prefijo común entre llamadas.
+STORY_SYSTEM_PROMPT = """Eres un guionista profesional de Hollywood. Trabajas en español sobre un único proyecto de guion.
+Devuelve solo lo que se te pide, sin encabezados ni otros comentarios."""
+
+STORY_CONTEXT_PROMPT = """Contexto del proyecto.
+
+Sinopsis:
+{synopsis}
+"""
+
+STORY_CONTEXT_TREATMENT = """
+Tratamiento:
+{treatment}
+"""
+
+SYNOPSIS_PROMPT = """Genera una sinopsis en español (máx. 2 párrafos) con gancho comercial.
+Devuelve texto plano.
+Datos:
 - Idea: {idea}
 - Premisa: {premise}
 - Tema: {theme}
@@ -9,8 +26,7 @@ Contexto:
 """
 
 TREATMENT_PROMPT = """Escribe un Tratamiento breve (6-10 párrafos) cubriendo el arco de 3 actos.
-Basado en la sinopsis proporcionada.
-- Sinopsis: {synopsis}
+Basado en la sinopsis del contexto.
 - Tono: {tone}
 - Público: {audience}
 - Referencias: {references}
@@ -26,10 +42,7 @@ TP3: Punto Medio / Ordalía
 TP4: Crisis
 TP5: Clímax
 
-Usa exclusivamente el siguiente Tratamiento para redactar las descripciones. No devuelvas los títulos ni ningún texto adicional.
-
-Tratamiento:
-{treatment}
+Usa exclusivamente el Tratamiento del contexto para redactar las descripciones. No devuelvas los títulos ni ningún texto adicional.
 
 Devuelve únicamente un array JSON válido con cinco objetos {{id, description}} (ids: TP1–TP5), sin marcadores de código ni texto extra.
 """
@@ -68,3 +81,22 @@ REVIEW_PROMPT = """Actúa como script doctor. Revisa el guion y devuelve un info
 Texto a revisar:
 {text}
 """
+
+REVIEW_CHUNK_PROMPT = """Actúa como script doctor. Este es el fragmento {index} de {total} de un guion largo.
+Toma notas breves y concretas (máx. 12 viñetas) sobre: fortalezas, debilidades, ritmo/estructura, personajes y diálogos.
+Cita las escenas por su encabezado. No escribas el informe final.
+Fragmento:
+{text}
+"""
+
+REVIEW_REDUCE_PROMPT = """Actúa como script doctor. A partir de las notas de cada fragmento del guion, escribe un único informe con secciones:
+- Fortalezas
+- Debilidades
+- Ritmo/Estructura
+- Personajes
+- Diálogos
+- Recomendaciones accionables (lista numerada)
+Valora el guion completo (arcos, estructura global), no fragmento a fragmento. Elimina repeticiones.
+Notas por fragmento:
+{notes}
+"""
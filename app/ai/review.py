@@ -0,0 +1,111 @@
+"""Revisión de guiones largos en map-reduce.
+
+Un largometraje no cabe en la ventana de contexto: `REVIEW_PROMPT` con el texto
+entero se trunca sin avisar y es una única generación muy lenta. Aquí:
+
+1. `split_script` corta el guion por encabezados de escena (INT./EXT.) en
+   fragmentos de hasta `settings.ai_review_chunk_chars` caracteres.
+2. Map: cada fragmento se anota con el modelo de escenas, en paralelo (como
+   mucho `ai_review_concurrency` a la vez). Las notas se cachean por hash del
+   contenido, así que al revisar de nuevo un guion editado solo se regeneran
+   los fragmentos que cambiaron.
+3. Reduce: el modelo de guionista une las notas en las secciones del informe.
+
+La orquestación (map concurrente + caché + reduce) está en app.ai.router.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+from typing import Optional
+
+from pydantic import BaseModel
+
+from app.settings import settings
+
+from .prompts import REVIEW_CHUNK_PROMPT, REVIEW_REDUCE_PROMPT
+
+# "INT. CASA - NOCHE", "12 EXT. CALLE", "INT./EXT. COCHE", "I/E. PORTAL"
+SCENE_HEADING_RE = re.compile(
+    r"^[ \t]*(?:\d+[A-Z]?\.?[ \t]+)?(?:INT\.?/EXT|EXT\.?/INT|INT|EXT|I/E|EST)\b\.?",
+    re.MULTILINE,
+)
+
+
+class ReviewChunksLog(BaseModel):
+    chunks: int
+    cached: int
+    generated: int
+    map_seconds: float
+
+
+def split_scenes(text: str) -> list[str]:
+    """Trozos que empiezan en un encabezado de escena (el primero puede no hacerlo)."""
+    starts = [m.start() for m in SCENE_HEADING_RE.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    bounds = starts + [len(text)]
+    return [text[a:b] for a, b in zip(bounds, bounds[1:]) if text[a:b].strip()]
+
+
+def _split_long(scene: str, max_chars: int) -> list[str]:
+    # Escena más larga que un fragmento: cortamos por párrafos (o en seco)
+    parts: list[str] = []
+    current = ""
+    for para in re.split(r"(?<=\n\n)", scene):
+        while len(para) > max_chars:
+            parts.append(para[:max_chars])
+            para = para[max_chars:]
+        if current and len(current) + len(para) > max_chars:
+            parts.append(current)
+            current = ""
+        current += para
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _is_cut_point(scene: str) -> bool:
+    # ~1 de cada 4 escenas, decidido por su contenido y no por su posición
+    return hashlib.blake2b(scene.strip().encode("utf-8"), digest_size=1).digest()[0] % 4 == 0
+
+
+def split_script(text: str, max_chars: Optional[int] = None) -> list[str]:
+    """Agrupa escenas consecutivas en fragmentos de como mucho `max_chars`.
+
+    Los cortes dependen del contenido de las escenas (a partir de la mitad de
+    `max_chars`), no de llenar cada fragmento al máximo: así insertar o editar
+    una escena solo cambia su fragmento y, como mucho, el siguiente, y el resto
+    siguen saliendo de la caché.
+    """
+    max_chars = max_chars or settings.ai_review_chunk_chars
+    chunks: list[str] = []
+    current = ""
+    for scene in split_scenes(text):
+        for piece in _split_long(scene, max_chars) if len(scene) > max_chars else [scene]:
+            if current and len(current) + len(piece) > max_chars:
+                chunks.append(current)
+                current = ""
+            current += piece
+            if len(current) >= max_chars // 2 and _is_cut_point(piece):
+                chunks.append(current)
+                current = ""
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+
+def chunk_cache_text(chunk: str) -> str:
+    """Lo que identifica unas notas en caché: plantilla + fragmento (sin su posición)."""
+    return f"{REVIEW_CHUNK_PROMPT}\x00{chunk}"
+
+
+def chunk_prompt(chunks: list[str], index: int) -> str:
+    return REVIEW_CHUNK_PROMPT.format(index=index + 1, total=len(chunks), text=chunks[index])
+
+
+def reduce_prompt(notes: list[str]) -> str:
+    joined = "\n\n".join(
+        f"### Fragmento {i + 1}\n{note.strip()}" for i, note in enumerate(notes)
+    )
+    return REVIEW_REDUCE_PROMPT.format(notes=joined)
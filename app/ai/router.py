@@ -1,17 +1,33 @@
+import asyncio
 import json
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 from time import perf_counter
-from typing import Annotated, Optional
+from typing import Annotated, Any, Awaitable, Callable, Optional, TypeVar
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic_core import to_jsonable_python
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from app.auth.security import UserPublic, get_current_user
-from app.db.database import get_session
+from app.db.database import get_session, get_session_factory
 from app.db.models import Screenplay
+from app.screenplays.items import append_item
+from app.screenplays.router import Character, ItemId, Location
 from app.settings import settings
 from app.turning_points import TURNING_POINT_TITLES
-from app.utils.ollama_client import OllamaClient
+from app.utils.ollama_client import GenerationMetrics, OllamaClient, get_ollama_client
+from app.utils.scheduler import SchedulerBusy, Ticket, scheduler
+from app.utils.model_router import Decision, model_router
+from app.utils.json_output import MalformedJSON, json_stats, output_schema, parse_json_lenient
+from app.utils.metrics import counter
+from app.utils.prompt_sessions import prompt_sessions
+from app.utils.residency import residency
+from app.utils.responses import FastJSONResponse, trusted_response
+from app.utils.singleflight import SingleFlight
 
 from .prompts import (
     CHARACTER_PROMPT,
@@ -19,41 +35,541 @@ from .prompts import (
     LOCATION_PROMPT,
     REVIEW_PROMPT,
     SCENE_PROMPT,
+    STORY_CONTEXT_PROMPT,
+    STORY_CONTEXT_TREATMENT,
+    STORY_SYSTEM_PROMPT,
     SYNOPSIS_PROMPT,
     TREATMENT_PROMPT,
     TURNING_POINTS_PROMPT,
 )
+from .cache import CacheLog, cache_key, generation_cache
+from .semantic_cache import SemanticLog, semantic_cache
+from .review import (
+    ReviewChunksLog,
+    chunk_cache_text,
+    chunk_prompt,
+    reduce_prompt,
+    split_script,
+)
+from .streaming import TokenStream, parse_last_event_id, streams
+from .telemetry import aggregate, ai_log_writer
 
-router = APIRouter(prefix="/ai", tags=["AI"])
-
+router = APIRouter(prefix="/ai", tags=["AI"], default_response_class=FastJSONResponse)
 
-# Fixed titles for Turning Points keyed by their identifiers
-TURNING_POINT_TITLES = {
-    "TP1": "Inciting Incident",
-    "TP2": "Break into Act Two",
-    "TP3": "Midpoint",
-    "TP4": "Break into Act Three",
-    "TP5": "Climax",
-}
 
 # ---------- IA Log ----------
 
 
+class StructuredLog(BaseModel):
+    """Resultado de una generación con salida JSON (turning points, personajes...)."""
+
+    output: str
+    valid: bool
+    aborted: bool = False  # generación cortada al detectar JSON mal formado
+    attempts: int = 1
+    repairs: list[str] = []
+    success_rate: float
+    repaired_total: int
+
+
+class RoutingLog(BaseModel):
+    """Por qué se usó `IALog.model` (router por plazos)."""
+
+    requested: str
+    reason: str  # no-deadline | fits | no-data | degraded | fastest
+    deadline: Optional[float] = None
+    predicted: Optional[float] = None  # segundos estimados para el modelo usado
+
+
 class IALog(BaseModel):
     time_thinking: float
     original_message: str
     model: str
+    routing: Optional[RoutingLog] = None
+    cache: Optional[CacheLog] = None
+    semantic: Optional[SemanticLog] = None
+    # True si el resultado se compartió con otra petición idéntica en vuelo
+    shared: bool = False
+    structured: Optional[StructuredLog] = None
+    # Contadores de Ollama (tokens, duraciones) y esperas propias, en segundos
+    metrics: Optional[GenerationMetrics] = None
+    queue_wait: Optional[float] = None
+    cache_wait: Optional[float] = None
+
+
+def log_generation(
+    route: str,
+    ia_log: IALog,
+    owner_id: Optional[str] = None,
+    screenplay_id: Optional[str] = None,
+) -> None:
+    """Encola una fila de telemetría para la tabla ai_logs."""
+    metrics = ia_log.metrics or GenerationMetrics()
+    cache_status = ia_log.cache.status if ia_log.cache else None
+    if ia_log.semantic is not None and ia_log.semantic.status == "hit":
+        cache_status = "hit-semantic"
+    ai_log_writer.record(
+        route=route,
+        model=ia_log.model,
+        owner_id=owner_id,
+        screenplay_id=screenplay_id,
+        cache_status=cache_status,
+        shared=ia_log.shared,
+        latency=ia_log.time_thinking,
+        queue_wait=ia_log.queue_wait,
+        cache_wait=ia_log.cache_wait,
+        time_to_first_token=metrics.time_to_first_token,
+        load_duration=metrics.load_duration,
+        prompt_eval_duration=metrics.prompt_eval_duration,
+        eval_duration=metrics.eval_duration,
+        prompt_eval_count=metrics.prompt_eval_count,
+        eval_count=metrics.eval_count,
+        tokens_per_second=metrics.tokens_per_second,
+        prompt_eval_saved=metrics.prompt_eval_saved,
+    )
+
+
+# Generaciones idénticas (modelo, prompt, opciones) en curso
+inflight = SingleFlight()
+
+ai_cancellations = counter(
+    "ai_cancellations_total",
+    "Generaciones canceladas por desconexión del cliente o plazo vencido",
+    ("route", "reason"),
+)
+
+T = TypeVar("T")
+
 
+async def _wait_disconnect(request: Request) -> None:
+    # El cuerpo ya está leído: el siguiente mensaje ASGI es la desconexión
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
 
-async def run_ai(model: str, prompt: str, **kwargs) -> tuple[str, IALog]:
+
+async def until_disconnect(
+    request: Request, work: Awaitable[T], route: str, deadline: Optional[float] = None
+) -> T:
+    """Espera a `work` y la cancela si el cliente se va o vence `deadline`.
+
+    Al cancelar se cierra la petición a Ollama (deja de generar) y se libera
+    la plaza del modelo en el scheduler.
+    """
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.create_task(_wait_disconnect(request))
+    try:
+        done, _ = await asyncio.wait(
+            {task, watcher}, timeout=deadline or None, return_when=asyncio.FIRST_COMPLETED
+        )
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        watcher.cancel()
+    if task in done:
+        return task.result()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    if watcher in done:
+        ai_cancellations.labels(route, "disconnect").inc()
+        # Nadie leerá la respuesta; 499 como en nginx
+        raise HTTPException(499, "Client closed request.")
+    ai_cancellations.labels(route, "deadline").inc()
+    raise HTTPException(504, "AI deadline exceeded.")
+
+
+def ai_response(model: type[BaseModel], result: Any) -> FastJSONResponse:
+    """Resultado de un `run_*` (modelo o dict con modelos) sin pasar por response_model.
+
+    El resultado ya se construyó con los modelos de salida: basta volcarlo a
+    JSON una vez (también los modelos anidados) en vez de que FastAPI lo
+    vuelva a validar.
+    """
+    return trusted_response(model, to_jsonable_python(result))
+
+
+def route_model(
+    model: str, route: str, deadline: Optional[float], max_tokens: Optional[int] = None
+) -> tuple[str, RoutingLog]:
+    """Modelo a usar según el plazo de la petición o el de su ruta."""
+    decision: Decision = model_router.choose(
+        model, route.removesuffix("/stream"), deadline, max_tokens
+    )
+    return decision.model, RoutingLog(
+        requested=decision.requested,
+        reason=decision.reason,
+        deadline=decision.deadline,
+        predicted=decision.predicted,
+    )
+
+
+def observe_speed(model: str, route: str, metrics: GenerationMetrics) -> None:
+    overhead = None
+    if metrics.prompt_eval_duration is not None:
+        overhead = (metrics.load_duration or 0.0) + metrics.prompt_eval_duration
+    model_router.observe(
+        model,
+        route.removesuffix("/stream"),
+        metrics.eval_count,
+        metrics.eval_duration,
+        overhead,
+    )
+
+
+async def acquire_slot(model: str) -> Ticket:
+    """Turno en la cola del modelo; 429 + Retry-After si está saturada."""
+    try:
+        return await scheduler.acquire(model)
+    except SchedulerBusy as e:
+        raise HTTPException(
+            429,
+            detail={"error": str(e), "model": e.model, "reason": e.reason},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+@asynccontextmanager
+async def admission(model: str):
+    ticket = await acquire_slot(model)
+    try:
+        yield ticket
+    finally:
+        ticket.release()
+
+
+async def run_ai(
+    model: str,
+    prompt: str,
+    *,
+    client: OllamaClient,
+    route: str = "unknown",
+    owner_id: Optional[str] = None,
+    screenplay_id: Optional[str] = None,
+    cache_route: Optional[str] = None,
+    cache_control: Optional[str] = None,
+    deadline: Optional[float] = None,
+    **kwargs,
+) -> tuple[str, IALog]:
+    """Genera con Ollama pasando por la caché si la ruta tiene política.
+
+    `cache_route` es la clave en `settings.ai_cache_route_ttl`; `cache_control`
+    la cabecera Cache-Control de la petición (no-cache / no-store). Las
+    peticiones idénticas en vuelo comparten una única generación. `model` es el
+    preferido: con plazo (`deadline` o el de `route`) puede bajarse a uno más
+    rápido. `owner_id` y `screenplay_id` solo se usan para la telemetría (ai_logs).
+    """
     start = perf_counter()
-    async with OllamaClient() as client:
-        text = await client.generate(model=model, prompt=prompt, **kwargs)
+    model, routing = route_model(model, route, deadline, kwargs.get("max_tokens"))
+    key = cache_key(
+        model,
+        # En modo sesión el prompt solo es la tarea: el contexto también cuenta
+        "\n".join(p for p in (kwargs.get("system"), kwargs.get("context"), prompt) if p),
+        kwargs.get("temperature"),
+        kwargs.get("max_tokens"),
+        kwargs.get("format"),
+    )
+    policy = generation_cache.policy(cache_route, cache_control)
+    cache_status = None
+    cache_wait = None
+    if policy is not None:
+        cache_status = "bypass"
+        if policy.read:
+            cached, tier = await generation_cache.get(key)
+            cache_wait = perf_counter() - start
+            if cached is not None:
+                ia_log = IALog(
+                    time_thinking=perf_counter() - start,
+                    original_message=cached,
+                    model=model,
+                    routing=routing,
+                    cache=generation_cache.log(f"hit-{tier}", key),
+                    cache_wait=cache_wait,
+                )
+                log_generation(route, ia_log, owner_id, screenplay_id)
+                return cached, ia_log
+            cache_status = "miss"
+
+    async def generate() -> tuple[str, GenerationMetrics, float]:
+        metrics = GenerationMetrics()
+        queued = perf_counter()
+        async with admission(model):
+            queue_wait = perf_counter() - queued
+            text = await client.generate(model=model, prompt=prompt, metrics=metrics, **kwargs)
+        return text, metrics, queue_wait
+
+    if settings.ai_singleflight_enabled:
+        (text, metrics, queue_wait), shared = await inflight.do(key, generate)
+    else:
+        (text, metrics, queue_wait), shared = await generate(), False
+    if not shared:
+        observe_speed(model, route, metrics)
+    if policy is not None and policy.write and not shared:
+        await generation_cache.set(key, model, text, policy.ttl)
     duration = perf_counter() - start
-    ia_log = IALog(time_thinking=duration, original_message=text, model=model)
+    ia_log = IALog(
+        time_thinking=duration,
+        original_message=text,
+        model=model,
+        routing=routing,
+        cache=generation_cache.log(cache_status, key) if cache_status else None,
+        shared=shared,
+        metrics=metrics,
+        queue_wait=queue_wait,
+        cache_wait=cache_wait,
+    )
+    log_generation(route, ia_log, owner_id, screenplay_id)
     return text, ia_log
 
 
+async def run_ai_semantic(
+    model: str,
+    text: str,
+    generate: Callable[[], Awaitable[tuple[str, IALog]]],
+    *,
+    client: OllamaClient,
+    route: str,
+    owner_id: Optional[str] = None,
+    screenplay_id: Optional[str] = None,
+    cache_route: Optional[str] = None,
+    cache_control: Optional[str] = None,
+) -> tuple[str, IALog]:
+    """Envuelve `generate` con la caché semántica sobre el texto de entrada.
+
+    Si hay una respuesta para un texto casi idéntico (mismo usuario, ruta y modelo) se
+    devuelve sin generar; si no, se genera y se guarda su embedding.
+    """
+    start = perf_counter()
+    policy = semantic_cache.policy(cache_route, cache_control)
+    vector = await semantic_cache.embed(client, text) if policy is not None else None
+    if vector is None:
+        return await generate()
+    similarity = None
+    if policy.read:
+        hit, similarity = semantic_cache.lookup(owner_id, cache_route, model, vector)
+        if hit is not None:
+            elapsed = perf_counter() - start
+            ia_log = IALog(
+                time_thinking=elapsed,
+                original_message=hit,
+                model=model,
+                semantic=semantic_cache.log("hit", similarity),
+                cache_wait=elapsed,
+            )
+            log_generation(route, ia_log, owner_id, screenplay_id)
+            return hit, ia_log
+    result, ia_log = await generate()
+    if policy.write and not ia_log.shared:
+        semantic_cache.store(owner_id, cache_route, model, vector, result, policy.ttl)
+    if policy.read:
+        ia_log.semantic = semantic_cache.log("miss", similarity)
+    return result, ia_log
+
+
+async def run_ai_json(
+    model: str,
+    prompt: str,
+    *,
+    client: OllamaClient,
+    schema: dict,
+    output: str,
+    **kwargs,
+) -> tuple[Any, IALog]:
+    """Generación con salida JSON restringida por `schema` (parámetro `format`).
+
+    La salida se valida según llega (se corta si es claramente inválida) y se
+    parsea de forma tolerante. Si aun así no hay JSON se reintenta hasta
+    `settings.ai_json_retries` veces y después se responde 502.
+    """
+    attempts = settings.ai_json_retries + 1
+    for attempt in range(1, attempts + 1):
+        start = perf_counter()
+        aborted = False
+        try:
+            text, ia_log = await run_ai(
+                model, prompt, client=client, format=schema, validate_json=True, **kwargs
+            )
+        except MalformedJSON as e:
+            aborted = True
+            ia_log = IALog(
+                time_thinking=perf_counter() - start,
+                original_message=e.partial,
+                model=model,
+            )
+        else:
+            try:
+                data, repairs = parse_json_lenient(text)
+            except ValueError:
+                if ia_log.cache is not None:
+                    # No dejamos en caché una respuesta inservible
+                    await generation_cache.discard(ia_log.cache.key)
+            else:
+                counts = json_stats.record(output, ok=True, repaired=bool(repairs))
+                ia_log.structured = StructuredLog(
+                    output=output,
+                    valid=True,
+                    attempts=attempt,
+                    repairs=repairs,
+                    success_rate=json_stats.success_rate(output),
+                    repaired_total=counts["repaired"],
+                )
+                return data, ia_log
+        counts = json_stats.record(output, ok=False, repaired=False)
+        ia_log.structured = StructuredLog(
+            output=output,
+            valid=False,
+            aborted=aborted,
+            attempts=attempt,
+            success_rate=json_stats.success_rate(output),
+            repaired_total=counts["repaired"],
+        )
+    raise HTTPException(
+        502,
+        detail={
+            "error": f"AI returned invalid JSON for {output}.",
+            "iaLog": ia_log.model_dump(),
+        },
+    )
+
+
+OllamaDep = Annotated[OllamaClient, Depends(get_ollama_client)]
+SessionFactoryDep = Annotated[async_sessionmaker, Depends(get_session_factory)]
+LastEventId = Annotated[Optional[str], Header()]
+CacheControl = Annotated[Optional[str], Header()]
+# Segundos que el cliente está dispuesto a esperar; 0 desactiva el plazo de la ruta
+AIDeadline = Annotated[Optional[float], Header(alias="X-AI-Deadline", ge=0)]
+
+
+# ---------- Streaming (SSE) ----------
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _sse_response(events) -> StreamingResponse:
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+def resume_stream(last_event_id: Optional[str], me: UserPublic) -> Optional[StreamingResponse]:
+    """Reanuda un stream existente si el cliente envía `Last-Event-ID`."""
+    parsed = parse_last_event_id(last_event_id)
+    if parsed is None:
+        return None
+    stream_id, seq = parsed
+    stream = streams.get(stream_id, me.id)
+    if stream is None:
+        raise HTTPException(404, "Stream not found or expired.")
+    return _sse_response(stream.events(seq + 1))
+
+
+async def stream_ai(
+    model: str,
+    prompt: str | Callable[[TokenStream], Awaitable[str]],
+    *,
+    client: OllamaClient,
+    owner_id: str,
+    result_key: str,
+    route: str = "unknown",
+    screenplay_id: Optional[str] = None,
+    on_done: Optional[Callable[[str], Awaitable[None]]] = None,
+    deadline: Optional[float] = None,
+    **kwargs,
+) -> StreamingResponse:
+    """Lanza la generación en segundo plano y devuelve sus tokens como SSE.
+
+    El evento final `done` lleva el texto completo bajo `result_key` y el IALog.
+    `prompt` puede ser una función que recibe el stream y devuelve el prompt;
+    se ejecuta ya en segundo plano y puede publicar eventos `progress`.
+    """
+    received = perf_counter()
+    model, routing = route_model(model, route, deadline, kwargs.get("max_tokens"))
+    ticket: Optional[Ticket] = None
+    queue_wait = None
+    if not callable(prompt):
+        # La admisión se resuelve antes de responder para poder devolver 429
+        ticket = await acquire_slot(model)
+        queue_wait = perf_counter() - received
+    stream = streams.create(owner_id, result_key)
+
+    async def produce():
+        nonlocal ticket, queue_wait
+        start = perf_counter()
+        parts: list[str] = []
+        metrics = GenerationMetrics()
+        # El plazo de la petición cuenta también la espera en la cola
+        remaining = max(deadline - (start - received), 0) if deadline else None
+        try:
+            async with asyncio.timeout(remaining):
+                text_prompt = prompt
+                if callable(prompt):
+                    text_prompt = await prompt(stream)
+                    # Sin plaza del modelo durante la preparación: el map usa las suyas
+                    queued = perf_counter()
+                    ticket = await acquire_slot(model)
+                    queue_wait = perf_counter() - queued
+                async for chunk in client.stream_generate(
+                    model=model, prompt=text_prompt, metrics=metrics, **kwargs
+                ):
+                    parts.append(chunk)
+                    await stream.publish(chunk)
+            text = "".join(parts)
+            observe_speed(model, route, metrics)
+            ia_log = IALog(
+                time_thinking=perf_counter() - start,
+                original_message=text,
+                model=model,
+                routing=routing,
+                metrics=metrics,
+                queue_wait=queue_wait,
+            )
+            log_generation(route, ia_log, owner_id, screenplay_id)
+            if on_done is not None:
+                await on_done(text)
+            await stream.finish({result_key: text.strip(), "iaLog": ia_log.model_dump()})
+        except TimeoutError:
+            ai_cancellations.labels(route, "deadline").inc()
+            await stream.fail(504, "AI deadline exceeded.")
+        except asyncio.CancelledError:
+            # Ningún cliente leyendo el stream (ver TokenStream._detach)
+            ai_cancellations.labels(route, "disconnect").inc()
+            await stream.fail(499, "Client closed request.")
+            raise
+        except HTTPException as e:
+            # p. ej. 409 si el guion cambió mientras se generaba
+            await stream.fail(e.status_code, e.detail)
+        except Exception as e:
+            await stream.fail(500, str(e))
+        finally:
+            if ticket is not None:
+                ticket.release()
+
+    stream.task = asyncio.create_task(produce())
+    return _sse_response(stream.events())
+
+
+@router.get("/status")
+async def ai_status(ollama: OllamaDep):
+    return {
+        "pool": ollama.pool_stats(),
+        "queues": scheduler.stats(),
+        "json": json_stats.snapshot(),
+        "models": residency.stats(),
+        "ai_logs": ai_log_writer.stats(),
+        "prompt_sessions": prompt_sessions.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "routing": model_router.stats(),
+    }
+
+
+@router.get("/metrics")
+async def ai_metrics(
+    me: Annotated[UserPublic, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    hours: float = Query(default=24, gt=0, le=24 * 30, description="Ventana en horas"),
+):
+    """p50/p95 de latencia y throughput por modelo y ruta de las generaciones propias."""
+    await ai_log_writer.flush()
+    since = datetime.now(timezone.utc) - timedelta(hours=hours)
+    return {"since": since.isoformat(), "groups": await aggregate(session, since, me.id)}
+
+
 # ---------- Helpers modelo ----------
 def pick_text_model(screenwriter: bool = False):
     return settings.ai_text_screenwriter if screenwriter else settings.ai_text_default
@@ -65,6 +581,58 @@ def pick_scene_model(creative: bool = False):
     )
 
 
+# ---------- Lectura y escritura del guion ----------
+# Una generación tarda de 30 a 120 s y no debe retener una conexión del pool
+# (ni una transacción abierta) mientras tanto: se lee en una transacción
+# corta, se genera sin conexión y se escribe con un UPDATE condicional.
+
+
+async def read_screenplay(session: AsyncSession, screenplay_id: str, owner_id: str) -> Screenplay:
+    screenplay = await session.get(Screenplay, screenplay_id)
+    # Fin de la transacción de lectura: la conexión vuelve al pool
+    await session.commit()
+    if not screenplay or screenplay.owner_id != owner_id:
+        raise HTTPException(404, "Screenplay not found.")
+    return screenplay
+
+
+async def write_generated(
+    session: AsyncSession,
+    screenplay_id: str,
+    owner_id: str,
+    values: dict[str, Any],
+    expected: dict[str, Any],
+    conflict: dict[str, Any],
+) -> None:
+    """Guarda `values` solo si las columnas de `expected` siguen como se leyeron.
+
+    Si otra petición las cambió durante la generación responde 409 con
+    `conflict` (el resultado generado) para que el cliente decida.
+    """
+    conditions = [Screenplay.id == screenplay_id, Screenplay.owner_id == owner_id]
+    for column, seen in expected.items():
+        attr = getattr(Screenplay, column)
+        conditions.append(attr.is_(None) if seen is None else attr == seen)
+    result = await session.execute(
+        update(Screenplay)
+        .where(*conditions)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    if result.rowcount == 1:
+        return
+    exists = await session.scalar(
+        select(Screenplay.id).where(Screenplay.id == screenplay_id, Screenplay.owner_id == owner_id)
+    )
+    await session.commit()
+    if exists is None:
+        raise HTTPException(404, "Screenplay not found.")
+    raise HTTPException(
+        409, detail={"error": "Screenplay changed during generation.", **conflict}
+    )
+
+
 # ---------- Schemas ----------
 class SynopsisIn(BaseModel):
     idea: str
@@ -81,13 +649,15 @@ class SynopsisOut(BaseModel):
     iaLog: IALog
 
 
-@router.post("/synopsis", response_model=SynopsisOut)
-async def generate_synopsis(
+async def run_synopsis(
     payload: SynopsisIn,
-    me: Annotated[UserPublic, Depends(get_current_user)],
-    session: Annotated[AsyncSession, Depends(get_session)],
-):
+    owner_id: str,
+    session: AsyncSession,
+    client: OllamaClient,
+    deadline: Optional[float] = None,
+) -> dict:
     model = pick_text_model(payload.screenwriter)
+    screenplay = await read_screenplay(session, payload.screenplay_id, owner_id)
     subgenres = ", ".join(payload.subgenres or [])
     prompt = SYNOPSIS_PROMPT.format(
         idea=payload.idea,
@@ -96,14 +666,45 @@ async def generate_synopsis(
         genre=payload.genre,
         subgenres=subgenres,
     )
-    text, ia_log = await run_ai(model=model, prompt=prompt)
-    screenplay = await session.get(Screenplay, payload.screenplay_id)
-    if not screenplay or screenplay.owner_id != me.id:
-        raise HTTPException(404, "Screenplay not found.")
-    screenplay.synopsis = text.strip()
-    await session.commit()
-    await session.refresh(screenplay)
-    return {"synopsis": screenplay.synopsis, "iaLog": ia_log}
+    text, ia_log = await run_ai(
+        model=model,
+        prompt=prompt,
+        client=client,
+        route="synopsis",
+        owner_id=owner_id,
+        screenplay_id=payload.screenplay_id,
+        system=STORY_SYSTEM_PROMPT,
+        session=payload.screenplay_id,
+        deadline=deadline,
+    )
+    result = {"synopsis": text.strip(), "iaLog": ia_log}
+    await write_generated(
+        session,
+        screenplay.id,
+        owner_id,
+        {"synopsis": result["synopsis"]},
+        {"synopsis": screenplay.synopsis},
+        {"synopsis": result["synopsis"], "iaLog": ia_log.model_dump()},
+    )
+    return result
+
+
+@router.post("/synopsis", response_model=SynopsisOut)
+async def generate_synopsis(
+    payload: SynopsisIn,
+    request: Request,
+    me: Annotated[UserPublic, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    ollama: OllamaDep,
+    deadline: AIDeadline = None,
+):
+    result = await until_disconnect(
+        request,
+        run_synopsis(payload, me.id, session, ollama, deadline=deadline),
+        "synopsis",
+        deadline,
+    )
+    return ai_response(SynopsisOut, result)
 
 
 # ---------- Treatment ----------
@@ -121,30 +722,121 @@ class TreatmentOut(BaseModel):
     iaLog: IALog
 
 
+def story_context(screenplay: Screenplay, treatment: bool = False) -> dict:
+    """Prefijo estable (system + contexto) de la cadena S1→S3 en modo sesión.
+
+    El contexto con tratamiento empieza igual que el de solo sinopsis, así que
+    Ollama reutiliza lo ya evaluado en la llamada anterior del mismo guion.
+    """
+    context = STORY_CONTEXT_PROMPT.format(synopsis=screenplay.synopsis or "")
+    if treatment:
+        context += STORY_CONTEXT_TREATMENT.format(treatment=screenplay.treatment)
+    return {"system": STORY_SYSTEM_PROMPT, "context": context, "session": screenplay.id}
+
+
+def _treatment_prompt(payload: TreatmentIn) -> str:
+    return TREATMENT_PROMPT.format(
+        tone=payload.tone,
+        audience=payload.audience,
+        references=payload.references or "",
+        logline=payload.logline,
+    )
+
+
+async def run_treatment(
+    payload: TreatmentIn,
+    owner_id: str,
+    session: AsyncSession,
+    client: OllamaClient,
+    deadline: Optional[float] = None,
+) -> dict:
+    model = pick_text_model(payload.screenwriter)
+    screenplay = await read_screenplay(session, payload.screenplay_id, owner_id)
+    if not screenplay.synopsis:
+        raise HTTPException(404, "Screenplay missing synopsis.")
+    prompt = _treatment_prompt(payload)
+    text, ia_log = await run_ai(
+        model=model,
+        prompt=prompt,
+        client=client,
+        route="treatment",
+        owner_id=owner_id,
+        screenplay_id=screenplay.id,
+        **story_context(screenplay),
+        deadline=deadline,
+    )
+    result = {"treatment": text.strip(), "iaLog": ia_log}
+    await write_generated(
+        session,
+        screenplay.id,
+        owner_id,
+        {"treatment": result["treatment"]},
+        # Se generó a partir de esta sinopsis y sustituye a este tratamiento
+        {"synopsis": screenplay.synopsis, "treatment": screenplay.treatment},
+        {"treatment": result["treatment"], "iaLog": ia_log.model_dump()},
+    )
+    return result
+
+
 @router.post("/treatment", response_model=TreatmentOut)
 async def generate_treatment(
+    payload: TreatmentIn,
+    request: Request,
+    me: Annotated[UserPublic, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    ollama: OllamaDep,
+    deadline: AIDeadline = None,
+):
+    result = await until_disconnect(
+        request,
+        run_treatment(payload, me.id, session, ollama, deadline=deadline),
+        "treatment",
+        deadline,
+    )
+    return ai_response(TreatmentOut, result)
+
+
+@router.post("/treatment/stream", response_class=StreamingResponse)
+async def stream_treatment(
     payload: TreatmentIn,
     me: Annotated[UserPublic, Depends(get_current_user)],
     session: Annotated[AsyncSession, Depends(get_session)],
+    session_factory: SessionFactoryDep,
+    ollama: OllamaDep,
+    last_event_id: LastEventId = None,
+    deadline: AIDeadline = None,
 ):
+    resumed = resume_stream(last_event_id, me)
+    if resumed is not None:
+        return resumed
     model = pick_text_model(payload.screenwriter)
-    screenplay = await session.get(Screenplay, payload.screenplay_id)
-    if not screenplay or screenplay.owner_id != me.id:
-        raise HTTPException(404, "Screenplay not found.")
+    screenplay = await read_screenplay(session, payload.screenplay_id, me.id)
     if not screenplay.synopsis:
         raise HTTPException(404, "Screenplay missing synopsis.")
-    prompt = TREATMENT_PROMPT.format(
-        tone=payload.tone,
-        audience=payload.audience,
-        references=payload.references or "",
-        logline=payload.logline,
-        synopsis=screenplay.synopsis,
+    prompt = _treatment_prompt(payload)
+    context = story_context(screenplay)
+    screenplay_id = screenplay.id
+    expected = {"synopsis": screenplay.synopsis, "treatment": screenplay.treatment}
+
+    async def persist(text: str) -> None:
+        # La sesión de la petición ya está cerrada cuando termina el stream
+        async with session_factory() as s:
+            await write_generated(
+                s, screenplay_id, me.id, {"treatment": text.strip()}, expected, {}
+            )
+
+    return await stream_ai(
+        model,
+        prompt,
+        client=ollama,
+        owner_id=me.id,
+        result_key="treatment",
+        route="treatment/stream",
+        screenplay_id=screenplay_id,
+        on_done=persist,
+        **context,
+        deadline=deadline,
     )
-    text, ia_log = await run_ai(model=model, prompt=prompt)
-    screenplay.treatment = text.strip()
-    await session.commit()
-    await session.refresh(screenplay)
-    return {"treatment": screenplay.treatment, "iaLog": ia_log}
 
 
 # ---------- Turning Points ----------
@@ -164,22 +856,40 @@ class TurningPointsOut(BaseModel):
     iaLog: IALog
 
 
-@router.post("/turning-points", response_model=TurningPointsOut)
-async def generate_turning_points(
+# El modelo solo devuelve id + description; los títulos son fijos
+TURNING_POINTS_SCHEMA = output_schema(
+    TurningPointItem, exclude={"title"}, many=len(TURNING_POINT_TITLES)
+)
+
+
+async def run_turning_points(
     payload: TurningPointsIn,
-    me: Annotated[UserPublic, Depends(get_current_user)],
-    session: Annotated[AsyncSession, Depends(get_session)],
-):
+    owner_id: str,
+    session: AsyncSession,
+    client: OllamaClient,
+    cache_control: Optional[str] = None,
+    deadline: Optional[float] = None,
+) -> dict:
     model = pick_text_model(payload.screenwriter)
-    screenplay = await session.get(Screenplay, payload.screenplay_id)
-    if not screenplay or screenplay.owner_id != me.id:
-        raise HTTPException(404, "Screenplay not found.")
+    screenplay = await read_screenplay(session, payload.screenplay_id, owner_id)
     if not screenplay.treatment:
         raise HTTPException(404, "Screenplay missing treatment.")
-    prompt = TURNING_POINTS_PROMPT.format(treatment=screenplay.treatment)
-    text, ia_log = await run_ai(model=model, prompt=prompt)
+    prompt = TURNING_POINTS_PROMPT.format()
+    data, ia_log = await run_ai_json(
+        model,
+        prompt,
+        client=client,
+        schema=TURNING_POINTS_SCHEMA,
+        output="turning points",
+        route="turning-points",
+        owner_id=owner_id,
+        screenplay_id=screenplay.id,
+        cache_route="turning-points",
+        cache_control=cache_control,
+        **story_context(screenplay, treatment=True),
+        deadline=deadline,
+    )
     try:
-        data = json.loads(text)
         items = [
             TurningPointItem(
                 id=tp["id"],
@@ -188,8 +898,10 @@ async def generate_turning_points(
             )
             for tp in data
         ]
-
     except Exception:
+        if ia_log.cache is not None:
+            # No dejamos en caché una respuesta inservible
+            await generation_cache.discard(ia_log.cache.key)
         raise HTTPException(
             502,
             detail={
@@ -197,15 +909,40 @@ async def generate_turning_points(
                 "iaLog": ia_log.model_dump(),
             },
         )
-    screenplay.turning_points = [tp.model_dump() for tp in items]
-    await session.commit()
-    await session.refresh(screenplay)
+    await write_generated(
+        session,
+        screenplay.id,
+        owner_id,
+        {"turning_points": [tp.model_dump() for tp in items]},
+        # Entradas de la generación (columnas de texto: comparables en cualquier BD)
+        {"synopsis": screenplay.synopsis, "treatment": screenplay.treatment},
+        {"points": [tp.model_dump() for tp in items], "iaLog": ia_log.model_dump()},
+    )
     return {"points": items, "iaLog": ia_log}
 
 
+@router.post("/turning-points", response_model=TurningPointsOut)
+async def generate_turning_points(
+    payload: TurningPointsIn,
+    request: Request,
+    me: Annotated[UserPublic, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    ollama: OllamaDep,
+    cache_control: CacheControl = None,
+    deadline: AIDeadline = None,
+):
+    result = await until_disconnect(
+        request,
+        run_turning_points(payload, me.id, session, ollama, cache_control, deadline=deadline),
+        "turning-points",
+        deadline,
+    )
+    return ai_response(TurningPointsOut, result)
+
+
 # ---------- Character ----------
 class CharacterOut(BaseModel):
-    id: str
+    id: ItemId
     name: str
     bio: Optional[str] = None
     goal: Optional[str] = None
@@ -214,6 +951,9 @@ class CharacterOut(BaseModel):
     iaLog: IALog
 
 
+CHARACTER_SCHEMA = output_schema(CharacterOut, exclude={"iaLog"})
+
+
 class CharacterIn(BaseModel):
     seed_name: str
     role: str
@@ -223,10 +963,15 @@ class CharacterIn(BaseModel):
     creative: bool = False
 
 
-@router.post("/character", response_model=CharacterOut)
-async def generate_character(
-    payload: CharacterIn, me: Annotated[UserPublic, Depends(get_current_user)]
-):
+async def run_character(
+    payload: CharacterIn,
+    owner_id: str,
+    session: AsyncSession,
+    client: OllamaClient,
+    deadline: Optional[float] = None,
+) -> CharacterOut:
+    # Se comprueba el guion antes de gastar una generación en él
+    await read_screenplay(session, payload.screenplay_id, owner_id)
     model = pick_scene_model(payload.creative)
     prompt = CHARACTER_PROMPT.format(
         seed_name=payload.seed_name,
@@ -234,10 +979,19 @@ async def generate_character(
         goal=payload.goal or "",
         conflict=payload.conflict or "",
     )
-    text, ia_log = await run_ai(model=model, prompt=prompt)
+    data, ia_log = await run_ai_json(
+        model,
+        prompt,
+        client=client,
+        schema=CHARACTER_SCHEMA,
+        output="character",
+        route="character",
+        owner_id=owner_id,
+        screenplay_id=payload.screenplay_id,
+        deadline=deadline,
+    )
     try:
-        data = json.loads(text)
-        return CharacterOut(**data, iaLog=ia_log)
+        out = CharacterOut(**data, iaLog=ia_log)
     except Exception:
         raise HTTPException(
             502,
@@ -246,16 +1000,46 @@ async def generate_character(
                 "iaLog": ia_log.model_dump(),
             },
         )
+    # INSERT de una fila al final de los personajes, sin reescribir el resto
+    out.id = await append_item(
+        session,
+        payload.screenplay_id,
+        owner_id,
+        "characters",
+        Character.model_validate(out.model_dump(exclude={"iaLog"})),
+    )
+    return out
+
+
+@router.post("/character", response_model=CharacterOut)
+async def generate_character(
+    payload: CharacterIn,
+    request: Request,
+    me: Annotated[UserPublic, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    ollama: OllamaDep,
+    deadline: AIDeadline = None,
+):
+    result = await until_disconnect(
+        request,
+        run_character(payload, me.id, session, ollama, deadline=deadline),
+        "character",
+        deadline,
+    )
+    return ai_response(CharacterOut, result)
 
 
 # ---------- Location ----------
 class LocationOut(BaseModel):
-    id: str
+    id: ItemId
     name: str
     details: Optional[str] = None
     iaLog: IALog
 
 
+LOCATION_SCHEMA = output_schema(LocationOut, exclude={"iaLog"})
+
+
 class LocationIn(BaseModel):
     seed_name: str
     genre: str
@@ -264,18 +1048,31 @@ class LocationIn(BaseModel):
     creative: bool = False
 
 
-@router.post("/location", response_model=LocationOut)
-async def generate_location(
-    payload: LocationIn, me: Annotated[UserPublic, Depends(get_current_user)]
-):
+async def run_location(
+    payload: LocationIn,
+    owner_id: str,
+    session: AsyncSession,
+    client: OllamaClient,
+    deadline: Optional[float] = None,
+) -> LocationOut:
+    await read_screenplay(session, payload.screenplay_id, owner_id)
     model = pick_scene_model(payload.creative)
     prompt = LOCATION_PROMPT.format(
         seed_name=payload.seed_name, genre=payload.genre, notes=payload.notes or ""
     )
-    text, ia_log = await run_ai(model=model, prompt=prompt)
+    data, ia_log = await run_ai_json(
+        model,
+        prompt,
+        client=client,
+        schema=LOCATION_SCHEMA,
+        output="location",
+        route="location",
+        owner_id=owner_id,
+        screenplay_id=payload.screenplay_id,
+        deadline=deadline,
+    )
     try:
-        data = json.loads(text)
-        return LocationOut(**data, iaLog=ia_log)
+        out = LocationOut(**data, iaLog=ia_log)
     except Exception:
         raise HTTPException(
             502,
@@ -284,6 +1081,32 @@ async def generate_location(
                 "iaLog": ia_log.model_dump(),
             },
         )
+    out.id = await append_item(
+        session,
+        payload.screenplay_id,
+        owner_id,
+        "locations",
+        Location.model_validate(out.model_dump(exclude={"iaLog"})),
+    )
+    return out
+
+
+@router.post("/location", response_model=LocationOut)
+async def generate_location(
+    payload: LocationIn,
+    request: Request,
+    me: Annotated[UserPublic, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    ollama: OllamaDep,
+    deadline: AIDeadline = None,
+):
+    result = await until_disconnect(
+        request,
+        run_location(payload, me.id, session, ollama, deadline=deadline),
+        "location",
+        deadline,
+    )
+    return ai_response(LocationOut, result)
 
 
 # ---------- Scene ----------
@@ -303,27 +1126,87 @@ class SceneOut(BaseModel):
     iaLog: IALog
 
 
-@router.post("/scene", response_model=SceneOut)
-async def generate_scene(
-    payload: SceneIn, me: Annotated[UserPublic, Depends(get_current_user)]
-):
-    model = pick_scene_model(payload.creative)
-    prompt = SCENE_PROMPT.format(
+def _scene_prompt(payload: SceneIn) -> str:
+    return SCENE_PROMPT.format(
         header=payload.header,
         context=payload.context,
         goal=payload.goal,
         style=payload.style or "Hollywood estándar",
         creative_level="alto" if payload.creative else "moderado",
     )
+
+
+async def run_scene(
+    payload: SceneIn,
+    owner_id: str,
+    session: Optional[AsyncSession],
+    client: OllamaClient,
+    cache_control: Optional[str] = None,
+    deadline: Optional[float] = None,
+) -> dict:
+    model = pick_scene_model(payload.creative)
+    prompt = _scene_prompt(payload)
     text, ia_log = await run_ai(
         model=model,
         prompt=prompt,
+        client=client,
+        route="scene",
+        owner_id=owner_id,
+        screenplay_id=payload.screenplay_id,
+        # El modo creativo busca variedad: nunca se cachea
+        cache_route=None if payload.creative else "scene",
+        cache_control=cache_control,
         temperature=payload.temperature,
         max_tokens=payload.max_tokens,
+        deadline=deadline,
     )
     return {"content": text.strip(), "iaLog": ia_log}
 
 
+@router.post("/scene", response_model=SceneOut)
+async def generate_scene(
+    payload: SceneIn,
+    request: Request,
+    me: Annotated[UserPublic, Depends(get_current_user)],
+    ollama: OllamaDep,
+    cache_control: CacheControl = None,
+    deadline: AIDeadline = None,
+):
+    result = await until_disconnect(
+        request,
+        run_scene(payload, me.id, None, ollama, cache_control, deadline=deadline),
+        "scene",
+        deadline,
+    )
+    return ai_response(SceneOut, result)
+
+
+@router.post("/scene/stream", response_class=StreamingResponse)
+async def stream_scene(
+    payload: SceneIn,
+    me: Annotated[UserPublic, Depends(get_current_user)],
+    ollama: OllamaDep,
+    last_event_id: LastEventId = None,
+    deadline: AIDeadline = None,
+):
+    resumed = resume_stream(last_event_id, me)
+    if resumed is not None:
+        return resumed
+    model = pick_scene_model(payload.creative)
+    return await stream_ai(
+        model,
+        _scene_prompt(payload),
+        client=ollama,
+        owner_id=me.id,
+        result_key="content",
+        route="scene/stream",
+        screenplay_id=payload.screenplay_id,
+        temperature=payload.temperature,
+        max_tokens=payload.max_tokens,
+        deadline=deadline,
+    )
+
+
 # ---------- Dialogue Polish ----------
 class DialogueIn(BaseModel):
     raw: str
@@ -336,14 +1219,86 @@ class DialogueOut(BaseModel):
     iaLog: IALog
 
 
+async def run_dialogue_polish(
+    payload: DialogueIn,
+    owner_id: str,
+    session: Optional[AsyncSession],
+    client: OllamaClient,
+    cache_control: Optional[str] = None,
+    deadline: Optional[float] = None,
+) -> dict:
+    model = pick_scene_model(payload.creative)
+    prompt = DIALOGUE_POLISH_PROMPT.format(raw=payload.raw)
+    cache_route = None if payload.creative else "dialogue"
+
+    async def generate() -> tuple[str, IALog]:
+        return await run_ai(
+            model=model,
+            prompt=prompt,
+            client=client,
+            route="dialogue",
+            owner_id=owner_id,
+            screenplay_id=payload.screenplay_id,
+            cache_route=cache_route,
+            cache_control=cache_control,
+            deadline=deadline,
+        )
+
+    text, ia_log = await run_ai_semantic(
+        model,
+        payload.raw,
+        generate,
+        client=client,
+        route="dialogue",
+        owner_id=owner_id,
+        screenplay_id=payload.screenplay_id,
+        cache_route=cache_route,
+        cache_control=cache_control,
+    )
+    return {"content": text.strip(), "iaLog": ia_log}
+
+
 @router.post("/dialogue/polish", response_model=DialogueOut)
 async def polish_dialogue(
-    payload: DialogueIn, me: Annotated[UserPublic, Depends(get_current_user)]
+    payload: DialogueIn,
+    request: Request,
+    me: Annotated[UserPublic, Depends(get_current_user)],
+    ollama: OllamaDep,
+    cache_control: CacheControl = None,
+    deadline: AIDeadline = None,
+):
+    result = await until_disconnect(
+        request,
+        run_dialogue_polish(payload, me.id, None, ollama, cache_control, deadline=deadline),
+        "dialogue",
+        deadline,
+    )
+    return ai_response(DialogueOut, result)
+
+
+@router.post("/dialogue/polish/stream", response_class=StreamingResponse)
+async def stream_polish_dialogue(
+    payload: DialogueIn,
+    me: Annotated[UserPublic, Depends(get_current_user)],
+    ollama: OllamaDep,
+    last_event_id: LastEventId = None,
+    deadline: AIDeadline = None,
 ):
+    resumed = resume_stream(last_event_id, me)
+    if resumed is not None:
+        return resumed
     model = pick_scene_model(payload.creative)
     prompt = DIALOGUE_POLISH_PROMPT.format(raw=payload.raw)
-    text, ia_log = await run_ai(model=model, prompt=prompt)
-    return {"content": text.strip(), "iaLog": ia_log}
+    return await stream_ai(
+        model,
+        prompt,
+        client=ollama,
+        owner_id=me.id,
+        result_key="content",
+        route="dialogue/stream",
+        screenplay_id=payload.screenplay_id,
+        deadline=deadline,
+    )
 
 
 # ---------- Review ----------
@@ -356,13 +1311,178 @@ class ReviewIn(BaseModel):
 class ReviewOut(BaseModel):
     report: str
     iaLog: IALog
+    # Solo en guiones largos (map-reduce por fragmentos)
+    chunks: Optional[ReviewChunksLog] = None
+
+
+async def review_chunks(
+    chunks: list[str],
+    *,
+    client: OllamaClient,
+    owner_id: Optional[str] = None,
+    screenplay_id: Optional[str] = None,
+    progress: Optional[Callable[[dict], Awaitable[None]]] = None,
+) -> tuple[list[str], ReviewChunksLog]:
+    """Fase map: notas de cada fragmento con el modelo de escenas.
+
+    Con `ai_cache_enabled` las notas se cachean por hash del fragmento: al
+    revisar un guion editado solo se regeneran los fragmentos que cambiaron.
+    `progress` recibe los contadores cada vez que termina un fragmento.
+    """
+    model = pick_scene_model(False)
+    start = perf_counter()
+    sem = asyncio.Semaphore(settings.ai_review_concurrency)
+    use_cache = settings.ai_cache_enabled
+    cached = 0
+    done = 0
+
+    async def notes_for(index: int) -> str:
+        nonlocal cached
+        prompt = chunk_prompt(chunks, index)
+        key = cache_key(model, chunk_cache_text(chunks[index]))
+        hit = (await generation_cache.get(key))[0] if use_cache else None
+        if hit is not None:
+            cached += 1
+            return hit
+        async with sem:
+            text, _ = await run_ai(
+                model,
+                prompt,
+                client=client,
+                route="review-chunk",
+                owner_id=owner_id,
+                screenplay_id=screenplay_id,
+            )
+        if use_cache:
+            await generation_cache.set(key, model, text, settings.ai_review_chunk_cache_ttl)
+        return text
+
+    async def tracked(index: int) -> str:
+        nonlocal done
+        text = await notes_for(index)
+        done += 1
+        if progress is not None:
+            await progress({"chunks": len(chunks), "done": done, "cached": cached})
+        return text
+
+    notes = await asyncio.gather(*(tracked(i) for i in range(len(chunks))))
+    log = ReviewChunksLog(
+        chunks=len(chunks),
+        cached=cached,
+        generated=len(chunks) - cached,
+        map_seconds=perf_counter() - start,
+    )
+    return list(notes), log
+
+
+async def review_prompt(
+    payload: ReviewIn,
+    owner_id: str,
+    client: OllamaClient,
+    progress: Optional[Callable[[dict], Awaitable[None]]] = None,
+) -> tuple[str, Optional[ReviewChunksLog]]:
+    """Prompt del informe: directo si el guion cabe en un fragmento; si no, map-reduce."""
+    chunks = split_script(payload.text)
+    if len(chunks) <= 1:
+        return REVIEW_PROMPT.format(text=payload.text), None
+    notes, log = await review_chunks(
+        chunks,
+        client=client,
+        owner_id=owner_id,
+        screenplay_id=payload.screenplay_id,
+        progress=progress,
+    )
+    return reduce_prompt(notes), log
+
+
+async def run_review(
+    payload: ReviewIn,
+    owner_id: str,
+    session: Optional[AsyncSession],
+    client: OllamaClient,
+    cache_control: Optional[str] = None,
+    deadline: Optional[float] = None,
+) -> dict:
+    model = pick_text_model(payload.screenwriter)
+    chunks_log = None
+
+    async def generate() -> tuple[str, IALog]:
+        nonlocal chunks_log
+        prompt, chunks_log = await review_prompt(payload, owner_id, client)
+        return await run_ai(
+            model=model,
+            prompt=prompt,
+            client=client,
+            route="review",
+            owner_id=owner_id,
+            screenplay_id=payload.screenplay_id,
+            cache_route="review",
+            cache_control=cache_control,
+            deadline=deadline,
+        )
+
+    # La caché semántica va antes del map: un acierto evita también los fragmentos
+    text, ia_log = await run_ai_semantic(
+        model,
+        payload.text,
+        generate,
+        client=client,
+        route="review",
+        owner_id=owner_id,
+        screenplay_id=payload.screenplay_id,
+        cache_route="review",
+        cache_control=cache_control,
+    )
+    return {"report": text.strip(), "iaLog": ia_log, "chunks": chunks_log}
 
 
 @router.post("/review", response_model=ReviewOut)
 async def review_script(
-    payload: ReviewIn, me: Annotated[UserPublic, Depends(get_current_user)]
+    payload: ReviewIn,
+    request: Request,
+    me: Annotated[UserPublic, Depends(get_current_user)],
+    ollama: OllamaDep,
+    cache_control: CacheControl = None,
+    deadline: AIDeadline = None,
 ):
+    result = await until_disconnect(
+        request,
+        run_review(payload, me.id, None, ollama, cache_control, deadline=deadline),
+        "review",
+        deadline,
+    )
+    return ai_response(ReviewOut, result)
+
+
+@router.post("/review/stream", response_class=StreamingResponse)
+async def stream_review_script(
+    payload: ReviewIn,
+    me: Annotated[UserPublic, Depends(get_current_user)],
+    ollama: OllamaDep,
+    last_event_id: LastEventId = None,
+    deadline: AIDeadline = None,
+):
+    resumed = resume_stream(last_event_id, me)
+    if resumed is not None:
+        return resumed
     model = pick_text_model(payload.screenwriter)
-    prompt = REVIEW_PROMPT.format(text=payload.text)
-    text, ia_log = await run_ai(model=model, prompt=prompt)
-    return {"report": text.strip(), "iaLog": ia_log}
+
+    async def map_then_reduce(stream: TokenStream) -> str:
+        # El map va dentro del stream (eventos `progress`); se transmite el reduce
+        text, _ = await review_prompt(payload, me.id, ollama, progress=stream.progress)
+        return text
+
+    if len(split_script(payload.text)) <= 1:
+        prompt = REVIEW_PROMPT.format(text=payload.text)
+    else:
+        prompt = map_then_reduce
+    return await stream_ai(
+        model,
+        prompt,
+        client=ollama,
+        owner_id=me.id,
+        result_key="report",
+        route="review/stream",
+        screenplay_id=payload.screenplay_id,
+        deadline=deadline,
+    )
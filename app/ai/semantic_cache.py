@@ -0,0 +1,229 @@
+"""Caché semántica (opt-in, `settings.ai_semantic_cache_enabled`).
+
+Para `dialogue` y `review`, donde es habitual reenviar casi el mismo texto
+(un espacio, una palabra cambiada), la caché exacta falla. Aquí se embebe el
+texto de entrada con el endpoint de embeddings de Ollama y se busca el vector
+más parecido ya respondido:
+
+- un índice por (usuario, ruta, modelo) con los vectores normalizados en una matriz
+  NumPy contigua (float32), de modo que la búsqueda es un único producto
+  matriz-vector (similitud coseno);
+- como mucho `ai_semantic_cache_max_entries` filas por índice; al llenarse se
+  reutiliza una fila caducada o, si no hay, la usada hace más tiempo;
+- hit si la similitud llega a `ai_semantic_cache_threshold`;
+- como mucho `ai_semantic_cache_max_indexes` índices; se expulsa el usado
+  hace más tiempo.
+
+El usuario forma parte de la clave: una respuesta nunca se sirve a otro
+usuario que envíe un texto parecido.
+
+Necesita `numpy` (extra `semantic`); sin él la caché queda desactivada.
+"""
+from __future__ import annotations
+
+import logging
+from collections import OrderedDict
+from time import monotonic
+from typing import Optional
+
+import httpx
+from pydantic import BaseModel
+
+from app.settings import settings
+from app.utils.metrics import counter, histogram
+from app.utils.ollama_client import OllamaClient, OllamaError
+
+from .cache import CachePolicy
+
+try:
+    import numpy as np
+except ImportError:  # extra opcional
+    np = None
+
+logger = logging.getLogger(__name__)
+
+semantic_lookups = counter(
+    "ai_semantic_cache_total", "Búsquedas en la caché semántica por resultado", ("route", "status")
+)
+semantic_similarity = histogram(
+    "ai_semantic_cache_similarity",
+    "Similitud coseno de los aciertos de la caché semántica",
+    ("route",),
+    buckets=(0.8, 0.85, 0.9, 0.93, 0.95, 0.97, 0.98, 0.99, 0.995, 1.0),
+)
+
+
+class SemanticLog(BaseModel):
+    status: str  # "hit" | "miss"
+    similarity: Optional[float] = None  # la mejor encontrada (también en un miss)
+    hits: int
+    misses: int
+    hit_rate: float
+
+
+class VectorIndex:
+    """Vectores unitarios en una matriz contigua con expulsión por tamaño."""
+
+    def __init__(self, dim: int, max_entries: int, initial: int = 64):
+        self.dim = dim
+        self.max_entries = max_entries
+        capacity = min(initial, max_entries)
+        self.matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self.expires = np.zeros(capacity, dtype=np.float64)
+        self.last_used = np.zeros(capacity, dtype=np.float64)
+        self.values: list[Optional[str]] = [None] * capacity
+        self.count = 0  # filas en uso (siempre las primeras)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def search(self, vector) -> tuple[Optional[int], float]:
+        """Fila más parecida a `vector` (no caducada) y su similitud."""
+        if not self.count:
+            return None, 0.0
+        scores = self.matrix[: self.count] @ vector
+        scores[self.expires[: self.count] <= monotonic()] = -1.0
+        row = int(np.argmax(scores))
+        best = float(scores[row])
+        if best < 0:
+            return None, 0.0
+        return row, best
+
+    def get(self, row: int) -> Optional[str]:
+        self.last_used[row] = monotonic()
+        return self.values[row]
+
+    def add(self, vector, value: str, ttl: float) -> None:
+        now = monotonic()
+        row = self._free_row(now)
+        self.matrix[row] = vector
+        self.expires[row] = now + ttl
+        self.last_used[row] = now
+        self.values[row] = value
+
+    def _free_row(self, now: float) -> int:
+        if self.count < len(self.values):
+            self.count += 1
+            return self.count - 1
+        if self.count < self.max_entries:
+            self._grow(min(self.count * 2, self.max_entries))
+            self.count += 1
+            return self.count - 1
+        expired = np.flatnonzero(self.expires <= now)
+        if expired.size:
+            return int(expired[0])
+        return int(np.argmin(self.last_used))
+
+    def _grow(self, capacity: int) -> None:
+        extra = capacity - len(self.values)
+        self.matrix = np.vstack([self.matrix, np.zeros((extra, self.dim), dtype=np.float32)])
+        self.expires = np.concatenate([self.expires, np.zeros(extra)])
+        self.last_used = np.concatenate([self.last_used, np.zeros(extra)])
+        self.values.extend([None] * extra)
+
+
+class SemanticCache:
+    def __init__(self):
+        self._indexes: OrderedDict[tuple[Optional[str], str, str], VectorIndex] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def policy(
+        self, route: Optional[str], cache_control: Optional[str] = None
+    ) -> Optional[CachePolicy]:
+        """Política para una ruta; None si esa ruta no usa la caché semántica."""
+        if not settings.ai_semantic_cache_enabled or np is None or route is None:
+            return None
+        ttl = settings.ai_semantic_cache_route_ttl.get(route)
+        if not ttl:
+            return None
+        directives = {d.strip().lower() for d in (cache_control or "").split(",")}
+        return CachePolicy(
+            ttl=ttl,
+            read="no-cache" not in directives and "no-store" not in directives,
+            write="no-store" not in directives,
+        )
+
+    async def embed(self, client: OllamaClient, text: str):
+        """Vector unitario de `text`; None si es demasiado largo o Ollama falla."""
+        if len(text) > settings.ai_semantic_cache_max_chars:
+            # Ollama truncaría el texto y dos guiones con el mismo inicio chocarían
+            return None
+        try:
+            vectors = await client.embed(settings.ai_embed_model, text)
+        except (OllamaError, httpx.HTTPError):
+            # La caché nunca debe romper una generación
+            logger.warning("No se pudo calcular el embedding", exc_info=True)
+            return None
+        if not vectors:
+            return None
+        vector = np.asarray(vectors[0], dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    def lookup(
+        self, owner_id: Optional[str], route: str, model: str, vector
+    ) -> tuple[Optional[str], float]:
+        """Respuesta cacheada más parecida si supera el umbral, y su similitud."""
+        key = (owner_id, route, model)
+        index = self._indexes.get(key)
+        row, similarity = None, 0.0
+        if index is not None and index.dim == vector.shape[0]:
+            self._indexes.move_to_end(key)
+            row, similarity = index.search(vector)
+        if row is not None and similarity >= settings.ai_semantic_cache_threshold:
+            self.hits += 1
+            semantic_lookups.labels(route, "hit").inc()
+            semantic_similarity.labels(route).observe(similarity)
+            return index.get(row), similarity
+        self.misses += 1
+        semantic_lookups.labels(route, "miss").inc()
+        return None, similarity
+
+    def store(
+        self, owner_id: Optional[str], route: str, model: str, vector, value: str, ttl: int
+    ) -> None:
+        key = (owner_id, route, model)
+        index = self._indexes.get(key)
+        if index is None or index.dim != vector.shape[0]:
+            # Primer uso o se cambió el modelo de embeddings
+            index = self._indexes[key] = VectorIndex(
+                vector.shape[0], settings.ai_semantic_cache_max_entries
+            )
+            while len(self._indexes) > settings.ai_semantic_cache_max_indexes:
+                self._indexes.popitem(last=False)
+        self._indexes.move_to_end(key)
+        index.add(vector, value, ttl)
+
+    def log(self, status: str, similarity: Optional[float]) -> SemanticLog:
+        return SemanticLog(
+            status=status,
+            similarity=similarity,
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hit_rate(),
+        )
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.ai_semantic_cache_enabled and np is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate(),
+            "indexes": len(self._indexes),
+            "entries": self._entries(),
+        }
+
+    def _entries(self) -> dict[str, int]:
+        # Totales por ruta y modelo, sin desglosar por usuario
+        entries: dict[str, int] = {}
+        for (_, route, model), index in self._indexes.items():
+            entries[f"{route}:{model}"] = entries.get(f"{route}:{model}", 0) + len(index)
+        return entries
+
+
+semantic_cache = SemanticCache()
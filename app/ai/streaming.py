@@ -0,0 +1,156 @@
+"""Buffers de tokens para las variantes SSE (`text/event-stream`) de /ai/*.
+
+La generación corre en una tarea propia que publica cada fragmento en un
+`TokenStream`; las respuestas HTTP solo leen de ese buffer. Así un cliente que
+se reconecta con `Last-Event-ID: <stream_id>:<seq>` retoma desde el último
+evento recibido sin relanzar la generación.
+
+Si el último lector se desconecta y nadie se reconecta en
+`ai_stream_orphan_grace` segundos, la generación se cancela (se cierra la
+conexión con Ollama y se libera la plaza en la cola del modelo).
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+from time import monotonic
+from typing import Any, AsyncIterator, Optional
+
+from app.settings import settings
+
+
+class TokenStream:
+    def __init__(self, owner_id: str, result_key: str):
+        self.id = uuid.uuid4().hex
+        self.owner_id = owner_id
+        # Clave del texto final en el evento `done` (content, report, treatment...)
+        self.result_key = result_key
+        # Eventos intermedios (evento, datos): tokens y progreso, en orden
+        self.entries: list[tuple[str, dict]] = []
+        self.result: Optional[dict] = None
+        # {status, detail}, como el `error` de los trabajos asíncronos
+        self.error: Optional[dict] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self.readers = 0
+        self._orphan_timer: Optional[asyncio.TimerHandle] = None
+        self._cond = asyncio.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    async def publish(self, token: str) -> None:
+        await self._append("token", {"t": token})
+
+    async def progress(self, data: dict) -> None:
+        """Evento `progress` antes de los tokens (p. ej. el map de la revisión)."""
+        await self._append("progress", data)
+
+    async def _append(self, event: str, data: dict) -> None:
+        async with self._cond:
+            self.entries.append((event, data))
+            self._cond.notify_all()
+
+    async def finish(self, result: dict) -> None:
+        async with self._cond:
+            self.result = result
+            self.finished_at = monotonic()
+            self._cond.notify_all()
+
+    async def fail(self, status: int, detail: Any) -> None:
+        async with self._cond:
+            self.error = {"status": status, "detail": detail}
+            self.finished_at = monotonic()
+            self._cond.notify_all()
+
+    async def events(self, start: int = 0) -> AsyncIterator[str]:
+        """Eventos SSE desde el evento `start` hasta el evento final."""
+        self._attach()
+        try:
+            i = start
+            while True:
+                async with self._cond:
+                    await self._cond.wait_for(lambda: i < len(self.entries) or self.finished)
+                    batch = self.entries[i:]
+                    finished = self.finished
+                for event, data in batch:
+                    yield sse_event(event, data, f"{self.id}:{i}")
+                    i += 1
+                if finished and i >= len(self.entries):
+                    break
+            final_id = f"{self.id}:{len(self.entries)}"
+            if self.error is not None:
+                yield sse_event("error", self.error, final_id)
+            else:
+                yield sse_event("done", self.result, final_id)
+        finally:
+            self._detach()
+
+    def _attach(self) -> None:
+        self.readers += 1
+        if self._orphan_timer is not None:
+            self._orphan_timer.cancel()
+            self._orphan_timer = None
+
+    def _detach(self) -> None:
+        self.readers -= 1
+        if self.readers == 0 and not self.finished and self.task is not None:
+            # Margen para reconectar con Last-Event-ID antes de cancelar
+            self._orphan_timer = asyncio.get_running_loop().call_later(
+                settings.ai_stream_orphan_grace, self._cancel_orphan
+            )
+
+    def _cancel_orphan(self) -> None:
+        self._orphan_timer = None
+        if self.readers == 0 and self.task is not None and not self.task.done():
+            self.task.cancel()
+
+
+class StreamRegistry:
+    """Streams activos o recién terminados, en memoria de este proceso."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._streams: dict[str, TokenStream] = {}
+
+    def create(self, owner_id: str, result_key: str) -> TokenStream:
+        self._purge()
+        stream = TokenStream(owner_id, result_key)
+        self._streams[stream.id] = stream
+        return stream
+
+    def get(self, stream_id: str, owner_id: str) -> Optional[TokenStream]:
+        self._purge()
+        stream = self._streams.get(stream_id)
+        if stream is None or stream.owner_id != owner_id:
+            return None
+        return stream
+
+    def _purge(self) -> None:
+        now = monotonic()
+        expired = [
+            sid
+            for sid, s in self._streams.items()
+            if s.finished and now - s.finished_at > self.ttl
+        ]
+        for sid in expired:
+            del self._streams[sid]
+
+
+streams = StreamRegistry(ttl=settings.ai_stream_buffer_ttl)
+
+
+def sse_event(event: str, data: dict, event_id: str) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[tuple[str, int]]:
+    """`<stream_id>:<seq>` -> (stream_id, seq); None si no es nuestro formato."""
+    if not value:
+        return None
+    stream_id, _, seq = value.rpartition(":")
+    if not stream_id or not seq.isdigit():
+        return None
+    return stream_id, int(seq)
@@ -0,0 +1,190 @@
+"""Telemetría de generaciones: tabla `ai_logs` y agregados para /ai/metrics.
+
+Las filas se acumulan en memoria y se insertan por lotes en segundo plano
+(`ai_logs_batch_size` filas o cada `ai_logs_flush_interval` segundos), de modo
+que registrar una generación no añade una escritura a la petición.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from sqlalchemy import case, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.database import get_session_factory
+from app.db.models import AILogEntry
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AILogWriter:
+    def __init__(self):
+        self.session_factory: Optional[async_sessionmaker] = None
+        self._buffer: list[dict[str, Any]] = []
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+
+    def start(self, session_factory: Optional[async_sessionmaker] = None) -> None:
+        self.session_factory = session_factory or get_session_factory()
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def record(self, **row: Any) -> None:
+        if not settings.ai_logs_enabled:
+            return
+        if len(self._buffer) >= settings.ai_logs_buffer_max:
+            # La base de datos no da abasto: mejor perder telemetría que memoria
+            self.dropped += 1
+            return
+        row.setdefault("created_at", datetime.now(timezone.utc))
+        self._buffer.append(row)
+        if len(self._buffer) >= settings.ai_logs_batch_size:
+            self._wake.set()
+
+    async def flush(self) -> None:
+        if not self._buffer or self.session_factory is None:
+            return
+        rows, self._buffer = self._buffer, []
+        try:
+            async with self.session_factory() as session:
+                await session.execute(insert(AILogEntry), rows)
+                await session.commit()
+        except Exception:
+            logger.warning("No se pudieron guardar %d filas en ai_logs", len(rows), exc_info=True)
+            self.dropped += len(rows)
+            return
+        self.written += len(rows)
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.ai_logs_flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {"pending": len(self._buffer), "written": self.written, "dropped": self.dropped}
+
+
+ai_log_writer = AILogWriter()
+
+
+# ---------- Agregados ----------
+def percentile(values: list[float], q: float) -> Optional[float]:
+    """Percentil `q` (0-100) con interpolación lineal; None si no hay datos."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+# Percentiles de /ai/metrics: nombre -> (columna, percentil)
+PERCENTILES = {
+    "latency_p50": (AILogEntry.latency, 50),
+    "latency_p95": (AILogEntry.latency, 95),
+    "ttft_p50": (AILogEntry.time_to_first_token, 50),
+    "ttft_p95": (AILogEntry.time_to_first_token, 95),
+    "queue_wait_p95": (AILogEntry.queue_wait, 95),
+}
+
+
+async def aggregate(session: AsyncSession, since: datetime, owner_id: str) -> list[dict]:
+    """Latencias p50/p95 y throughput por (modelo, ruta) desde `since`.
+
+    Solo cuenta las generaciones de `owner_id`. Todo se agrega en la BD; en
+    Postgres también los percentiles (percentile_cont). SQLite no lo tiene:
+    ahí se leen esas tres columnas y se calculan con `percentile`.
+    """
+    in_sql = session.get_bind().dialect.name == "postgresql"
+    where = (AILogEntry.created_at >= since, AILogEntry.owner_id == owner_id)
+    generated = AILogEntry.eval_count.is_not(None)
+    columns = [
+        AILogEntry.model,
+        AILogEntry.route,
+        func.count().label("requests"),
+        func.sum(case((AILogEntry.cache_status.like("hit%"), 1), else_=0)).label("cache_hits"),
+        func.sum(AILogEntry.eval_count).label("eval_tokens"),
+        func.sum(case((generated, AILogEntry.eval_duration))).label("eval_seconds"),
+    ]
+    if in_sql:
+        columns += [
+            func.percentile_cont(q / 100).within_group(column).label(name)
+            for name, (column, q) in PERCENTILES.items()
+        ]
+    rows = await session.execute(
+        select(*columns)
+        .where(*where)
+        .group_by(AILogEntry.model, AILogEntry.route)
+        .order_by(AILogEntry.model, AILogEntry.route)
+    )
+    groups = rows.all()
+
+    percentiles: dict[tuple[str, str], dict] = {}
+    if not in_sql and groups:
+        values: dict[tuple[str, str], dict[str, list[float]]] = defaultdict(lambda: defaultdict(list))
+        raw = await session.execute(
+            select(
+                AILogEntry.model,
+                AILogEntry.route,
+                AILogEntry.latency,
+                AILogEntry.time_to_first_token,
+                AILogEntry.queue_wait,
+            ).where(*where)
+        )
+        for model, route, *measures in raw.all():
+            for column, value in zip(
+                (AILogEntry.latency, AILogEntry.time_to_first_token, AILogEntry.queue_wait),
+                measures,
+            ):
+                if value is not None:
+                    values[(model, route)][column.key].append(value)
+        for key, by_column in values.items():
+            percentiles[key] = {
+                name: percentile(by_column[column.key], q)
+                for name, (column, q) in PERCENTILES.items()
+            }
+
+    window_minutes = max((datetime.now(timezone.utc) - since).total_seconds() / 60, 1e-9)
+    out = []
+    for row in groups:
+        eval_tokens = row.eval_tokens or 0
+        eval_seconds = row.eval_seconds or 0.0
+        stats = (
+            {name: getattr(row, name) for name in PERCENTILES}
+            if in_sql
+            else percentiles[(row.model, row.route)]
+        )
+        out.append(
+            {
+                "model": row.model,
+                "route": row.route,
+                "requests": row.requests,
+                "requests_per_minute": row.requests / window_minutes,
+                "cache_hits": row.cache_hits or 0,
+                **stats,
+                "eval_tokens": eval_tokens,
+                # Tokens generados por segundo de GPU (eval_duration de Ollama)
+                "tokens_per_second": eval_tokens / eval_seconds if eval_seconds else None,
+            }
+        )
+    return out
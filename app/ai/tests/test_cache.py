@@ -0,0 +1,93 @@
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.ai import cache as cache_module
+from app.ai.cache import GenerationCache, MemoryLRU, cache_key
+from app.ai.router import run_ai
+from app.db.models import Base
+from app.settings import settings
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = 0
+
+    async def generate(self, model, prompt, **kwargs):
+        self.calls += 1
+        return f"report {self.calls}"
+
+
+@pytest.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+def gen_cache(monkeypatch, session_factory):
+    cache = GenerationCache(MemoryLRU(max_bytes=10_000), db_enabled=True)
+    cache.session_factory = session_factory
+    monkeypatch.setattr(cache_module, "generation_cache", cache)
+    monkeypatch.setattr("app.ai.router.generation_cache", cache)
+    monkeypatch.setattr(settings, "ai_cache_enabled", True)
+    return cache
+
+
+def test_cache_key_depends_on_sampling_options():
+    base = cache_key("m", "p", 0.5, 100)
+    assert base == cache_key("m", "p", 0.5, 100)
+    assert base != cache_key("m", "p", 0.6, 100)
+    assert base != cache_key("m", "p", 0.5, 101)
+    assert base != cache_key("other", "p", 0.5, 100)
+
+
+def test_memory_lru_evicts_by_bytes_and_ttl():
+    lru = MemoryLRU(max_bytes=30)
+    lru.set("a", "x" * 10, ttl=60)
+    lru.set("b", "y" * 10, ttl=60)
+    assert lru.get("a") == "x" * 10  # "a" pasa a ser el más reciente
+    lru.set("c", "z" * 10, ttl=60)
+    assert lru.get("b") is None
+    assert lru.get("a") and lru.get("c")
+    assert lru.size <= 30
+
+    lru.set("d", "w", ttl=0)
+    assert lru.get("d") is None
+
+
+@pytest.mark.asyncio
+async def test_run_ai_hits_memory_then_db(gen_cache):
+    client = FakeClient()
+    text, log = await run_ai("m", "prompt", client=client, cache_route="review")
+    assert text == "report 1"
+    assert log.cache.status == "miss"
+
+    text, log = await run_ai("m", "prompt", client=client, cache_route="review")
+    assert text == "report 1"
+    assert log.cache.status == "hit-memory"
+    assert client.calls == 1
+
+    gen_cache.memory = MemoryLRU(max_bytes=10_000)
+    text, log = await run_ai("m", "prompt", client=client, cache_route="review")
+    assert text == "report 1"
+    assert log.cache.status == "hit-db"
+    assert (log.cache.hits, log.cache.misses) == (2, 1)
+
+
+@pytest.mark.asyncio
+async def test_no_cache_header_and_uncached_routes_bypass(gen_cache):
+    client = FakeClient()
+    await run_ai("m", "prompt", client=client, cache_route="review")
+
+    text, log = await run_ai(
+        "m", "prompt", client=client, cache_route="review", cache_control="no-cache"
+    )
+    assert text == "report 2"
+    assert log.cache.status == "bypass"
+
+    text, log = await run_ai("m", "prompt", client=client, cache_route=None)
+    assert text == "report 3"
+    assert log.cache is None
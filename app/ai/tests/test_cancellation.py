@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.ai import router as ai_router
+from app.ai.router import run_ai, until_disconnect
+from app.ai.streaming import TokenStream
+from app.settings import settings
+from app.utils.scheduler import GenerationScheduler
+
+
+class FakeRequest:
+    def __init__(self):
+        self.gone = asyncio.Event()
+
+    async def receive(self):
+        await self.gone.wait()
+        return {"type": "http.disconnect"}
+
+
+class SlowClient:
+    def __init__(self):
+        self.started = asyncio.Event()
+        self.cancelled = False
+
+    async def generate(self, model, prompt, **kwargs):
+        self.started.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return "never"
+
+
+@pytest.fixture
+def gates(monkeypatch):
+    gates = GenerationScheduler()
+    monkeypatch.setattr(ai_router, "scheduler", gates)
+    return gates
+
+
+def cancellations(route: str, reason: str) -> float:
+    return ai_router.ai_cancellations.labels(route, reason).value
+
+
+@pytest.mark.asyncio
+async def test_disconnect_cancels_generation_and_frees_slot(gates):
+    request, client = FakeRequest(), SlowClient()
+    before = cancellations("dialogue", "disconnect")
+    work = run_ai("m", "p", client=client, route="dialogue")
+    pending = asyncio.create_task(until_disconnect(request, work, "dialogue"))
+    await client.started.wait()
+    assert gates.gate("m").active == 1
+
+    request.gone.set()
+    with pytest.raises(HTTPException) as exc:
+        await pending
+    assert exc.value.status_code == 499
+    assert client.cancelled
+    assert gates.gate("m").active == 0
+    assert cancellations("dialogue", "disconnect") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_deadline_cancels_generation(gates):
+    client = SlowClient()
+    before = cancellations("scene", "deadline")
+    work = run_ai("m", "p", client=client, route="scene")
+    with pytest.raises(HTTPException) as exc:
+        await until_disconnect(FakeRequest(), work, "scene", deadline=0.05)
+    assert exc.value.status_code == 504
+    assert client.cancelled
+    assert gates.gate("m").active == 0
+    assert cancellations("scene", "deadline") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_orphaned_stream_is_cancelled_after_grace(monkeypatch):
+    monkeypatch.setattr(settings, "ai_stream_orphan_grace", 0.01)
+    stream = TokenStream("u1", "content")
+    stream.task = asyncio.create_task(asyncio.sleep(60))
+    await stream.publish("hola")
+
+    events = stream.events()
+    assert "hola" in await events.__anext__()
+    await events.aclose()
+    assert stream.readers == 0
+    await asyncio.sleep(0.05)
+    assert stream.task.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_reconnecting_reader_keeps_stream_alive(monkeypatch):
+    monkeypatch.setattr(settings, "ai_stream_orphan_grace", 0.05)
+    stream = TokenStream("u1", "content")
+    stream.task = asyncio.create_task(asyncio.sleep(60))
+    await stream.publish("hola")
+
+    first = stream.events()
+    await first.__anext__()
+    await first.aclose()
+    second = stream.events(1)
+    waiting = asyncio.create_task(second.__anext__())
+    await asyncio.sleep(0.1)
+    assert not stream.task.done()
+    waiting.cancel()
+    stream.task.cancel()
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.models import Base, Project, Screenplay
+from app.testing.fake_ollama import FakeOllama, ModelProfile
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    # Fichero (no :memory:) para tener un pool real con checkouts medibles
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def screenplay(session_factory, user):
+    async with session_factory() as s:
+        project = Project(name="Proj", owner_id=user.id)
+        s.add(project)
+        await s.flush()
+        sp = Screenplay(
+            project_id=project.id,
+            owner_id=user.id,
+            title="Script",
+            synopsis="Una farera vuelve al pueblo.",
+            turning_points=[],
+            characters=[],
+            subplots=[],
+            locations=[],
+            scenes=[],
+        )
+        s.add(sp)
+        await s.commit()
+    return sp
+
+
+async def generating(fake: FakeOllama) -> None:
+    while not fake.in_flight:
+        await asyncio.sleep(0.01)
+
+
+async def test_no_connection_checked_out_while_generating(
+    client, engine, session_factory, screenplay, fake_ollama: FakeOllama
+):
+    fake_ollama.default = ModelProfile(latency=0.3)
+    pool = engine.sync_engine.pool
+    request = asyncio.create_task(
+        client.post("/ai/treatment", json={"logline": "Un faro", "screenplay_id": screenplay.id})
+    )
+    await generating(fake_ollama)
+    assert pool.checkedout() == 0
+
+    r = await request
+    assert r.status_code == 200, r.text
+    async with session_factory() as s:
+        sp = await s.get(Screenplay, screenplay.id)
+    assert sp.treatment == r.json()["treatment"]
+
+
+async def test_concurrent_edit_is_detected(
+    client, session_factory, screenplay, fake_ollama: FakeOllama
+):
+    fake_ollama.default = ModelProfile(latency=0.3)
+    request = asyncio.create_task(
+        client.post("/ai/treatment", json={"logline": "Un faro", "screenplay_id": screenplay.id})
+    )
+    await generating(fake_ollama)
+    async with session_factory() as s:
+        sp = await s.get(Screenplay, screenplay.id)
+        sp.synopsis = "Otra sinopsis escrita a mano."
+        await s.commit()
+
+    r = await request
+    assert r.status_code == 409
+    assert r.json()["detail"]["treatment"]
+    async with session_factory() as s:
+        sp = await s.get(Screenplay, screenplay.id)
+    assert sp.treatment is None
+    assert sp.synopsis == "Otra sinopsis escrita a mano."
@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.ai.jobs import job_manager
+from app.db.models import AIJob, Project, Screenplay
+
+
+@pytest.fixture
+async def client(client, monkeypatch):
+    async def fake_generate(self, model, prompt, **kwargs):
+        return "JOB TREATMENT"
+
+    monkeypatch.setattr("app.utils.ollama_client.OllamaClient.generate", fake_generate)
+    yield client
+    await job_manager.stop()
+
+
+async def create_screenplay(session, user, **fields):
+    project = Project(name="Proj", owner_id=user.id)
+    session.add(project)
+    await session.commit()
+    screenplay = Screenplay(
+        project_id=project.id, owner_id=user.id, title="Script", **fields
+    )
+    session.add(screenplay)
+    await session.commit()
+    return screenplay
+
+
+@pytest.mark.asyncio
+async def test_treatment_job_runs_and_persists(client, session):
+    screenplay = await create_screenplay(session, client.user, synopsis="syn")
+
+    resp = await client.post(
+        "/ai/jobs",
+        json={
+            "kind": "treatment",
+            "payload": {"logline": "line", "screenplay_id": screenplay.id},
+        },
+    )
+    assert resp.status_code == 202
+    job = resp.json()
+    assert job["status"] == "queued"
+    assert job["screenplay_id"] == screenplay.id
+
+    resp = await client.get(f"/ai/jobs/{job['id']}", params={"wait": 5})
+    assert resp.status_code == 200
+    job = resp.json()
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"treatment": "JOB TREATMENT"}
+    assert job["iaLog"]["original_message"] == "JOB TREATMENT"
+
+    await session.refresh(screenplay)
+    assert screenplay.treatment == "JOB TREATMENT"
+
+    resp = await client.get(f"/ai/jobs/{job['id']}/events")
+    assert "event: done" in resp.text
+
+
+@pytest.mark.asyncio
+async def test_job_failure_is_recorded(client, session):
+    screenplay = await create_screenplay(session, client.user)  # sin sinopsis
+
+    resp = await client.post(
+        "/ai/jobs",
+        json={
+            "kind": "treatment",
+            "payload": {"logline": "line", "screenplay_id": screenplay.id},
+        },
+    )
+    job_id = resp.json()["id"]
+    job = (await client.get(f"/ai/jobs/{job_id}", params={"wait": 5})).json()
+    assert job["status"] == "failed"
+    assert job["error"] == {"status": 404, "detail": "Screenplay missing synopsis."}
+
+
+@pytest.mark.asyncio
+async def test_job_rejects_foreign_screenplay(client):
+    resp = await client.post(
+        "/ai/jobs",
+        json={
+            "kind": "treatment",
+            "payload": {"logline": "line", "screenplay_id": "missing"},
+        },
+    )
+    assert resp.status_code == 404
+    resp = await client.post(
+        "/ai/jobs", json={"kind": "treatment", "payload": {"logline": "x"}}
+    )
+    assert resp.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_stale_running_job_is_failed(client, session):
+    started = datetime.now(timezone.utc) - timedelta(hours=2)
+    job = AIJob(
+        owner_id=client.user.id,
+        kind="review",
+        status="running",
+        payload={},
+        started_at=started,
+    )
+    session.add(job)
+    await session.commit()
+
+    resp = await client.get(f"/ai/jobs/{job.id}/events")
+    assert "event: done" in resp.text
+    job = (await client.get(f"/ai/jobs/{job.id}")).json()
+    assert job["status"] == "failed"
+    assert job["error"]["status"] == 503
+
+
+@pytest.mark.asyncio
+async def test_job_priority_is_bounded(client):
+    resp = await client.post(
+        "/ai/jobs",
+        json={"kind": "review", "payload": {"text": "x"}, "priority": 1000},
+    )
+    assert resp.status_code == 422
+    assert resp.json()["detail"][0]["loc"] == ["body", "priority"]
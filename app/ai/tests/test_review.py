@@ -0,0 +1,123 @@
+import json
+
+import pytest
+
+from app.ai.cache import GenerationCache, MemoryLRU
+from app.ai.review import split_scenes, split_script
+from app.ai.router import ReviewIn, run_review
+from app.ai.telemetry import ai_log_writer
+from app.main import app
+from app.settings import settings
+from app.utils.ollama_client import get_ollama_client
+
+
+def scene(n: int, body: str = "Diálogo y acción de la escena.") -> str:
+    return f"INT. CASA {n} - NOCHE\n\n{body}\n\n"
+
+
+SCRIPT = "".join(scene(n) for n in range(40))
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls: list[tuple[str, str]] = []
+
+    async def generate(self, model, prompt, **kwargs):
+        self.calls.append((model, prompt))
+        return f"notas {len(self.calls)}"
+
+    async def stream_generate(self, model, prompt, **kwargs):
+        self.calls.append((model, prompt))
+        yield "informe"
+
+
+@pytest.fixture(autouse=True)
+def review_setup(monkeypatch):
+    cache = GenerationCache(MemoryLRU(max_bytes=1_000_000), db_enabled=False)
+    monkeypatch.setattr("app.ai.router.generation_cache", cache)
+    monkeypatch.setattr(settings, "ai_cache_enabled", True)
+    monkeypatch.setattr(settings, "ai_review_chunk_chars", 200)
+    monkeypatch.setattr(ai_log_writer, "_buffer", [])
+
+
+def test_split_script_cuts_at_scene_headings():
+    assert len(split_scenes(SCRIPT)) == 40
+    chunks = split_script(SCRIPT)
+    assert len(chunks) > 1
+    assert "".join(chunks) == SCRIPT
+    assert all(len(c) <= 200 for c in chunks)
+    assert all(c.startswith("INT. CASA") for c in chunks)
+
+
+def test_split_script_is_stable_around_an_edit():
+    before = split_script(SCRIPT)
+    after = split_script(SCRIPT.replace(scene(20), scene(20, "Texto reescrito de la escena.")))
+    # Solo cambian uno o dos fragmentos alrededor de la escena editada
+    assert len(set(after) - set(before)) <= 2
+
+
+def test_split_script_splits_oversized_scene():
+    chunks = split_script(scene(1, "palabra " * 100))
+    assert len(chunks) > 1
+    assert all(len(c) <= 200 for c in chunks)
+
+
+@pytest.mark.asyncio
+async def test_short_script_uses_single_call():
+    client = FakeClient()
+    result = await run_review(ReviewIn(text=scene(1), screenplay_id="sp1"), "u1", None, client)
+    assert result["chunks"] is None
+    assert len(client.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_long_script_is_mapped_and_reduced():
+    client = FakeClient()
+    payload = ReviewIn(text=SCRIPT, screenplay_id="sp1")
+    result = await run_review(payload, "u1", None, client)
+
+    n = len(split_script(SCRIPT))
+    log = result["chunks"]
+    assert (log.chunks, log.cached, log.generated) == (n, 0, n)
+    assert len(client.calls) == n + 1
+    map_models = {model for model, _ in client.calls[:-1]}
+    assert map_models == {settings.ai_text_scene_default}
+    reduce_model, reduce_prompt = client.calls[-1]
+    assert reduce_model == settings.ai_text_screenwriter
+    assert "### Fragmento 1" in reduce_prompt
+
+    # Editar una escena solo regenera los fragmentos afectados
+    client.calls.clear()
+    edited = SCRIPT.replace(scene(20), scene(20, "Texto reescrito de la escena."))
+    result = await run_review(ReviewIn(text=edited, screenplay_id="sp1"), "u1", None, client)
+    log = result["chunks"]
+    assert 1 <= log.generated <= 2
+    assert log.cached == log.chunks - log.generated
+    assert len(client.calls) == log.generated + 1
+
+
+@pytest.mark.asyncio
+async def test_chunk_notes_are_not_cached_with_cache_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "ai_cache_enabled", False)
+    client = FakeClient()
+    payload = ReviewIn(text=SCRIPT, screenplay_id="sp1")
+    await run_review(payload, "u1", None, client)
+    result = await run_review(payload, "u1", None, client)
+    assert result["chunks"].cached == 0
+    assert len(client.calls) == 2 * (len(split_script(SCRIPT)) + 1)
+
+
+@pytest.mark.asyncio
+async def test_review_stream_reports_map_progress(client):
+    fake = FakeClient()
+    app.dependency_overrides[get_ollama_client] = lambda: fake
+    resp = await client.post("/ai/review/stream", json={"text": SCRIPT, "screenplay_id": "sp1"})
+    events = [
+        dict(line.split(": ", 1) for line in block.splitlines())
+        for block in resp.text.strip().split("\n\n")
+    ]
+    n = len(split_script(SCRIPT))
+    # El progreso del map llega antes que el primer token del informe
+    assert [e["event"] for e in events] == ["progress"] * n + ["token", "done"]
+    assert [json.loads(e["data"])["done"] for e in events[:n]] == list(range(1, n + 1))
+    assert json.loads(events[-1]["data"])["report"] == "informe"
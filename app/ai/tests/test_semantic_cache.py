@@ -0,0 +1,101 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+
+from app.ai import router as router_module
+from app.ai.router import DialogueIn, run_dialogue_polish
+from app.ai.semantic_cache import SemanticCache, VectorIndex
+from app.settings import settings
+
+
+class FakeClient:
+    """Embeddings por bolsa de letras: textos casi iguales -> vectores casi iguales."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def embed(self, model, input):
+        vector = [0.0] * 26
+        for ch in input.lower():
+            if "a" <= ch <= "z":
+                vector[ord(ch) - ord("a")] += 1
+        return [vector]
+
+    async def generate(self, model, prompt, **kwargs):
+        self.calls += 1
+        return f"pulido {self.calls}"
+
+
+@pytest.fixture
+def sem_cache(monkeypatch):
+    cache = SemanticCache()
+    monkeypatch.setattr(router_module, "semantic_cache", cache)
+    monkeypatch.setattr(settings, "ai_semantic_cache_enabled", True)
+    monkeypatch.setattr(settings, "ai_cache_enabled", False)
+    monkeypatch.setattr(settings, "ai_semantic_cache_threshold", 0.98)
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_near_duplicate_dialogue_hits(sem_cache):
+    client = FakeClient()
+    raw = "JUAN: No pienso volver a ese pueblo nunca más."
+    first = await run_dialogue_polish(
+        DialogueIn(raw=raw, screenplay_id="sp"), "u1", None, client
+    )
+    assert first["content"] == "pulido 1"
+    assert first["iaLog"].semantic.status == "miss"
+
+    second = await run_dialogue_polish(
+        DialogueIn(raw=raw.replace("  ", " ") + "  ", screenplay_id="sp"), "u1", None, client
+    )
+    assert second["content"] == "pulido 1"
+    assert second["iaLog"].semantic.status == "hit"
+    assert second["iaLog"].semantic.similarity >= 0.98
+    assert second["iaLog"].semantic.hit_rate == 0.5
+    assert client.calls == 1
+
+    other = await run_dialogue_polish(
+        DialogueIn(raw="MARTA: ¿Quién ha dejado la puerta abierta?", screenplay_id="sp"),
+        "u1",
+        None,
+        client,
+    )
+    assert other["iaLog"].semantic.status == "miss"
+    assert client.calls == 2
+
+    # Otro usuario con el mismo texto no recibe la respuesta del primero
+    foreign = await run_dialogue_polish(DialogueIn(raw=raw, screenplay_id="sp"), "u2", None, client)
+    assert foreign["iaLog"].semantic.status == "miss"
+    assert client.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_creative_and_no_cache_skip_semantic_lookup(sem_cache):
+    client = FakeClient()
+    payload = DialogueIn(raw="JUAN: Hola.", screenplay_id="sp", creative=True)
+    out = await run_dialogue_polish(payload, "u1", None, client)
+    assert out["iaLog"].semantic is None
+
+    payload = DialogueIn(raw="JUAN: Hola.", screenplay_id="sp")
+    await run_dialogue_polish(payload, "u1", None, client)
+    out = await run_dialogue_polish(payload, "u1", None, client, cache_control="no-cache")
+    assert out["iaLog"].semantic is None
+    assert client.calls == 3
+
+
+def test_vector_index_is_size_bounded_and_evicts_lru():
+    index = VectorIndex(dim=2, max_entries=3, initial=1)
+    rows = [np.array(v, dtype=np.float32) for v in ([1, 0], [0, 1], [0.6, 0.8])]
+    for i, vector in enumerate(rows):
+        index.add(vector, f"v{i}", ttl=60)
+    assert len(index) == 3 and index.matrix.shape == (3, 2)
+
+    row, score = index.search(rows[0])
+    assert index.get(row) == "v0" and score == pytest.approx(1.0)
+    index.get(index.search(rows[2])[0])
+    # v1 es la menos usada: su fila se reutiliza
+    index.add(np.array([-1, 0], dtype=np.float32), "v3", ttl=60)
+    assert len(index) == 3
+    assert "v1" not in index.values
@@ -0,0 +1,130 @@
+import json
+
+import pytest
+
+from app.db.models import Project, Screenplay
+
+
+@pytest.fixture
+def client(client, monkeypatch):
+    async def fake_stream_generate(self, model, prompt, **kwargs):
+        for chunk in ["Hola", " mundo", "\n"]:
+            yield chunk
+
+    monkeypatch.setattr(
+        "app.utils.ollama_client.OllamaClient.stream_generate", fake_stream_generate
+    )
+    return client
+
+
+def parse_sse(body: str) -> list[dict]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append(
+            {"id": fields["id"], "event": fields["event"], "data": json.loads(fields["data"])}
+        )
+    return events
+
+
+SCENE_PAYLOAD = {
+    "header": "INT. CASA - NOCHE",
+    "context": "ctx",
+    "goal": "goal",
+    "screenplay_id": "sp",
+}
+
+
+@pytest.mark.asyncio
+async def test_scene_stream_sends_tokens_then_ialog(client):
+    resp = await client.post("/ai/scene/stream", json=SCENE_PAYLOAD)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+
+    events = parse_sse(resp.text)
+    assert [e["event"] for e in events] == ["token", "token", "token", "done"]
+    assert [e["data"]["t"] for e in events[:3]] == ["Hola", " mundo", "\n"]
+    done = events[-1]["data"]
+    assert done["content"] == "Hola mundo"
+    assert done["iaLog"]["original_message"] == "Hola mundo\n"
+
+
+@pytest.mark.asyncio
+async def test_stream_resumes_from_last_event_id(client):
+    resp = await client.post("/ai/scene/stream", json=SCENE_PAYLOAD)
+    first_token_id = parse_sse(resp.text)[0]["id"]
+
+    resp = await client.post(
+        "/ai/scene/stream",
+        json=SCENE_PAYLOAD,
+        headers={"Last-Event-ID": first_token_id},
+    )
+    assert resp.status_code == 200
+    events = parse_sse(resp.text)
+    assert [e["event"] for e in events] == ["token", "token", "done"]
+    assert events[0]["data"]["t"] == " mundo"
+
+    resp = await client.post(
+        "/ai/scene/stream",
+        json=SCENE_PAYLOAD,
+        headers={"Last-Event-ID": "unknown:3"},
+    )
+    assert resp.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_treatment_stream_persists_final_text(client, session):
+    project = Project(name="Proj", owner_id=client.user.id)
+    session.add(project)
+    await session.commit()
+    screenplay = Screenplay(
+        project_id=project.id, owner_id=client.user.id, title="Script", synopsis="syn"
+    )
+    session.add(screenplay)
+    await session.commit()
+
+    resp = await client.post(
+        "/ai/treatment/stream",
+        json={"logline": "line", "screenplay_id": screenplay.id},
+    )
+    assert resp.status_code == 200
+    assert parse_sse(resp.text)[-1]["data"]["treatment"] == "Hola mundo"
+
+    await session.refresh(screenplay)
+    assert screenplay.treatment == "Hola mundo"
+
+
+@pytest.mark.asyncio
+async def test_treatment_stream_reports_conflict_as_error_event(
+    client, session, session_factory, monkeypatch
+):
+    project = Project(name="Proj", owner_id=client.user.id)
+    session.add(project)
+    await session.commit()
+    screenplay = Screenplay(
+        project_id=project.id, owner_id=client.user.id, title="Script", synopsis="syn"
+    )
+    session.add(screenplay)
+    await session.commit()
+
+    async def editing_stream_generate(self, model, prompt, **kwargs):
+        # Otra petición cambia la sinopsis mientras se genera
+        async with session_factory() as s:
+            sp = await s.get(Screenplay, screenplay.id)
+            sp.synopsis = "otra sinopsis"
+            await s.commit()
+        yield "Hola"
+
+    monkeypatch.setattr(
+        "app.utils.ollama_client.OllamaClient.stream_generate", editing_stream_generate
+    )
+    resp = await client.post(
+        "/ai/treatment/stream",
+        json={"logline": "line", "screenplay_id": screenplay.id},
+    )
+    error = parse_sse(resp.text)[-1]
+    assert error["event"] == "error"
+    assert error["data"] == {
+        "status": 409,
+        "detail": {"error": "Screenplay changed during generation."},
+    }
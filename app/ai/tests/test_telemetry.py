@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy import select
+
+from app.ai.telemetry import ai_log_writer, percentile
+from app.db.models import AILogEntry
+from app.settings import settings
+from app.utils.ollama_client import GenerationMetrics
+
+
+@pytest.fixture
+def client(client, session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "ai_logs_enabled", True)
+    monkeypatch.setattr(ai_log_writer, "_buffer", [])
+    monkeypatch.setattr(ai_log_writer, "session_factory", session_factory)
+
+    async def fake_generate(self, model, prompt, metrics=None, **kwargs):
+        # Lo que devolvería Ollama al final de la generación (nanosegundos)
+        metrics.update_from(
+            {
+                "prompt_eval_count": 40,
+                "eval_count": 200,
+                "load_duration": 500_000_000,
+                "prompt_eval_duration": 250_000_000,
+                "eval_duration": 4_000_000_000,
+            }
+        )
+        return "REPORT"
+
+    monkeypatch.setattr("app.utils.ollama_client.OllamaClient.generate", fake_generate)
+    return client
+
+
+def test_metrics_are_derived_from_ollama_counters():
+    metrics = GenerationMetrics()
+    metrics.update_from(
+        {"eval_count": 100, "eval_duration": 2e9, "load_duration": 1e9, "prompt_eval_duration": 5e8}
+    )
+    assert metrics.tokens_per_second == 50
+    assert metrics.time_to_first_token == 1.5
+
+
+def test_percentile_interpolates():
+    assert percentile([], 50) is None
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile([10], 95) == 10
+
+
+@pytest.mark.asyncio
+async def test_generation_is_logged_and_aggregated(client, session):
+    for _ in range(2):
+        resp = await client.post("/ai/review", json={"text": "INT. CASA", "screenplay_id": "sp1"})
+        assert resp.status_code == 200
+    ia_log = resp.json()["iaLog"]
+    assert ia_log["metrics"]["eval_count"] == 200
+    assert ia_log["metrics"]["tokens_per_second"] == 50
+    assert ia_log["queue_wait"] >= 0
+
+    # Las generaciones de otros usuarios no cuentan
+    session.add(AILogEntry(route="review", model=ia_log["model"], owner_id="other", latency=99.0))
+    await session.commit()
+
+    resp = await client.get("/ai/metrics", params={"hours": 1})
+    assert resp.status_code == 200
+    (group,) = resp.json()["groups"]
+    assert group["route"] == "review"
+    assert group["requests"] == 2
+    assert group["eval_tokens"] == 400
+    assert group["tokens_per_second"] == 50
+    assert group["ttft_p95"] == pytest.approx(0.75)
+
+    rows = (
+        await session.execute(select(AILogEntry).where(AILogEntry.owner_id != "other"))
+    ).scalars().all()
+    assert {(r.owner_id, r.screenplay_id) for r in rows} == {(client.user.id, "sp1")}
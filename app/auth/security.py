@@ -72,6 +72,9 @@ async def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token."
         )
     user = await session.scalar(select(User).where(User.id == sub))
+    # La sesión es la misma que recibe el handler: cerramos esta transacción
+    # de lectura para no retener la conexión (p. ej. mientras se llama a Ollama)
+    await session.commit()
     if not user:
         raise HTTPException(status_code=401, detail="Invalid token.")
     return UserPublic(id=user.id, email=user.email, full_name=user.full_name)
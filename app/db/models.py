@@ -2,12 +2,27 @@ from __future__ import annotations
 
 import uuid
 from datetime import datetime
-from sqlalchemy import String, Text, ForeignKey, func
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Float,
+    ForeignKey,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    UniqueConstraint,
+    func,
+)
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy.sql.sqltypes import DateTime
 
 
+# JSONB en Postgres; JSON genérico en SQLite (tests)
+JSONType = JSONB().with_variant(JSON(), "sqlite")
+
+
 def gen_uuid() -> str:
     return str(uuid.uuid4())
 
@@ -69,12 +84,8 @@ class Screenplay(Base):
     state: Mapped[str] = mapped_column(String(16), default="S1")
 
     turning_points: Mapped[list[dict]] = mapped_column(
-        JSONB, default=list
+        JSONType, default=list
     )  # guardamos listas como JSONB
-    characters: Mapped[list[dict]] = mapped_column(JSONB, default=list)
-    subplots: Mapped[list[dict]] = mapped_column(JSONB, default=list)
-    locations: Mapped[list[dict]] = mapped_column(JSONB, default=list)
-    scenes: Mapped[list[dict]] = mapped_column(JSONB, default=list)
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
@@ -84,3 +95,177 @@ class Screenplay(Base):
     )
 
     owner: Mapped["User"] = relationship(back_populates="screenplays")
+
+    # Colecciones en tablas hijas (una fila por elemento). lazy="raise": en
+    # async no hay carga implícita; quien las necesite usa selectinload
+    characters: Mapped[list["ScreenplayCharacter"]] = relationship(
+        order_by="ScreenplayCharacter.position",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise",
+    )
+    subplots: Mapped[list["ScreenplaySubplot"]] = relationship(
+        order_by="ScreenplaySubplot.position",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise",
+    )
+    locations: Mapped[list["ScreenplayLocation"]] = relationship(
+        order_by="ScreenplayLocation.position",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise",
+    )
+    scenes: Mapped[list["ScreenplayScene"]] = relationship(
+        order_by="ScreenplayScene.position",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise",
+    )
+
+
+# Longitud máxima del id de un elemento del guion (escena, personaje...)
+ITEM_ID_LENGTH = 100
+
+
+class ScreenplayItem:
+    """Columnas comunes de los elementos de un guion.
+
+    `id` es el que asigna el cliente (único dentro del guion) y `position` el
+    orden en la lista; se admiten huecos tras un borrado.
+    """
+
+    screenplay_id: Mapped[str] = mapped_column(
+        ForeignKey("screenplays.id", ondelete="CASCADE"), primary_key=True
+    )
+    id: Mapped[str] = mapped_column(String(ITEM_ID_LENGTH), primary_key=True)
+    position: Mapped[int] = mapped_column(Integer)
+
+
+class ScreenplayCharacter(ScreenplayItem, Base):
+    __tablename__ = "screenplay_characters"
+    name: Mapped[str] = mapped_column(Text)
+    bio: Mapped[str | None] = mapped_column(Text, nullable=True)
+    goal: Mapped[str | None] = mapped_column(Text, nullable=True)
+    conflict: Mapped[str | None] = mapped_column(Text, nullable=True)
+    arc: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+
+class ScreenplaySubplot(ScreenplayItem, Base):
+    __tablename__ = "screenplay_subplots"
+    logline: Mapped[str] = mapped_column(Text)
+    relevance: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+
+class ScreenplayLocation(ScreenplayItem, Base):
+    __tablename__ = "screenplay_locations"
+    name: Mapped[str] = mapped_column(Text)
+    details: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+
+class ScreenplayScene(ScreenplayItem, Base):
+    __tablename__ = "screenplay_scenes"
+    header: Mapped[str] = mapped_column(Text)
+    content: Mapped[str] = mapped_column(Text)
+    order: Mapped[int] = mapped_column(Integer)
+
+
+class AICacheEntry(Base):
+    """Nivel 2 (compartido) de la caché de generaciones de app.ai.cache."""
+
+    __tablename__ = "ai_cache"
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    model: Mapped[str] = mapped_column(String(100))
+    text: Mapped[str] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+
+
+class AIJob(Base):
+    """Generación asíncrona encolada vía POST /ai/jobs (app.ai.jobs)."""
+
+    __tablename__ = "ai_jobs"
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=gen_uuid)
+    owner_id: Mapped[str] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), index=True
+    )
+    screenplay_id: Mapped[str | None] = mapped_column(
+        ForeignKey("screenplays.id", ondelete="CASCADE"), nullable=True, index=True
+    )
+    kind: Mapped[str] = mapped_column(String(32))
+    status: Mapped[str] = mapped_column(String(16), default="queued", index=True)
+    priority: Mapped[int] = mapped_column(default=0)
+    payload: Mapped[dict] = mapped_column(JSONType)
+    result: Mapped[dict | None] = mapped_column(JSONType, nullable=True)
+    ia_log: Mapped[dict | None] = mapped_column(JSONType, nullable=True)
+    error: Mapped[dict | None] = mapped_column(JSONType, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    started_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    finished_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+
+class AILogEntry(Base):
+    """Telemetría de cada generación (app.ai.telemetry)."""
+
+    __tablename__ = "ai_logs"
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=gen_uuid)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), index=True
+    )
+    route: Mapped[str] = mapped_column(String(64), index=True)
+    model: Mapped[str] = mapped_column(String(100), index=True)
+    # Sin FKs: la telemetría sobrevive al borrado del usuario o del guion
+    owner_id: Mapped[str | None] = mapped_column(String(36), nullable=True, index=True)
+    screenplay_id: Mapped[str | None] = mapped_column(String(36), nullable=True)
+    cache_status: Mapped[str | None] = mapped_column(String(16), nullable=True)
+    shared: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Segundos
+    latency: Mapped[float] = mapped_column(Float)
+    queue_wait: Mapped[float | None] = mapped_column(Float, nullable=True)
+    cache_wait: Mapped[float | None] = mapped_column(Float, nullable=True)
+    time_to_first_token: Mapped[float | None] = mapped_column(Float, nullable=True)
+    load_duration: Mapped[float | None] = mapped_column(Float, nullable=True)
+    prompt_eval_duration: Mapped[float | None] = mapped_column(Float, nullable=True)
+    eval_duration: Mapped[float | None] = mapped_column(Float, nullable=True)
+    prompt_eval_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    eval_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    tokens_per_second: Mapped[float | None] = mapped_column(Float, nullable=True)
+    # Modo sesión: evaluación del prompt ahorrada al reutilizar el prefijo
+    prompt_eval_saved: Mapped[float | None] = mapped_column(Float, nullable=True)
+
+
+class SearchItem(Base):
+    """Embedding de una escena, personaje o localización (app.search.index)."""
+
+    __tablename__ = "search_items"
+    __table_args__ = (UniqueConstraint("screenplay_id", "kind", "item_id"),)
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=gen_uuid)
+    # Copia del dueño del guion: la búsqueda filtra por aquí sin joins
+    owner_id: Mapped[str] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), index=True
+    )
+    screenplay_id: Mapped[str] = mapped_column(
+        ForeignKey("screenplays.id", ondelete="CASCADE"), index=True
+    )
+    kind: Mapped[str] = mapped_column(String(16))  # "scene" | "character" | "location"
+    item_id: Mapped[str] = mapped_column(String(100))
+    position: Mapped[int] = mapped_column(Integer)
+    label: Mapped[str] = mapped_column(String(300))
+    snippet: Mapped[str] = mapped_column(Text)
+    # sha256 del texto embebido: solo se recalcula si cambia
+    content_hash: Mapped[str] = mapped_column(String(64))
+    model: Mapped[str] = mapped_column(String(100))
+    dim: Mapped[int] = mapped_column(Integer)
+    # Vector unitario en float16 o float32 (bytes contiguos)
+    vector: Mapped[bytes] = mapped_column(LargeBinary)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
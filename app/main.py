@@ -1,12 +1,51 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from app.ai.jobs import job_manager, router as ai_jobs_router
 from app.ai.router import router as ai_router
+from app.ai.telemetry import ai_log_writer
+from app.db.database import get_session_factory
 from app.media.router import router as media_router
 from app.auth.router import router as auth_router
 from app.projects.router import router as projects_router
+from app.screenplays.items import router as screenplay_items_router
 from app.screenplays.router import router as screenplays_router
+from app.search.index import search_index
+from app.search.router import router as search_router
+from app.utils.health import readiness
+from app.utils.metrics import MetricsMiddleware, registry
+from app.utils.ollama_client import close_ollama_client, get_ollama_client
+from app.utils.residency import residency
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Un único cliente de Ollama (pool keep-alive) para toda la vida de la app
+    client = get_ollama_client()
+    client.start_health_checks()
+    ai_log_writer.start(get_session_factory())
+    # Precarga de modelos en segundo plano: no retrasa el arranque
+    await residency.start(client)
+    await job_manager.start(get_session_factory(), client)
+    search_index.start(get_session_factory(), client)
+    try:
+        await job_manager.recover()
+    except Exception:
+        logger.exception("No se pudieron recuperar los trabajos pendientes de ai_jobs")
+    yield
+    await job_manager.stop()
+    await search_index.stop()
+    await residency.stop()
+    await ai_log_writer.stop()
+    await close_ollama_client()
+
 
-app = FastAPI(title="StoryLab API", version="0.1.0")
+app = FastAPI(title="StoryLab API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,13 +54,32 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth_router)
 app.include_router(projects_router)
 app.include_router(screenplays_router)
+app.include_router(screenplay_items_router)
+app.include_router(search_router)
+app.include_router(ai_jobs_router)
 app.include_router(ai_router)
 app.include_router(media_router)
 
 @app.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/health/ready")
+async def health_ready():
+    """Lista para recibir tráfico: BD y Ollama accesibles (resultado cacheado)."""
+    ok, checks = await readiness.run()
+    return JSONResponse(
+        {"status": "ready" if ok else "unavailable", "checks": checks},
+        status_code=200 if ok else 503,
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -7,8 +7,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.auth.security import get_current_user, UserPublic
 from app.db.database import get_session
 from app.db.models import Project
+from app.utils.responses import FastJSONResponse, trusted_response
 
-router = APIRouter(prefix="/projects", tags=["Projects"])
+router = APIRouter(prefix="/projects", tags=["Projects"], default_response_class=FastJSONResponse)
 
 
 class ProjectCreate(BaseModel):
@@ -31,6 +32,18 @@ def _iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def _project_payload(p: Project) -> dict:
+    """ProjectOut como dict (datos de nuestra BD, sin revalidar)."""
+    return {
+        "id": p.id,
+        "name": p.name,
+        "description": p.description,
+        "owner_id": p.owner_id,
+        "created_at": p.created_at.isoformat(),
+        "updated_at": p.updated_at.isoformat(),
+    }
+
+
 def _ensure_owner(p: Project, user_id: str):
     if not p:
         raise HTTPException(404, "Project not found.")
@@ -48,17 +61,7 @@ async def list_projects(
     if q:
         stmt = stmt.where(Project.name.ilike(f"%{q}%"))
     rows = (await session.execute(stmt)).scalars().all()
-    return [
-        ProjectOut(
-            id=r.id,
-            name=r.name,
-            description=r.description,
-            owner_id=r.owner_id,
-            created_at=r.created_at.isoformat(),
-            updated_at=r.updated_at.isoformat(),
-        )
-        for r in rows
-    ]
+    return trusted_response(list[ProjectOut], [_project_payload(r) for r in rows])
 
 @router.post("", response_model=ProjectOut, status_code=201)
 async def create_project(
@@ -74,14 +77,7 @@ async def create_project(
     session.add(p)
     await session.commit()
     await session.refresh(p)
-    return ProjectOut(
-        id=p.id,
-        name=p.name,
-        description=p.description,
-        owner_id=p.owner_id,
-        created_at=p.created_at.isoformat(),
-        updated_at=p.updated_at.isoformat(),
-    )
+    return trusted_response(ProjectOut, _project_payload(p), status_code=201)
 
 
 @router.get("/{project_id}", response_model=ProjectOut)
@@ -92,14 +88,7 @@ async def get_project(
 ):
     p = await session.get(Project, project_id)
     _ensure_owner(p, me.id)
-    return ProjectOut(
-        id=p.id,
-        name=p.name,
-        description=p.description,
-        owner_id=p.owner_id,
-        created_at=p.created_at.isoformat(),
-        updated_at=p.updated_at.isoformat(),
-    )
+    return trusted_response(ProjectOut, _project_payload(p))
 
 
 @router.patch("/{project_id}", response_model=ProjectOut)
@@ -117,14 +106,7 @@ async def update_project(
         p.description = payload.description
     await session.commit()
     await session.refresh(p)
-    return ProjectOut(
-        id=p.id,
-        name=p.name,
-        description=p.description,
-        owner_id=p.owner_id,
-        created_at=p.created_at.isoformat(),
-        updated_at=p.updated_at.isoformat(),
-    )
+    return trusted_response(ProjectOut, _project_payload(p))
 
 
 @router.delete("/{project_id}", status_code=204)
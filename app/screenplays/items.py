@@ -0,0 +1,446 @@
+"""Escritura por elemento de las colecciones de un guion.
+
+Para `scenes`, `characters`, `locations` y `subplots`:
+
+- POST   /screenplays/{screenplay_id}/{colección}            añade al final
+- PATCH  /screenplays/{screenplay_id}/{colección}/{item_id}  cambia campos
+- DELETE /screenplays/{screenplay_id}/{colección}/{item_id}
+- PATCH  /screenplays/{screenplay_id}/ops                    lote de operaciones
+
+Cada escritura toca solo las filas implicadas de la tabla hija y el
+`updated_at` del guion, y responde solo con lo que cambió: el coste no crece
+con el tamaño del guion.
+
+`/ops` recibe operaciones al estilo RFC 6902 (JSON Patch) con rutas por id en
+vez de por índice:
+
+    {"op": "add", "path": "/scenes/-", "value": {...}}        al final
+    {"op": "add", "path": "/scenes/sc4", "value": {...}}      antes de sc4
+    {"op": "replace", "path": "/scenes/sc4", "value": {...}}  elemento entero
+    {"op": "replace", "path": "/scenes/sc4/content", "value": "..."}
+    {"op": "remove", "path": "/scenes/sc4"}
+    {"op": "move", "from": "/scenes/sc4", "path": "/scenes/sc1"}  (o "/scenes/-")
+    {"op": "test", "path": "/scenes/sc4/content", "value": "..."}
+
+Cada operación es una sentencia SQL (o dos o tres si hay que desplazar
+posiciones) y todo el lote va en una transacción: si una falla no se aplica
+ninguna. `test` permite a un cliente comprobar que un campo sigue como lo
+leyó antes de cambiarlo (409 si no).
+
+(Sin `from __future__ import annotations`: FastAPI tiene que resolver los
+esquemas de cada colección, que llegan por el cierre de `add_item_routes`).
+"""
+from typing import Annotated, Any, Literal, Optional
+from uuid import uuid4
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.security import UserPublic, get_current_user
+from app.db.database import get_session
+from app.db.models import ITEM_ID_LENGTH, Screenplay
+from app.screenplays.router import COLLECTIONS, INDEXED_COLLECTIONS, _iso
+from app.search.index import search_index
+from app.utils.responses import FastJSONResponse, trusted_response
+
+router = APIRouter(
+    prefix="/screenplays", tags=["Screenplays"], default_response_class=FastJSONResponse
+)
+
+MAX_OPS = 200
+
+
+class CharacterUpdate(BaseModel):
+    name: Optional[str] = None
+    bio: Optional[str] = None
+    goal: Optional[str] = None
+    conflict: Optional[str] = None
+    arc: Optional[str] = None
+
+
+class SubplotUpdate(BaseModel):
+    logline: Optional[str] = None
+    relevance: Optional[str] = None
+
+
+class LocationUpdate(BaseModel):
+    name: Optional[str] = None
+    details: Optional[str] = None
+
+
+class SceneUpdate(BaseModel):
+    header: Optional[str] = None
+    content: Optional[str] = None
+    order: Optional[int] = None
+
+
+UPDATE_SCHEMAS: dict[str, type[BaseModel]] = {
+    "characters": CharacterUpdate,
+    "subplots": SubplotUpdate,
+    "locations": LocationUpdate,
+    "scenes": SceneUpdate,
+}
+
+
+class ItemOp(BaseModel):
+    op: Literal["add", "replace", "remove", "move", "test"]
+    path: str
+    value: Any = None
+    from_: Optional[str] = Field(default=None, alias="from")
+
+
+class ItemOpsIn(BaseModel):
+    ops: list[ItemOp] = Field(min_length=1, max_length=MAX_OPS)
+
+
+class ItemOpResult(BaseModel):
+    op: str
+    path: str
+    # add: el elemento; replace: id y campos cambiados; move: id
+    value: Optional[dict] = None
+
+
+class ItemOpsOut(BaseModel):
+    updated_at: str
+    results: list[ItemOpResult]
+
+
+# ---------- Operaciones (una sentencia SQL por paso) ----------
+
+
+async def touch_screenplay(session: AsyncSession, screenplay_id: str, owner_id: str) -> str:
+    """Comprueba el dueño y actualiza `updated_at` en un solo UPDATE (404 si no).
+
+    En Postgres ese UPDATE bloquea la fila del guion hasta el commit, así que
+    las escrituras por elemento de un mismo guion se serializan (las
+    posiciones de dos POST simultáneos no se pisan). Devuelve el nuevo
+    `updated_at` en ISO 8601.
+    """
+    updated_at = await session.scalar(
+        update(Screenplay)
+        .where(Screenplay.id == screenplay_id, Screenplay.owner_id == owner_id)
+        .values(updated_at=func.now())
+        .returning(Screenplay.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    if updated_at is None:
+        raise HTTPException(404, "Screenplay not found.")
+    return _iso(updated_at)
+
+
+def _label(field: str) -> str:
+    return COLLECTIONS[field][1].__name__
+
+
+def _columns(field: str, names) -> list:
+    model, _ = COLLECTIONS[field]
+    return [getattr(model, name) for name in names]
+
+
+def _pk(field: str, screenplay_id: str, item_id: str) -> list:
+    model, _ = COLLECTIONS[field]
+    return [model.screenplay_id == screenplay_id, model.id == item_id]
+
+
+async def _position(session: AsyncSession, screenplay_id: str, field: str, item_id: str) -> int:
+    model, _ = COLLECTIONS[field]
+    position = await session.scalar(
+        select(model.position).where(*_pk(field, screenplay_id, item_id))
+    )
+    if position is None:
+        raise HTTPException(404, f"{_label(field)} {item_id} not found.")
+    return position
+
+
+async def _make_room(
+    session: AsyncSession, screenplay_id: str, field: str, before: Optional[str]
+) -> Any:
+    """Posición para un elemento nuevo: al final o en la de `before` (desplazando)."""
+    model, _ = COLLECTIONS[field]
+    if before is None:
+        # Subconsulta dentro del propio INSERT/UPDATE: sin viaje extra a la BD
+        return (
+            select(func.coalesce(func.max(model.position) + 1, 0))
+            .where(model.screenplay_id == screenplay_id)
+            .scalar_subquery()
+        )
+    position = await _position(session, screenplay_id, field, before)
+    await session.execute(
+        update(model)
+        .where(model.screenplay_id == screenplay_id, model.position >= position)
+        .values(position=model.position + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return position
+
+
+async def add_item(
+    session: AsyncSession,
+    screenplay_id: str,
+    field: str,
+    item: BaseModel,
+    before: Optional[str] = None,
+) -> dict:
+    """INSERT del elemento (409 si el id ya existe en el guion)."""
+    model, _ = COLLECTIONS[field]
+    position = await _make_room(session, screenplay_id, field, before)
+    values = item.model_dump()
+    try:
+        await session.execute(
+            insert(model).values(screenplay_id=screenplay_id, position=position, **values)
+        )
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(409, f"{_label(field)} id already exists.")
+    return values
+
+
+async def update_item(
+    session: AsyncSession,
+    screenplay_id: str,
+    field: str,
+    item_id: str,
+    values: dict,
+    returning: Optional[list[str]] = None,
+) -> dict:
+    """UPDATE de `values` con RETURNING de `returning` (por defecto, lo cambiado)."""
+    model, _ = COLLECTIONS[field]
+    names = returning or ["id", *values]
+    if values:
+        stmt = (
+            update(model)
+            .where(*_pk(field, screenplay_id, item_id))
+            .values(**values)
+            .returning(*_columns(field, names))
+            .execution_options(synchronize_session=False)
+        )
+    else:
+        # Nada que cambiar: basta con leer
+        stmt = select(*_columns(field, names)).where(*_pk(field, screenplay_id, item_id))
+    row = (await session.execute(stmt)).first()
+    if row is None:
+        raise HTTPException(404, f"{_label(field)} {item_id} not found.")
+    return dict(zip(names, row))
+
+
+async def remove_item(session: AsyncSession, screenplay_id: str, field: str, item_id: str) -> None:
+    model, _ = COLLECTIONS[field]
+    result = await session.execute(delete(model).where(*_pk(field, screenplay_id, item_id)))
+    if result.rowcount == 0:
+        raise HTTPException(404, f"{_label(field)} {item_id} not found.")
+
+
+async def move_item(
+    session: AsyncSession, screenplay_id: str, field: str, item_id: str, before: Optional[str]
+) -> None:
+    """Coloca `item_id` antes de `before` (o al final si es None)."""
+    if before == item_id:
+        await _position(session, screenplay_id, field, item_id)
+        return
+    position = await _make_room(session, screenplay_id, field, before)
+    await update_item(session, screenplay_id, field, item_id, {"position": position}, ["id"])
+
+
+async def append_item(
+    session: AsyncSession, screenplay_id: str, owner_id: str, field: str, item: BaseModel
+) -> str:
+    """Añade `item` al final en su propia transacción y devuelve su id.
+
+    Para elementos generados (rutas de IA): si el id que eligió el modelo ya
+    existe en el guion se le añade un sufijo en vez de fallar.
+    """
+    model, _ = COLLECTIONS[field]
+    await touch_screenplay(session, screenplay_id, owner_id)
+    taken = await session.scalar(select(model.id).where(*_pk(field, screenplay_id, item.id)))
+    if taken is not None:
+        prefix = item.id[: ITEM_ID_LENGTH - 7]
+        item = item.model_copy(update={"id": f"{prefix}-{uuid4().hex[:6]}"})
+    await add_item(session, screenplay_id, field, item)
+    await session.commit()
+    if field in INDEXED_COLLECTIONS:
+        search_index.schedule(screenplay_id)
+    return item.id
+
+
+# ---------- Lote /ops ----------
+
+
+def parse_path(path: str) -> tuple[str, str, Optional[str]]:
+    """`/colección/id[/campo]` (JSON Pointer: ~1 es "/" y ~0 es "~")."""
+    parts = [p.replace("~1", "/").replace("~0", "~") for p in path.split("/")[1:]]
+    if not path.startswith("/") or len(parts) not in (2, 3) or parts[0] not in COLLECTIONS:
+        raise HTTPException(422, f"Invalid path: {path}")
+    field, item_id = parts[0], parts[1]
+    attr = parts[2] if len(parts) == 3 else None
+    if attr is not None and (attr == "id" or attr not in COLLECTIONS[field][1].model_fields):
+        raise HTTPException(422, f"Invalid path: {path}")
+    return field, item_id, attr
+
+
+def _validate(adapter_or_schema, value: Any) -> Any:
+    try:
+        if isinstance(adapter_or_schema, TypeAdapter):
+            return adapter_or_schema.validate_python(value)
+        return adapter_or_schema.model_validate(value)
+    except ValidationError as e:
+        raise HTTPException(422, detail=jsonable_encoder(e.errors()))
+
+
+def _attr_adapter(field: str, attr: str) -> TypeAdapter:
+    return TypeAdapter(COLLECTIONS[field][1].model_fields[attr].annotation)
+
+
+async def apply_op(session: AsyncSession, screenplay_id: str, op: ItemOp) -> ItemOpResult:
+    field, item_id, attr = parse_path(op.path)
+    _, schema = COLLECTIONS[field]
+    if op.op != "add" and item_id == "-":
+        raise HTTPException(422, f"Invalid path for {op.op}: {op.path}")
+    if op.op in ("add", "remove", "move") and attr is not None:
+        raise HTTPException(422, f"{op.op} works on whole items: {op.path}")
+
+    if op.op == "add":
+        item = _validate(schema, op.value)
+        before = None if item_id == "-" else item_id
+        value = await add_item(session, screenplay_id, field, item, before)
+        return ItemOpResult(op=op.op, path=f"/{field}/{item.id}", value=value)
+
+    if op.op == "remove":
+        await remove_item(session, screenplay_id, field, item_id)
+        return ItemOpResult(op=op.op, path=op.path)
+
+    if op.op == "move":
+        if op.from_ is None:
+            raise HTTPException(422, "move needs 'from'.")
+        from_field, from_id, from_attr = parse_path(op.from_)
+        if from_field != field or from_attr is not None or from_id == "-":
+            raise HTTPException(422, f"Invalid move from {op.from_} to {op.path}")
+        before = None if item_id == "-" else item_id
+        await move_item(session, screenplay_id, field, from_id, before)
+        return ItemOpResult(op=op.op, path=f"/{field}/{from_id}", value={"id": from_id})
+
+    if op.op == "replace":
+        if attr is None:
+            # Elemento entero: el id del valor, si viene, debe ser el de la ruta
+            value = op.value if isinstance(op.value, dict) else {}
+            item = _validate(schema, {**value, "id": value.get("id", item_id)})
+            if item.id != item_id:
+                raise HTTPException(422, "replace cannot change the item id.")
+            values = item.model_dump(exclude={"id"})
+        else:
+            values = {attr: _validate(_attr_adapter(field, attr), op.value)}
+        changed = await update_item(session, screenplay_id, field, item_id, values)
+        return ItemOpResult(op=op.op, path=op.path, value=changed)
+
+    # test
+    names = [attr] if attr is not None else list(schema.model_fields)
+    current = await update_item(session, screenplay_id, field, item_id, {}, names)
+    expected = (
+        {attr: _validate(_attr_adapter(field, attr), op.value)}
+        if attr is not None
+        else _validate(schema, op.value).model_dump()
+    )
+    if current != expected:
+        raise HTTPException(409, detail={"error": "Test failed.", "path": op.path, "value": current})
+    return ItemOpResult(op=op.op, path=op.path)
+
+
+@router.patch("/{screenplay_id}/ops", response_model=ItemOpsOut)
+async def apply_item_ops(
+    screenplay_id: str,
+    payload: ItemOpsIn,
+    me: Annotated[UserPublic, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+):
+    updated_at = await touch_screenplay(session, screenplay_id, me.id)
+    results = []
+    for op in payload.ops:
+        # Un fallo sale como HTTPException y la sesión se cierra sin commit:
+        # no se aplica ninguna operación del lote
+        results.append(await apply_op(session, screenplay_id, op))
+    await session.commit()
+    if any(parse_path(op.path)[0] in INDEXED_COLLECTIONS for op in payload.ops):
+        search_index.schedule(screenplay_id)
+    return trusted_response(
+        ItemOpsOut, {"updated_at": updated_at, "results": [r.model_dump() for r in results]}
+    )
+
+
+# ---------- Rutas por elemento ----------
+
+
+def add_item_routes(field: str) -> None:
+    _, schema = COLLECTIONS[field]
+    update_schema = UPDATE_SCHEMAS[field]
+    name = schema.__name__
+    indexed = field in INDEXED_COLLECTIONS
+
+    @router.post(
+        f"/{{screenplay_id}}/{field}",
+        response_model=schema,
+        status_code=201,
+        name=f"add_{name.lower()}",
+    )
+    async def post_item(
+        screenplay_id: str,
+        payload: schema,
+        me: Annotated[UserPublic, Depends(get_current_user)],
+        session: Annotated[AsyncSession, Depends(get_session)],
+    ):
+        await touch_screenplay(session, screenplay_id, me.id)
+        value = await add_item(session, screenplay_id, field, payload)
+        await session.commit()
+        if indexed:
+            search_index.schedule(screenplay_id)
+        return trusted_response(schema, value, status_code=201)
+
+    @router.patch(
+        f"/{{screenplay_id}}/{field}/{{item_id}}",
+        response_model=schema,
+        name=f"update_{name.lower()}",
+    )
+    async def patch_item(
+        screenplay_id: str,
+        item_id: str,
+        payload: update_schema,
+        me: Annotated[UserPublic, Depends(get_current_user)],
+        session: Annotated[AsyncSession, Depends(get_session)],
+    ):
+        await touch_screenplay(session, screenplay_id, me.id)
+        # Como en PATCH /screenplays/{id}: null deja el campo como estaba
+        value = await update_item(
+            session,
+            screenplay_id,
+            field,
+            item_id,
+            payload.model_dump(exclude_none=True),
+            list(schema.model_fields),
+        )
+        await session.commit()
+        if indexed:
+            search_index.schedule(screenplay_id)
+        return trusted_response(schema, value)
+
+    @router.delete(
+        f"/{{screenplay_id}}/{field}/{{item_id}}",
+        status_code=204,
+        name=f"delete_{name.lower()}",
+    )
+    async def delete_item(
+        screenplay_id: str,
+        item_id: str,
+        me: Annotated[UserPublic, Depends(get_current_user)],
+        session: Annotated[AsyncSession, Depends(get_session)],
+    ):
+        await touch_screenplay(session, screenplay_id, me.id)
+        await remove_item(session, screenplay_id, field, item_id)
+        await session.commit()
+        if indexed:
+            search_index.schedule(screenplay_id)
+
+
+for _field in COLLECTIONS:
+    add_item_routes(_field)
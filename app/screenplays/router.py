@@ -1,20 +1,39 @@
 from __future__ import annotations
-from typing import Annotated, Optional, Literal
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel, Field
+from typing import Annotated, Optional, Literal, Union
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field, field_validator
 from app.turning_points import TURNING_POINT_TITLES
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, selectinload
 from app.auth.security import get_current_user, UserPublic
 from app.db.database import get_session
-from app.db.models import Screenplay, Project
+from app.db.models import (
+    ITEM_ID_LENGTH,
+    Project,
+    Screenplay,
+    ScreenplayCharacter,
+    ScreenplayLocation,
+    ScreenplayScene,
+    ScreenplaySubplot,
+)
+from app.search.index import search_index
+from app.utils.residency import residency
+from app.utils.responses import FastJSONResponse, trusted_response
 
-router = APIRouter(prefix="/screenplays", tags=["Screenplays"])
+router = APIRouter(
+    prefix="/screenplays", tags=["Screenplays"], default_response_class=FastJSONResponse
+)
 
 WorkflowState = Literal[
     "S1", "S2", "S3", "S4", "S5", "S6", "S7", "S8", "S9", "DONE", "ON_HOLD", "RESUME"
 ]
 
 
+# Id de un elemento, lo elige el cliente (o el modelo en las rutas de IA)
+ItemId = Annotated[str, Field(min_length=1, max_length=ITEM_ID_LENGTH)]
+
+
 class TurningPointBase(BaseModel):
     id: str
     description: str
@@ -25,7 +44,7 @@ class TurningPoint(TurningPointBase):
 
 
 class Character(BaseModel):
-    id: str
+    id: ItemId
     name: str
     bio: Optional[str] = None
     goal: Optional[str] = None
@@ -34,19 +53,19 @@ class Character(BaseModel):
 
 
 class Subplot(BaseModel):
-    id: str
+    id: ItemId
     logline: str
     relevance: Optional[str] = None
 
 
 class Location(BaseModel):
-    id: str
+    id: ItemId
     name: str
     details: Optional[str] = None
 
 
 class Scene(BaseModel):
-    id: str
+    id: ItemId
     header: str
     content: str
     order: int
@@ -72,6 +91,13 @@ class ScreenplayUpdate(BaseModel):
     locations: Optional[list[Location]] = None
     scenes: Optional[list[Scene]] = None
 
+    @field_validator("characters", "subplots", "locations", "scenes")
+    @classmethod
+    def unique_ids(cls, items):
+        if items is not None and len({item.id for item in items}) != len(items):
+            raise ValueError("ids must be unique")
+        return items
+
 
 class ScreenplayOut(BaseModel):
     id: str
@@ -91,10 +117,162 @@ class ScreenplayOut(BaseModel):
     updated_at: str
 
 
+class SceneHeader(BaseModel):
+    id: str
+    header: str
+    order: int
+
+
+class ScreenplaySparseOut(BaseModel):
+    """GET /screenplays/{id} con `fields` o `include`: solo lo pedido (y el id)."""
+
+    id: str
+    project_id: Optional[str] = None
+    owner_id: Optional[str] = None
+    title: Optional[str] = None
+    logline: Optional[str] = None
+    synopsis: Optional[str] = None
+    treatment: Optional[str] = None
+    state: Optional[WorkflowState] = None
+    turning_points: Optional[list[TurningPoint]] = None
+    characters: Optional[list[Character]] = None
+    subplots: Optional[list[Subplot]] = None
+    locations: Optional[list[Location]] = None
+    scenes: Optional[list[Scene]] = None
+    scene_headers: Optional[list[SceneHeader]] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+
+
+SCREENPLAY_FIELDS = tuple(ScreenplayOut.model_fields)
+SCREENPLAY_INCLUDES = ("scene_headers",)
+
+
 def _iso(dt):
     return dt.isoformat()
 
 
+# Colección -> (tabla hija, esquema de cada elemento)
+COLLECTIONS: dict[str, tuple[type, type[BaseModel]]] = {
+    "characters": (ScreenplayCharacter, Character),
+    "subplots": (ScreenplaySubplot, Subplot),
+    "locations": (ScreenplayLocation, Location),
+    "scenes": (ScreenplayScene, Scene),
+}
+# Las que alimentan el índice de búsqueda
+INDEXED_COLLECTIONS = {"scenes", "characters", "locations"}
+
+
+def item_payload(row, schema: type[BaseModel]) -> dict:
+    return {field: getattr(row, field) for field in schema.model_fields}
+
+
+def orm_items(sp: Screenplay) -> dict[str, list[dict]]:
+    """Colecciones ya cargadas en `sp` (selectinload) como dicts."""
+    return {
+        field: [item_payload(row, schema) for row in getattr(sp, field)]
+        for field, (_, schema) in COLLECTIONS.items()
+    }
+
+
+async def load_items(
+    session: AsyncSession, screenplay_id: str, collections=COLLECTIONS
+) -> dict[str, list[dict]]:
+    """Colecciones de un guion como dicts, una consulta por tabla hija.
+
+    Lee solo las columnas del esquema y no instancia filas ORM: en un guion
+    de cientos de escenas es lo que más cuesta de la lectura.
+    """
+    items = {}
+    for field in collections:
+        model, schema = COLLECTIONS[field]
+        fields = tuple(schema.model_fields)
+        result = await session.execute(
+            select(*(getattr(model, f) for f in fields))
+            .where(model.screenplay_id == screenplay_id)
+            .order_by(model.position)
+        )
+        items[field] = [dict(zip(fields, row)) for row in result]
+    return items
+
+
+def screenplay_payload(sp: Screenplay, items: dict[str, list[dict]]) -> dict:
+    """ScreenplayOut como dict, sin revalidar.
+
+    Los elementos se validan una vez, al escribirlos (ScreenplayUpdate, las
+    rutas por elemento de app.screenplays.items y las de IA).
+    """
+    return {
+        "id": sp.id,
+        "project_id": sp.project_id,
+        "owner_id": sp.owner_id,
+        "title": sp.title,
+        "logline": sp.logline,
+        "synopsis": sp.synopsis,
+        "treatment": sp.treatment,
+        "state": sp.state,
+        "turning_points": sp.turning_points or [],
+        **{field: items[field] for field in COLLECTIONS},
+        "created_at": _iso(sp.created_at),
+        "updated_at": _iso(sp.updated_at),
+    }
+
+
+async def load_scene_headers(session: AsyncSession, screenplay_id: str) -> list[dict]:
+    """id, cabecera y orden de cada escena, sin leer su contenido."""
+    result = await session.execute(
+        select(ScreenplayScene.id, ScreenplayScene.header, ScreenplayScene.order)
+        .where(ScreenplayScene.screenplay_id == screenplay_id)
+        .order_by(ScreenplayScene.position)
+    )
+    return [{"id": r.id, "header": r.header, "order": r.order} for r in result]
+
+
+async def load_screenplay(
+    session: AsyncSession,
+    screenplay_id: str,
+    owner_id: str,
+    collections: bool = False,
+    columns: Optional[list[str]] = None,
+) -> Screenplay:
+    """Guion del usuario o 404.
+
+    `collections` carga además las filas hijas (ORM); `columns` limita el
+    SELECT a esas columnas (load_only): las demás no se leen de la BD y
+    acceder a ellas lanza una excepción en vez de otra consulta.
+    """
+    stmt = select(Screenplay).where(Screenplay.id == screenplay_id)
+    if collections:
+        stmt = stmt.options(*(selectinload(getattr(Screenplay, f)) for f in COLLECTIONS))
+    if columns is not None:
+        names = {"owner_id", *columns}
+        stmt = stmt.options(
+            load_only(*(getattr(Screenplay, c) for c in names), raiseload=True)
+        )
+    sp = await session.scalar(stmt)
+    if not sp or sp.owner_id != owner_id:
+        raise HTTPException(404, "Screenplay not found.")
+    return sp
+
+
+def replace_items(sp: Screenplay, field: str, items: list[BaseModel]) -> None:
+    """Sustituye una colección cargada conservando las filas por id.
+
+    Las filas que no cambian no generan SQL; las que cambian, un UPDATE de
+    sus columnas; las nuevas, un INSERT y las que desaparecen, un DELETE.
+    """
+    model, _ = COLLECTIONS[field]
+    current = {row.id: row for row in getattr(sp, field)}
+    rows = []
+    for position, item in enumerate(items):
+        row = current.get(item.id) or model(id=item.id)
+        row.position = position
+        for key, value in item.model_dump().items():
+            setattr(row, key, value)
+        rows.append(row)
+    setattr(sp, field, rows)
+
+
 @router.post("", response_model=ScreenplayOut, status_code=201)
 async def create_screenplay(
     payload: ScreenplayCreate,
@@ -114,59 +292,59 @@ async def create_screenplay(
         treatment=payload.treatment,
         state="S1",
         turning_points=[],
-        characters=[],
-        subplots=[],
-        locations=[],
-        scenes=[],
+        **{field: [] for field in COLLECTIONS},
     )
     session.add(sp)
     await session.commit()
-    await session.refresh(sp)
-    return ScreenplayOut(
-        id=sp.id,
-        project_id=sp.project_id,
-        owner_id=sp.owner_id,
-        title=sp.title,
-        logline=sp.logline,
-        synopsis=sp.synopsis,
-        treatment=sp.treatment,
-        state=sp.state,
-        turning_points=sp.turning_points,
-        characters=sp.characters,
-        subplots=sp.subplots,
-        locations=sp.locations,
-        scenes=sp.scenes,
-        created_at=_iso(sp.created_at),
-        updated_at=_iso(sp.updated_at),
-    )
+    await session.refresh(sp, ["created_at", "updated_at"])
+    items = {field: [] for field in COLLECTIONS}
+    return trusted_response(ScreenplayOut, screenplay_payload(sp, items), status_code=201)
 
 
-@router.get("/{screenplay_id}", response_model=ScreenplayOut)
+def _parse_list(value: str, allowed: tuple[str, ...]) -> tuple[str, ...]:
+    names = tuple(dict.fromkeys(n.strip() for n in value.split(",") if n.strip()))
+    if not names:
+        raise HTTPException(422, "Empty field list.")
+    unknown = [n for n in names if n not in allowed]
+    if unknown:
+        raise HTTPException(422, f"Unknown fields: {', '.join(unknown)}.")
+    return names
+
+
+@router.get("/{screenplay_id}", response_model=Union[ScreenplayOut, ScreenplaySparseOut])
 async def get_screenplay(
     screenplay_id: str,
     me: Annotated[UserPublic, Depends(get_current_user)],
     session: Annotated[AsyncSession, Depends(get_session)],
+    fields: Annotated[
+        Optional[str], Query(description="Campos separados por comas (el id va siempre)")
+    ] = None,
+    include: Annotated[Optional[str], Query(description="scene_headers")] = None,
 ):
-    sp = await session.get(Screenplay, screenplay_id)
-    if not sp or sp.owner_id != me.id:
-        raise HTTPException(404, "Screenplay not found.")
-    return ScreenplayOut(
-        id=sp.id,
-        project_id=sp.project_id,
-        owner_id=sp.owner_id,
-        title=sp.title,
-        logline=sp.logline,
-        synopsis=sp.synopsis,
-        treatment=sp.treatment,
-        state=sp.state,
-        turning_points=sp.turning_points,
-        characters=sp.characters,
-        subplots=sp.subplots,
-        locations=sp.locations,
-        scenes=sp.scenes,
-        created_at=_iso(sp.created_at),
-        updated_at=_iso(sp.updated_at),
-    )
+    if fields is None and include is None:
+        sp = await load_screenplay(session, screenplay_id, me.id)
+        items = await load_items(session, sp.id)
+        return trusted_response(ScreenplayOut, screenplay_payload(sp, items))
+
+    # Con solo ``include`` se devuelve el id más lo incluido, no el guion entero
+    requested = _parse_list(fields, SCREENPLAY_FIELDS) if fields is not None else ("id",)
+    includes = _parse_list(include, SCREENPLAY_INCLUDES) if include is not None else ()
+    columns = [f for f in requested if f not in COLLECTIONS]
+    sp = await load_screenplay(session, screenplay_id, me.id, columns=columns)
+    items = await load_items(session, sp.id, [f for f in requested if f in COLLECTIONS])
+    payload = {"id": sp.id}
+    for field in requested:
+        if field in COLLECTIONS:
+            payload[field] = items[field]
+        elif field in ("created_at", "updated_at"):
+            payload[field] = _iso(getattr(sp, field))
+        elif field == "turning_points":
+            payload[field] = sp.turning_points or []
+        else:
+            payload[field] = getattr(sp, field)
+    if "scene_headers" in includes:
+        payload["scene_headers"] = await load_scene_headers(session, sp.id)
+    return trusted_response(ScreenplaySparseOut, payload)
 
 
 @router.patch("/{screenplay_id}", response_model=ScreenplayOut)
@@ -176,64 +354,31 @@ async def update_screenplay(
     me: Annotated[UserPublic, Depends(get_current_user)],
     session: Annotated[AsyncSession, Depends(get_session)],
 ):
-    sp = await session.get(Screenplay, screenplay_id)
-    if not sp or sp.owner_id != me.id:
-        raise HTTPException(404, "Screenplay not found.")
-    for field in [
-        "title",
-        "logline",
-        "synopsis",
-        "treatment",
-        "state",
-        "turning_points",
-        "characters",
-        "subplots",
-        "locations",
-        "scenes",
-    ]:
+    sp = await load_screenplay(session, screenplay_id, me.id, collections=True)
+    entering = payload.state if payload.state not in (None, sp.state) else None
+    for field in ["title", "logline", "synopsis", "treatment", "state"]:
         val = getattr(payload, field)
         if val is not None:
-            if field in {
-                "turning_points",
-                "characters",
-                "subplots",
-                "locations",
-                "scenes",
-            }:
-                if field == "turning_points":
-                    items = []
-                    for tp in val:
-                        title = TURNING_POINT_TITLES.get(tp.id)
-                        if not title:
-                            continue
-                        items.append(
-                            {
-                                "id": tp.id,
-                                "title": title,
-                                "description": tp.description,
-                            }
-                        )
-                    setattr(sp, field, items)
-                else:
-                    setattr(sp, field, [item.model_dump() for item in val])
-            else:
-                setattr(sp, field, val)
+            setattr(sp, field, val)
+    if payload.turning_points is not None:
+        items = []
+        for tp in payload.turning_points:
+            title = TURNING_POINT_TITLES.get(tp.id)
+            if not title:
+                continue
+            items.append({"id": tp.id, "title": title, "description": tp.description})
+        sp.turning_points = items
+    touched = [field for field in COLLECTIONS if getattr(payload, field) is not None]
+    for field in touched:
+        replace_items(sp, field, getattr(payload, field))
+    if touched:
+        # Las colecciones viven en otras tablas: el guion cambia igualmente
+        sp.updated_at = func.now()
     await session.commit()
-    await session.refresh(sp)
-    return ScreenplayOut(
-        id=sp.id,
-        project_id=sp.project_id,
-        owner_id=sp.owner_id,
-        title=sp.title,
-        logline=sp.logline,
-        synopsis=sp.synopsis,
-        treatment=sp.treatment,
-        state=sp.state,
-        turning_points=sp.turning_points,
-        characters=sp.characters,
-        subplots=sp.subplots,
-        locations=sp.locations,
-        scenes=sp.scenes,
-        created_at=_iso(sp.created_at),
-        updated_at=_iso(sp.updated_at),
-    )
+    await session.refresh(sp, ["updated_at"])
+    if entering:
+        # Adelantamos la carga del modelo que pedirá la siguiente etapa
+        residency.preload_for_state(entering)
+    if any(getattr(payload, f) is not None for f in INDEXED_COLLECTIONS):
+        search_index.schedule(sp.id)
+    return trusted_response(ScreenplayOut, screenplay_payload(sp, orm_items(sp)))
@@ -0,0 +1,290 @@
+"""Índice de búsqueda semántica de escenas, personajes y localizaciones.
+
+Cada escena, personaje y localización de un guion (tablas `screenplay_scenes`,
+`screenplay_characters` y `screenplay_locations`) tiene una fila en
+`search_items` con su embedding (`settings.ai_embed_model`) guardado como bytes
+contiguos en float16/float32, ya normalizado.
+
+- Actualización incremental: tras una escritura que toca esas colecciones se
+  reindexa el guion en segundo plano (con `search_index_debounce` segundos de
+  margen para agrupar ediciones seguidas). Solo se embeben los elementos cuyo
+  texto cambió (hash); los que desaparecen se borran.
+- Consulta: se recorren los vectores del usuario en lotes de
+  `search_scan_batch` filas; cada lote es un producto matriz-vector y un top-k
+  con `argpartition`, que se fusiona con el de los lotes anteriores.
+
+Las filas llevan el `owner_id` del guion y toda consulta filtra por él.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+from typing import Optional
+
+from pydantic import BaseModel
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import selectinload
+
+from app.db.models import Screenplay, SearchItem
+from app.settings import settings
+from app.utils.ollama_client import OllamaClient
+
+try:
+    import numpy as np
+except ImportError:  # extra opcional
+    np = None
+
+logger = logging.getLogger(__name__)
+
+SNIPPET_CHARS = 240
+
+
+class SearchHit(BaseModel):
+    screenplay_id: str
+    screenplay_title: str
+    kind: str
+    item_id: str
+    position: int
+    label: str
+    snippet: str
+    score: float
+
+
+def collect_items(screenplay: Screenplay) -> dict[tuple[str, str], tuple[int, str, str]]:
+    """(kind, item_id) -> (posición, etiqueta, texto a embeber)."""
+    items: dict[tuple[str, str], tuple[int, str, str]] = {}
+    for scene in screenplay.scenes:
+        text = f"{scene.header}\n{scene.content}"
+        items[("scene", scene.id)] = (scene.order, scene.header, text)
+    for i, ch in enumerate(screenplay.characters, start=1):
+        parts = [getattr(ch, f) for f in ("name", "bio", "goal", "conflict", "arc")]
+        items[("character", ch.id)] = (i, ch.name, "\n".join(p for p in parts if p))
+    for i, loc in enumerate(screenplay.locations, start=1):
+        parts = [loc.name, loc.details]
+        items[("location", loc.id)] = (i, loc.name, "\n".join(p for p in parts if p))
+    return items
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _normalize(vectors) -> "np.ndarray":
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _stack(blobs: list[bytes], dim: int) -> "np.ndarray":
+    """Matriz float32 (n, dim) a partir de vectores guardados en float16 o float32."""
+    dtype = np.float16 if len(blobs[0]) == dim * 2 else np.float32
+    return np.frombuffer(b"".join(blobs), dtype=dtype).reshape(len(blobs), dim).astype(np.float32)
+
+
+def _top_k(scores: "np.ndarray", k: int) -> "np.ndarray":
+    """Índices de las k mayores puntuaciones (sin ordenar)."""
+    if len(scores) <= k:
+        return np.arange(len(scores))
+    return np.argpartition(scores, -k)[-k:]
+
+
+class SearchIndex:
+    def __init__(self):
+        self.session_factory: Optional[async_sessionmaker[AsyncSession]] = None
+        self.client: Optional[OllamaClient] = None
+        self._pending: dict[str, asyncio.Task] = {}
+        self._dirty: set[str] = set()
+        self.embedded = 0
+        self.failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.search_enabled and np is not None
+
+    def start(self, session_factory: async_sessionmaker[AsyncSession], client: OllamaClient) -> None:
+        self.session_factory = session_factory
+        self.client = client
+
+    async def stop(self) -> None:
+        tasks = list(self._pending.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._pending.clear()
+        self._dirty.clear()
+
+    def schedule(self, screenplay_id: str) -> None:
+        """Reindexa el guion en segundo plano (agrupa llamadas seguidas)."""
+        if not self.enabled or self.session_factory is None or self.client is None:
+            return
+        if screenplay_id in self._pending:
+            self._dirty.add(screenplay_id)
+            return
+        task = asyncio.create_task(self._run(screenplay_id))
+        self._pending[screenplay_id] = task
+        task.add_done_callback(lambda _: self._pending.pop(screenplay_id, None))
+
+    async def _run(self, screenplay_id: str) -> None:
+        await asyncio.sleep(settings.search_index_debounce)
+        while True:
+            self._dirty.discard(screenplay_id)
+            try:
+                await self.reindex(screenplay_id)
+            except Exception:
+                # El índice es secundario: un fallo no debe afectar a la edición
+                self.failures += 1
+                logger.warning("No se pudo indexar el guion %s", screenplay_id, exc_info=True)
+            if screenplay_id not in self._dirty:
+                return
+
+    async def reindex(self, screenplay_id: str) -> int:
+        """Sincroniza `search_items` con el guion; devuelve cuántos se embebieron."""
+        model = settings.ai_embed_model
+        # Lectura y escritura en sesiones separadas: no retenemos una conexión
+        # de la BD mientras Ollama calcula los embeddings
+        async with self.session_factory() as session:
+            sp = await session.scalar(
+                select(Screenplay)
+                .where(Screenplay.id == screenplay_id)
+                .options(
+                    selectinload(Screenplay.scenes),
+                    selectinload(Screenplay.characters),
+                    selectinload(Screenplay.locations),
+                )
+            )
+            if sp is None:
+                return 0
+            owner_id = sp.owner_id
+            items = collect_items(sp)
+            rows = await session.execute(
+                select(SearchItem.kind, SearchItem.item_id, SearchItem.content_hash, SearchItem.model)
+                .where(SearchItem.screenplay_id == screenplay_id)
+            )
+            indexed = {(r.kind, r.item_id): (r.content_hash, r.model) for r in rows.all()}
+
+        stale = [key for key in indexed if key not in items]
+        changed = [
+            key
+            for key, (_, _, text) in items.items()
+            if indexed.get(key) != (content_hash(text), model)
+        ]
+        vectors = await self._embed([items[key][2] for key in changed])
+
+        async with self.session_factory() as session:
+            for kind, item_id in stale:
+                await session.execute(
+                    delete(SearchItem).where(
+                        SearchItem.screenplay_id == screenplay_id,
+                        SearchItem.kind == kind,
+                        SearchItem.item_id == item_id,
+                    )
+                )
+            existing = {
+                (r.kind, r.item_id): r
+                for r in (
+                    await session.scalars(
+                        select(SearchItem).where(SearchItem.screenplay_id == screenplay_id)
+                    )
+                ).all()
+            }
+            for key, vector in zip(changed, vectors):
+                position, label, text = items[key]
+                row = existing.get(key)
+                if row is None:
+                    row = SearchItem(screenplay_id=screenplay_id, kind=key[0], item_id=key[1])
+                    session.add(row)
+                row.owner_id = owner_id
+                row.position = position
+                row.label = label[:300]
+                row.snippet = text[:SNIPPET_CHARS]
+                row.content_hash = content_hash(text)
+                row.model = model
+                row.dim = vector.shape[0]
+                row.vector = vector.astype(settings.search_vector_dtype).tobytes()
+            # La posición cambia al reordenar aunque el texto sea el mismo
+            for key, row in existing.items():
+                if key in items and key not in changed:
+                    row.position = items[key][0]
+            await session.commit()
+        self.embedded += len(changed)
+        return len(changed)
+
+    async def _embed(self, texts: list[str]) -> "np.ndarray":
+        out = []
+        batch = settings.search_embed_batch
+        for i in range(0, len(texts), batch):
+            out.extend(await self.client.embed(settings.ai_embed_model, texts[i : i + batch]))
+        return _normalize(out) if out else np.zeros((0, 0), dtype=np.float32)
+
+    async def search(
+        self,
+        session: AsyncSession,
+        owner_id: str,
+        query: str,
+        k: int = 10,
+        kind: Optional[str] = None,
+    ) -> list[SearchHit]:
+        """Los `k` elementos del usuario más parecidos a `query`."""
+        query_vector = (await self._embed([query]))[0]
+        stmt = select(SearchItem.id, SearchItem.vector).where(
+            SearchItem.owner_id == owner_id,
+            SearchItem.model == settings.ai_embed_model,
+            SearchItem.dim == query_vector.shape[0],
+        )
+        if kind is not None:
+            stmt = stmt.where(SearchItem.kind == kind)
+
+        best_ids: list[str] = []
+        best_scores = np.zeros(0, dtype=np.float32)
+        result = await session.stream(stmt.execution_options(yield_per=settings.search_scan_batch))
+        async for partition in result.partitions():
+            ids = [r.id for r in partition]
+            scores = _stack([r.vector for r in partition], query_vector.shape[0]) @ query_vector
+            top = _top_k(scores, k)
+            # Fusión con el top-k acumulado
+            best_ids = best_ids + [ids[i] for i in top]
+            best_scores = np.concatenate([best_scores, scores[top]])
+            keep = _top_k(best_scores, k)
+            best_ids = [best_ids[i] for i in keep]
+            best_scores = best_scores[keep]
+        if not best_ids:
+            return []
+
+        rows = await session.execute(
+            select(SearchItem, Screenplay.title)
+            .join(Screenplay, Screenplay.id == SearchItem.screenplay_id)
+            .where(SearchItem.id.in_(best_ids))
+        )
+        by_id = {item.id: (item, title) for item, title in rows.all()}
+        hits = []
+        for i in np.argsort(-best_scores):
+            if best_ids[i] not in by_id:
+                continue  # borrado entre el recorrido y esta consulta
+            item, title = by_id[best_ids[i]]
+            hits.append(
+                SearchHit(
+                    screenplay_id=item.screenplay_id,
+                    screenplay_title=title,
+                    kind=item.kind,
+                    item_id=item.item_id,
+                    position=item.position,
+                    label=item.label,
+                    snippet=item.snippet,
+                    score=float(best_scores[i]),
+                )
+            )
+        return hits
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "pending": len(self._pending),
+            "embedded": self.embedded,
+            "failures": self.failures,
+        }
+
+
+search_index = SearchIndex()
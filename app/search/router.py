@@ -0,0 +1,58 @@
+from typing import Annotated, Literal, Optional
+
+import httpx
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.security import UserPublic, get_current_user
+from app.db.database import get_session
+from app.db.models import Screenplay
+from app.utils.ollama_client import OllamaError
+
+from .index import SearchHit, search_index
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+ItemKind = Literal["scene", "character", "location"]
+
+
+class SearchOut(BaseModel):
+    query: str
+    hits: list[SearchHit]
+
+
+def _ensure_enabled() -> None:
+    if not search_index.enabled:
+        raise HTTPException(503, "Search is disabled.")
+
+
+@router.get("", response_model=SearchOut)
+async def search(
+    me: Annotated[UserPublic, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    q: str = Query(min_length=1, max_length=500),
+    k: int = Query(default=10, ge=1, le=50),
+    kind: Optional[ItemKind] = None,
+):
+    """Escenas, personajes y localizaciones del usuario ordenados por similitud con `q`."""
+    _ensure_enabled()
+    try:
+        hits = await search_index.search(session, me.id, q, k=k, kind=kind)
+    except (OllamaError, httpx.HTTPError) as e:
+        raise HTTPException(502, f"Could not embed the query: {e}")
+    return SearchOut(query=q, hits=hits)
+
+
+@router.post("/reindex", status_code=202)
+async def reindex(
+    me: Annotated[UserPublic, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+):
+    """Reindexa en segundo plano todos los guiones del usuario (p. ej. tras cambiar de modelo)."""
+    _ensure_enabled()
+    ids = (await session.scalars(select(Screenplay.id).where(Screenplay.owner_id == me.id))).all()
+    for screenplay_id in ids:
+        search_index.schedule(screenplay_id)
+    return {"scheduled": len(ids)}
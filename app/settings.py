@@ -1,5 +1,15 @@
+from typing import Literal
+
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+
+class ModelLimit(BaseModel):
+    concurrency: int = 2  # generaciones simultáneas en Ollama
+    max_queue: int = 16  # peticiones esperando turno
+    max_wait: float = 60.0  # segundos máximos en cola
+
+
 class Settings(BaseSettings):
     app_env: str = "dev"
     app_host: str = "0.0.0.0"
@@ -8,18 +18,139 @@ class Settings(BaseSettings):
     jwt_expires_min: int = 60
 
     ollama_base_url: str = "http://localhost:11434"
+    # Pool de conexiones del cliente compartido de Ollama
+    ollama_max_connections: int = 20
+    ollama_max_keepalive_connections: int = 10
+    ollama_keepalive_expiry: float = 60.0
+    ollama_http2: bool = False
+    # Varios nodos de Ollama (si está vacío se usa solo ollama_base_url)
+    ollama_base_urls: list[str] = []
+    ollama_health_interval: float = 15.0  # 0 desactiva el health check
+    ollama_health_timeout: float = 5.0
+    # Circuit breaker por nodo: fallos seguidos para expulsarlo y segundos fuera
+    ollama_breaker_threshold: int = 3
+    ollama_breaker_cooldown: float = 30.0
+    # Peticiones cubiertas (hedging): con prompts cortos, si el primer nodo tarda
+    # más de ai_hedge_delay se lanza la misma petición en otro nodo
+    ai_hedge_enabled: bool = False
+    ai_hedge_max_prompt_chars: int = 2000
+    ai_hedge_delay: float = 2.0
     images_base_url: str = "http://localhost:8188"
+    # /health/ready: segundos que se reutiliza el resultado y timeout por comprobación
+    health_cache_ttl: float = 5.0
+    health_check_timeout: float = 3.0
+    # Guiones y proyectos se sirven desde la BD sin revalidar (app.utils.responses);
+    # True los valida contra su response_model antes de enviarlos
+    api_validate_responses: bool = False
 
     ai_text_default: str = "llama3.1:8b"
     ai_text_screenwriter: str = "qwen2.5:32b"
     ai_text_scene_default: str = "openhermes:7b"
     ai_text_scene_creative: str = "mythomax:13b"
+    # Admisión por nombre de modelo (app.utils.scheduler); el resto usa el default
+    ai_model_limits: dict[str, ModelLimit] = {
+        "qwen2.5:32b": ModelLimit(concurrency=1, max_queue=4, max_wait=90),
+        "mythomax:13b": ModelLimit(concurrency=2, max_queue=8, max_wait=60),
+    }
+    ai_model_limit_default: ModelLimit = ModelLimit(concurrency=4, max_queue=16, max_wait=60)
+    # keep_alive que se envía a Ollama por modelo ("10m", "1h", -1 = siempre cargado)
+    ai_keep_alive: dict[str, str | int] = {"qwen2.5:32b": "30m"}
+    ai_keep_alive_default: str | int | None = "10m"
+    # Precarga al arrancar; None = todos los ai_text_* configurados
+    ai_warmup_enabled: bool = False
+    ai_warmup_models: list[str] | None = None
+    # Modelos (por rol ai_text_<rol>) que se precargan cuando un guion entra en
+    # cada estado del flujo: S2 tratamiento, S3 turning points, S9 revisión...
+    ai_stage_models: dict[str, list[str]] = {
+        "S1": ["default"],
+        "S2": ["screenwriter"],
+        "S3": ["screenwriter"],
+        "S4": ["scene_default"],
+        "S5": ["default"],
+        "S6": ["scene_default"],
+        "S7": ["scene_default", "scene_creative"],
+        "S8": ["scene_default"],
+        "S9": ["screenwriter"],
+    }
+    # Router por plazos: segundos por ruta (la cabecera X-AI-Deadline manda) y
+    # alternativas más rápidas de cada modelo, de mejor a peor calidad
+    ai_routing_enabled: bool = False
+    ai_route_deadlines: dict[str, float] = {
+        "synopsis": 90,
+        "turning-points": 90,
+        "character": 60,
+        "location": 60,
+        "dialogue": 45,
+        "scene": 120,
+    }
+    ai_model_ladder: dict[str, list[str]] = {
+        "qwen2.5:32b": ["llama3.1:8b"],
+        "mythomax:13b": ["openhermes:7b"],
+    }
+    # Coalescer generaciones idénticas en vuelo (doble clic, varias pestañas)
+    ai_singleflight_enabled: bool = True
+    # Reintentos cuando una salida JSON (turning points, personajes...) es inválida
+    ai_json_retries: int = 1
+    # Revisión de guiones largos (map-reduce por fragmentos de escenas)
+    ai_review_chunk_chars: int = 12_000
+    ai_review_concurrency: int = 4
+    ai_review_chunk_cache_ttl: int = 7 * 24 * 3600
+    # Caché semántica (embeddings de Ollama) para textos casi idénticos; TTL
+    # en segundos por ruta. Requiere numpy (extra `semantic`)
+    ai_semantic_cache_enabled: bool = False
+    ai_embed_model: str = "nomic-embed-text"
+    ai_semantic_cache_threshold: float = 0.97
+    ai_semantic_cache_max_entries: int = 4096
+    # Índices (uno por usuario, ruta y modelo) que se conservan a la vez
+    ai_semantic_cache_max_indexes: int = 1024
+    ai_semantic_cache_max_chars: int = 8000
+    ai_semantic_cache_route_ttl: dict[str, int] = {
+        "dialogue": 3600,
+        "review": 24 * 3600,
+    }
+    # Búsqueda semántica (GET /search) con ai_embed_model; requiere numpy
+    search_enabled: bool = False
+    search_vector_dtype: Literal["float16", "float32"] = "float16"
+    search_embed_batch: int = 32
+    search_scan_batch: int = 2048
+    search_index_debounce: float = 2.0
+    # Modo sesión de S1–S3: /api/chat con prefijo estable (system + contexto)
+    # y afinidad de nodo por guion para reutilizarlo ya evaluado en Ollama.
+    # Apagado, las mismas llamadas van por /api/generate sin afinidad
+    ai_prompt_sessions_enabled: bool = False
+    ai_prompt_session_ttl: int = 600
+    ai_prompt_session_max: int = 256
+    # Telemetría por generación en la tabla ai_logs (inserciones por lotes)
+    ai_logs_enabled: bool = False
+    ai_logs_batch_size: int = 100
+    ai_logs_flush_interval: float = 5.0
+    ai_logs_buffer_max: int = 10_000
+    # Trabajos asíncronos (POST /ai/jobs): workers en este proceso
+    ai_jobs_workers: int = 2
+    # Segundos en 'running' tras los que un trabajo se da por perdido (reinicio)
+    ai_jobs_stale_after: int = 1800
 
     ai_image_fast: str = "sdxl-turbo"
     ai_image_quality: str = "sdxl"
 
     ai_max_tokens: int = 1024
     ai_temperature: float = 0.8
+    # Segundos que se conserva el buffer de tokens de un stream SSE terminado
+    ai_stream_buffer_ttl: int = 600
+    # Segundos sin ningún cliente leyendo un stream antes de cancelar su generación
+    ai_stream_orphan_grace: float = 15.0
+
+    # Caché de generaciones (memoria + tabla ai_cache). TTL en segundos por ruta;
+    # las rutas que no aparecen (o el modo creativo) no se cachean.
+    ai_cache_enabled: bool = False
+    ai_cache_db_enabled: bool = True
+    ai_cache_memory_max_bytes: int = 64 * 1024 * 1024
+    ai_cache_route_ttl: dict[str, int] = {
+        "review": 24 * 3600,
+        "turning-points": 3600,
+        "dialogue": 3600,
+        "scene": 3600,
+    }
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
@@ -0,0 +1,520 @@
+# testing/fake_ollama.py
+"""Servidor falso de Ollama, determinista, para pruebas de rendimiento locales.
+
+Implementa lo que usa `OllamaClient`: `/api/generate` y `/api/chat` (con y
+sin streaming NDJSON), `/api/embed` (y el antiguo `/api/embeddings`) y
+`/api/tags`. Cada modelo tiene un `ModelProfile`:
+
+- `load_seconds`: carga en frío (primera petición o tras expirar `keep_alive`);
+- `latency`: espera fija antes del primer token;
+- `prompt_tokens_per_second` / `tokens_per_second`: evaluación del prompt y
+  generación (None = instantáneo);
+- `error_rate`: fracción de peticiones que responden 500;
+- `fixtures`: marcador del prompt -> respuesta. Por defecto hay JSON válido
+  para puntos de giro, personajes y localizaciones y texto para el resto.
+
+Como Ollama, recuerda el último prompt de cada modelo: en la siguiente
+petición solo cuenta en `prompt_eval_count` la parte que no comparte con él
+(reutilización del prefijo en modo sesión). Los embeddings son hashes de las
+palabras, así que textos parecidos dan vectores parecidos.
+
+Los errores salen de un `random.Random(seed)`: una misma secuencia de
+peticiones da siempre el mismo resultado.
+
+    python -m app.testing.fake_ollama --port 11434 --config perfiles.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import socket
+import threading
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from time import monotonic
+from typing import Any, AsyncIterator, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+TURNING_POINTS_FIXTURE = json.dumps(
+    [
+        {"id": "TP1", "description": "Una carta anónima obliga a Lucía a volver al pueblo del que huyó."},
+        {"id": "TP2", "description": "Lucía decide quedarse y reabrir el faro que cerró su padre."},
+        {"id": "TP3", "description": "Descubre que la carta la escribió su hermano desaparecido."},
+        {"id": "TP4", "description": "El pueblo la acusa del incendio y pierde el faro."},
+        {"id": "TP5", "description": "En plena tormenta enciende el faro y salva el barco de su hermano."},
+    ],
+    ensure_ascii=False,
+)
+CHARACTER_FIXTURE = json.dumps(
+    {
+        "id": "char-lucia",
+        "name": "Lucía Ferrer",
+        "bio": "Farera de tercera generación que vive en la ciudad desde hace diez años.",
+        "goal": "Reabrir el faro de su familia.",
+        "conflict": "El pueblo la culpa de la desaparición de su hermano.",
+        "arc": "De la huida a la responsabilidad.",
+    },
+    ensure_ascii=False,
+)
+LOCATION_FIXTURE = json.dumps(
+    {
+        "id": "loc-faro",
+        "name": "Faro de Cabo Negro",
+        "details": "Torre blanca sobre el acantilado, escalera de caracol oxidada y lámpara apagada.",
+    },
+    ensure_ascii=False,
+)
+TEXT_FIXTURE = (
+    "INT. FARO DE CABO NEGRO - NOCHE\n\n"
+    "La lámpara gira despacio. LUCÍA sube la escalera con una linterna.\n\n"
+    "LUCÍA\nNadie ha subido aquí en diez años.\n\n"
+    "Abajo, el mar golpea las rocas. Algo se mueve entre las sombras."
+)
+
+# Marcadores de los prompts de app/ai/prompts.py (el primero que aparece gana)
+DEFAULT_FIXTURES = {
+    "Puntos de Giro": TURNING_POINTS_FIXTURE,
+    "personaje memorable": CHARACTER_FIXTURE,
+    "localización cinematográfica": LOCATION_FIXTURE,
+}
+
+_TOKEN_RE = re.compile(r"\s*\S+|\s+")
+# Aproximación de Ollama: ~4 caracteres por token de prompt
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class ModelProfile:
+    load_seconds: float = 0.0
+    latency: float = 0.0
+    prompt_tokens_per_second: Optional[float] = None
+    tokens_per_second: Optional[float] = None
+    error_rate: float = 0.0
+    fixtures: dict[str, str] = field(default_factory=dict)
+    default_response: str = TEXT_FIXTURE
+    embed_dim: int = 64
+    size: int = 4_000_000_000
+
+    def response_for(self, prompt: str) -> str:
+        # Las respuestas del perfil mandan sobre las de por defecto
+        for fixtures in (self.fixtures, DEFAULT_FIXTURES):
+            for marker, response in fixtures.items():
+                if marker in prompt:
+                    return response
+        return self.default_response
+
+
+def split_tokens(text: str) -> list[str]:
+    """Trocea `text` en "tokens" (palabras con su espacio) cuya unión es `text`."""
+    return _TOKEN_RE.findall(text)
+
+
+def keep_alive_seconds(value: Any) -> Optional[float]:
+    """Segundos de `keep_alive` ("10m", "1h", 30, -1); None = indefinido."""
+    if value is None:
+        return 300.0
+    if isinstance(value, (int, float)):
+        return None if value < 0 else float(value)
+    match = re.fullmatch(r"(-?[\d.]+)\s*([smh]?)", str(value).strip())
+    if not match:
+        return 300.0
+    number = float(match.group(1))
+    if number < 0:
+        return None
+    return number * {"": 1, "s": 1, "m": 60, "h": 3600}[match.group(2)]
+
+
+def embed_text(text: str, dim: int) -> list[float]:
+    """Vector normalizado con las palabras de `text` repartidas por hash."""
+    vector = [0.0] * dim
+    for word in re.findall(r"\w+", text.lower()):
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dim
+        vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def _common_prefix(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class FakeOllama:
+    def __init__(
+        self,
+        models: Optional[dict[str, ModelProfile]] = None,
+        default: Optional[ModelProfile] = None,
+        seed: int = 0,
+        strict: bool = False,
+    ):
+        self.models = dict(models or {})
+        # Perfil para modelos no declarados; con `strict` responden 404 como Ollama
+        self.default = None if strict else (default or ModelProfile())
+        self.seed = seed
+        self.reset()
+        self.app = self._build_app()
+
+    def reset(self) -> None:
+        """Olvida modelos cargados, prefijos evaluados y contadores."""
+        self.random = random.Random(self.seed)
+        # modelo -> instante en que expira (None = indefinido)
+        self.loaded: dict[str, Optional[float]] = {}
+        # Dos peticiones en frío al mismo modelo esperan una única carga
+        self._loading: dict[str, asyncio.Lock] = {}
+        self._last_prompt: dict[str, str] = {}
+        self.requests: dict[str, int] = {}
+        self.in_flight = 0
+        self.errors = 0
+        self.cancelled = 0
+
+    def profile(self, model: str) -> Optional[ModelProfile]:
+        return self.models.get(model, self.default)
+
+    def stats(self) -> dict:
+        return {
+            "requests": dict(self.requests),
+            "in_flight": self.in_flight,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "loaded": sorted(self.loaded),
+        }
+
+    # ---------- Simulación ----------
+
+    def _is_loaded(self, model: str) -> bool:
+        if model not in self.loaded:
+            return False
+        expires = self.loaded[model]
+        if expires is not None and monotonic() >= expires:
+            del self.loaded[model]
+            return False
+        return True
+
+    async def _load(self, model: str, profile: ModelProfile, keep_alive: Any) -> float:
+        load = 0.0
+        async with self._loading.setdefault(model, asyncio.Lock()):
+            if not self._is_loaded(model):
+                load = profile.load_seconds
+                if load:
+                    await asyncio.sleep(load)
+                self.loaded[model] = None
+        ttl = keep_alive_seconds(keep_alive)
+        if ttl == 0:
+            self.loaded.pop(model, None)
+            self._last_prompt.pop(model, None)
+        else:
+            self.loaded[model] = None if ttl is None else monotonic() + ttl
+        return load
+
+    def _prompt_tokens(self, model: str, prompt: str) -> int:
+        """Tokens a evaluar: lo que no comparte con el último prompt del modelo."""
+        reused = _common_prefix(self._last_prompt.get(model, ""), prompt)
+        self._last_prompt[model] = prompt
+        return max(math.ceil((len(prompt) - reused) / CHARS_PER_TOKEN), 1)
+
+    def _fail(self, profile: ModelProfile) -> bool:
+        return profile.error_rate > 0 and self.random.random() < profile.error_rate
+
+    async def _generate(self, body: dict, chat: bool) -> AsyncIterator[dict]:
+        """Objetos de la respuesta de Ollama; el último lleva `done` y tiempos."""
+        model = body["model"]
+        profile = self.profile(model)
+        started = monotonic()
+        load = await self._load(model, profile, body.get("keep_alive"))
+
+        if chat:
+            prompt = "\n".join(m.get("content", "") for m in body.get("messages", []))
+        else:
+            prompt = (body.get("system") or "") + (body.get("prompt") or "")
+        if not prompt:
+            # Petición solo de carga (`OllamaClient.load_model`)
+            yield self._final(model, chat, "load", load, 0, 0.0, 0, 0.0, started)
+            return
+
+        prompt_tokens = self._prompt_tokens(model, prompt)
+        prompt_eval = profile.latency
+        if profile.prompt_tokens_per_second:
+            prompt_eval += prompt_tokens / profile.prompt_tokens_per_second
+        if prompt_eval:
+            await asyncio.sleep(prompt_eval)
+
+        limit = (body.get("options") or {}).get("num_predict")
+        tokens = split_tokens(profile.response_for(prompt))
+        reason = "stop"
+        if limit is not None and 0 <= limit < len(tokens):
+            tokens, reason = tokens[:limit], "length"
+        step = 1 / profile.tokens_per_second if profile.tokens_per_second else 0.0
+        eval_started = monotonic()
+        for token in tokens:
+            if step:
+                await asyncio.sleep(step)
+            yield self._chunk(model, chat, token)
+        eval_duration = monotonic() - eval_started
+        yield self._final(
+            model, chat, reason, load, prompt_tokens, prompt_eval, len(tokens), eval_duration, started
+        )
+
+    def _chunk(self, model: str, chat: bool, text: str) -> dict:
+        obj: dict[str, Any] = {"model": model, "created_at": _now(), "done": False}
+        if chat:
+            obj["message"] = {"role": "assistant", "content": text}
+        else:
+            obj["response"] = text
+        return obj
+
+    def _final(
+        self,
+        model: str,
+        chat: bool,
+        reason: str,
+        load: float,
+        prompt_tokens: int,
+        prompt_eval: float,
+        eval_count: int,
+        eval_duration: float,
+        started: float,
+    ) -> dict:
+        obj = self._chunk(model, chat, "")
+        obj.update(
+            done=True,
+            done_reason=reason,
+            total_duration=int((monotonic() - started) * 1e9),
+            load_duration=int(load * 1e9),
+            prompt_eval_count=prompt_tokens,
+            prompt_eval_duration=int(prompt_eval * 1e9),
+            eval_count=eval_count,
+            eval_duration=int(eval_duration * 1e9),
+        )
+        return obj
+
+    # ---------- HTTP ----------
+
+    def _check(self, path: str, body: dict) -> Optional[JSONResponse]:
+        self.requests[path] = self.requests.get(path, 0) + 1
+        model = body.get("model")
+        profile = self.profile(model) if model else None
+        if profile is None:
+            return JSONResponse({"error": f"model '{model}' not found"}, status_code=404)
+        if self._fail(profile):
+            self.errors += 1
+            return JSONResponse({"error": "fake: error simulado"}, status_code=500)
+        return None
+
+    async def _completion(self, request: Request, chat: bool):
+        body = await request.json()
+        error = self._check(request.url.path, body)
+        if error is not None:
+            return error
+        if not body.get("stream", True):
+            self.in_flight += 1
+            try:
+                parts, final = [], None
+                async for obj in self._generate(body, chat):
+                    if await request.is_disconnected():
+                        self.cancelled += 1
+                        return JSONResponse({"error": "client disconnected"}, status_code=499)
+                    if obj["done"]:
+                        final = obj
+                    else:
+                        parts.append(obj["message"]["content"] if chat else obj["response"])
+            finally:
+                self.in_flight -= 1
+            text = "".join(parts)
+            if chat:
+                final["message"] = {"role": "assistant", "content": text}
+            else:
+                final["response"] = text
+            return JSONResponse(final)
+
+        async def lines() -> AsyncIterator[bytes]:
+            self.in_flight += 1
+            finished = False
+            try:
+                async for obj in self._generate(body, chat):
+                    # uvicorn descarta en silencio lo que se envía a un cliente
+                    # desconectado: lo comprobamos en cada token, como Ollama
+                    if await request.is_disconnected():
+                        return
+                    yield (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+                finished = True
+            finally:
+                self.in_flight -= 1
+                if not finished:
+                    # El cliente cerró la conexión: Ollama deja de generar
+                    self.cancelled += 1
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="Fake Ollama")
+
+        @app.post("/api/generate")
+        async def generate(request: Request):
+            return await self._completion(request, chat=False)
+
+        @app.post("/api/chat")
+        async def chat(request: Request):
+            return await self._completion(request, chat=True)
+
+        @app.post("/api/embed")
+        async def embed(request: Request):
+            body = await request.json()
+            error = self._check(request.url.path, body)
+            if error is not None:
+                return error
+            texts = body.get("input") or []
+            if isinstance(texts, str):
+                texts = [texts]
+            profile = self.profile(body["model"])
+            load = await self._load(body["model"], profile, body.get("keep_alive"))
+            if profile.latency:
+                await asyncio.sleep(profile.latency)
+            return {
+                "model": body["model"],
+                "embeddings": [embed_text(t, profile.embed_dim) for t in texts],
+                "load_duration": int(load * 1e9),
+                "prompt_eval_count": sum(len(t) // CHARS_PER_TOKEN + 1 for t in texts),
+            }
+
+        @app.post("/api/embeddings")
+        async def embeddings(request: Request):
+            body = await request.json()
+            error = self._check(request.url.path, body)
+            if error is not None:
+                return error
+            profile = self.profile(body["model"])
+            return {"embedding": embed_text(body.get("prompt") or "", profile.embed_dim)}
+
+        @app.get("/api/tags")
+        async def tags():
+            self.requests["/api/tags"] = self.requests.get("/api/tags", 0) + 1
+            return {
+                "models": [
+                    {
+                        "name": name,
+                        "model": name,
+                        "modified_at": _now(),
+                        "size": profile.size,
+                        "digest": hashlib.sha256(name.encode()).hexdigest(),
+                        "details": {"format": "gguf", "family": "fake"},
+                    }
+                    for name, profile in self.models.items()
+                ]
+            }
+
+        @app.get("/_fake/stats")
+        async def fake_stats():
+            return self.stats()
+
+        return app
+
+    # ---------- Servidor en segundo plano ----------
+
+    def serve(self, host: str = "127.0.0.1", port: int = 0) -> "FakeOllamaServer":
+        """Arranca el servidor en un hilo; `port=0` elige uno libre."""
+        server = FakeOllamaServer(self, host, port)
+        server.start()
+        return server
+
+    @classmethod
+    def from_config(cls, config: dict) -> "FakeOllama":
+        """`{"models": {nombre: perfil}, "default": perfil, "seed": 0, "strict": false}`."""
+        return cls(
+            models={name: ModelProfile(**p) for name, p in config.get("models", {}).items()},
+            default=ModelProfile(**config.get("default", {})),
+            seed=config.get("seed", 0),
+            strict=config.get("strict", False),
+        )
+
+    def config(self) -> dict:
+        return {
+            "models": {name: asdict(p) for name, p in self.models.items()},
+            "default": asdict(self.default or ModelProfile()),
+            "seed": self.seed,
+            "strict": self.default is None,
+        }
+
+
+class FakeOllamaServer:
+    """uvicorn en un hilo propio (con su bucle de eventos) sirviendo un FakeOllama."""
+
+    def __init__(self, fake: FakeOllama, host: str = "127.0.0.1", port: int = 0):
+        import uvicorn
+
+        self.fake = fake
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((host, port))
+        self.host, self.port = self.socket.getsockname()[:2]
+        self.server = uvicorn.Server(
+            uvicorn.Config(fake.app, log_level="warning", lifespan="off", access_log=False)
+        )
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self, timeout: float = 10.0) -> None:
+        self._thread = threading.Thread(
+            target=self.server.run, kwargs={"sockets": [self.socket]}, daemon=True
+        )
+        self._thread.start()
+        deadline = monotonic() + timeout
+        while not self.server.started:
+            if monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("No arrancó el Ollama falso")
+            threading.Event().wait(0.01)
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        self.socket.close()
+
+    def __enter__(self) -> "FakeOllamaServer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ollama falso para pruebas de rendimiento")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--config", help="JSON con perfiles por modelo (ver FakeOllama.from_config)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    config: dict = {}
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            config = json.load(f)
+    if args.seed is not None:
+        config["seed"] = args.seed
+    fake = FakeOllama.from_config(config)
+
+    import uvicorn
+
+    uvicorn.run(fake.app, host=args.host, port=args.port, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# testing/fixtures.py
+"""Fixtures de pytest compartidas (se cargan desde conftest.py).
+
+- `fake_ollama`: el Ollama falso de app.testing.fake_ollama.
+- `engine` / `session_factory` / `session`: SQLite en memoria con el esquema
+  creado. Un test que necesite otra BD redefine `engine` en su módulo.
+- `user` y `client`: cliente HTTP de la app con esa BD y `client.user`
+  autenticado (cambiar `client.user` cambia el usuario de las peticiones).
+"""
+from __future__ import annotations
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from app.auth.security import UserPublic, get_current_user, hash_password
+from app.db.database import get_session, get_session_factory
+from app.db.models import Base, User
+from app.settings import settings
+from app.testing.fake_ollama import FakeOllama, FakeOllamaServer, ModelProfile
+from app.utils.ollama_client import close_ollama_client
+
+
+@pytest.fixture(scope="session")
+def fake_ollama_server() -> FakeOllamaServer:
+    server = FakeOllama().serve()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+async def fake_ollama(fake_ollama_server, monkeypatch) -> FakeOllama:
+    """Ollama falso limpio con `settings.ollama_base_url` apuntando a él.
+
+    Los perfiles se ajustan en el propio test (`fake_ollama.models[...] = ...`).
+    """
+    fake = fake_ollama_server.fake
+    fake.models.clear()
+    fake.default = ModelProfile()
+    fake.reset()
+    monkeypatch.setattr(settings, "ollama_base_url", fake_ollama_server.url)
+    monkeypatch.setattr(settings, "ollama_base_urls", [])
+    # El cliente compartido se recrea con la nueva URL
+    await close_ollama_client()
+    yield fake
+    await close_ollama_client()
+
+
+@pytest.fixture
+async def engine() -> AsyncEngine:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine) -> async_sessionmaker:
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+@pytest.fixture
+async def session(session_factory) -> AsyncSession:
+    async with session_factory() as session:
+        yield session
+
+
+@pytest.fixture
+async def user(session_factory) -> User:
+    async with session_factory() as s:
+        user = User(email="tester@example.com", password_hash=hash_password("pw"))
+        s.add(user)
+        await s.commit()
+    return user
+
+
+@pytest.fixture
+async def client(session_factory, user) -> AsyncClient:
+    # Importación tardía: cargar el plugin no debe arrancar la app
+    from app.main import app
+
+    async def override_get_session():
+        # Una sesión por petición, como con get_session
+        async with session_factory() as s:
+            yield s
+
+    async def override_get_current_user():
+        return UserPublic(id=ac.user.id, email=ac.user.email, full_name=None)
+
+    app.dependency_overrides[get_session] = override_get_session
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+    app.dependency_overrides[get_current_user] = override_get_current_user
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        ac.user = user
+        yield ac
+    app.dependency_overrides.clear()
@@ -0,0 +1,77 @@
+# utils/health.py
+"""Comprobaciones de dependencias para `GET /health/ready`.
+
+Cada comprobación se cachea `settings.health_cache_ttl` segundos: un balanceador
+que sondea cada segundo no debe traducirse en una consulta a la BD y otra a
+Ollama por sondeo. Las llamadas concurrentes esperan a la misma comprobación.
+"""
+from __future__ import annotations
+
+import asyncio
+from time import monotonic, perf_counter
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import text
+
+from app.db.database import get_session_factory
+from app.settings import settings
+from app.utils.ollama_client import get_ollama_client
+
+
+class CachedCheck:
+    def __init__(self, name: str, fn: Callable[[], Awaitable[None]]):
+        self.name = name
+        self.fn = fn
+        self._result: Optional[dict] = None
+        self._checked_at = 0.0
+        self._running: Optional[asyncio.Task] = None
+
+    async def run(self) -> dict:
+        if self._result is not None and monotonic() - self._checked_at < settings.health_cache_ttl:
+            return self._result
+        if self._running is None or self._running.done():
+            self._running = asyncio.create_task(self._check())
+        return await asyncio.shield(self._running)
+
+    async def _check(self) -> dict:
+        start = perf_counter()
+        try:
+            await asyncio.wait_for(self.fn(), settings.health_check_timeout)
+            result = {"ok": True}
+        except Exception as e:
+            result = {"ok": False, "error": repr(e)}
+        result["latency"] = perf_counter() - start
+        self._result, self._checked_at = result, monotonic()
+        return result
+
+
+async def check_db() -> None:
+    async with get_session_factory()() as session:
+        await session.execute(text("SELECT 1"))
+
+
+async def check_ollama() -> None:
+    client = get_ollama_client()
+    last_exc: Optional[Exception] = None
+    # Con varios nodos basta con que uno responda
+    for backend in client.pool.backends:
+        try:
+            r = await backend.client.get("/api/tags")
+            r.raise_for_status()
+            return
+        except Exception as e:
+            last_exc = e
+    raise last_exc
+
+
+class Readiness:
+    def __init__(self, checks: list[CachedCheck]):
+        self.checks = checks
+
+    async def run(self) -> tuple[bool, dict]:
+        results = await asyncio.gather(*(c.run() for c in self.checks))
+        report = {c.name: r for c, r in zip(self.checks, results)}
+        return all(r["ok"] for r in results), report
+
+
+readiness = Readiness([CachedCheck("db", check_db), CachedCheck("ollama", check_ollama)])
@@ -0,0 +1,224 @@
+# utils/json_output.py
+"""Salida JSON de los modelos: esquema para `format`, reparación y validación en streaming.
+
+- `output_schema` construye el JSON Schema que se envía en el parámetro
+  `format` de Ollama a partir de un modelo Pydantic.
+- `parse_json_lenient` repara los fallos habituales (bloques ```json, texto
+  alrededor, comas finales, cierres que faltan) y dice qué arregló.
+- `IncrementalJSONValidator` revisa el texto según llega para cortar la
+  generación en cuanto está claro que no es JSON, y para saber cuándo se ha
+  cerrado el valor JSON de primer nivel.
+"""
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Iterable, Optional
+
+from pydantic import BaseModel
+
+_FENCE_RE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.DOTALL)
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class MalformedJSON(ValueError):
+    def __init__(self, message: str, partial: str = ""):
+        super().__init__(message)
+        self.partial = partial
+
+
+def output_schema(
+    model: type[BaseModel],
+    *,
+    exclude: Iterable[str] = (),
+    many: Optional[int] = None,
+) -> dict:
+    """JSON Schema de `model` sin los campos `exclude`.
+
+    Con `many=n` devuelve un array de exactamente n elementos.
+    """
+    schema = model.model_json_schema()
+    excluded = set(exclude)
+    schema["properties"] = {
+        k: v for k, v in schema.get("properties", {}).items() if k not in excluded
+    }
+    schema["required"] = [k for k in schema.get("required", []) if k not in excluded]
+    if "$defs" in schema and not _uses_defs(schema):
+        # Los $defs solo los usaban campos excluidos (p. ej. iaLog)
+        del schema["$defs"]
+    if many is None:
+        return schema
+    return {"type": "array", "items": schema, "minItems": many, "maxItems": many}
+
+
+def _uses_defs(schema: dict) -> bool:
+    return "$ref" in json.dumps(schema.get("properties", {}))
+
+
+# ---------- Reparación tolerante ----------
+def parse_json_lenient(text: str) -> tuple[Any, list[str]]:
+    """Parsea `text` como JSON reparándolo si hace falta.
+
+    Devuelve (datos, reparaciones aplicadas); ValueError si no hay arreglo.
+    """
+    repairs: list[str] = []
+    candidate = text.strip()
+    try:
+        return json.loads(candidate), repairs
+    except json.JSONDecodeError:
+        pass
+
+    fence = _FENCE_RE.search(candidate)
+    if fence:
+        candidate = fence.group(1).strip()
+        repairs.append("code_fence")
+
+    start = _first_container(candidate)
+    if start is None:
+        raise ValueError("No JSON object or array found.")
+    if start > 0:
+        repairs.append("leading_text")
+    candidate = candidate[start:]
+
+    candidate, removed, closers = _scan_repair(candidate)
+    if removed:
+        repairs.append("trailing_comma")
+    if closers:
+        repairs.append("unclosed")
+        candidate += closers
+    try:
+        return json.loads(candidate), repairs
+    except json.JSONDecodeError:
+        pass
+    # Texto después del valor de primer nivel
+    try:
+        data, _ = json.JSONDecoder().raw_decode(candidate)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Unrepairable JSON: {e}") from e
+    repairs.append("trailing_text")
+    return data, repairs
+
+
+def _first_container(text: str) -> Optional[int]:
+    positions = [p for p in (text.find("{"), text.find("[")) if p >= 0]
+    return min(positions) if positions else None
+
+
+def _scan_repair(text: str) -> tuple[str, bool, str]:
+    """Quita comas finales fuera de strings y calcula los cierres pendientes."""
+    out: list[str] = []
+    stack: list[str] = []
+    in_string = escaped = removed = False
+    for i, ch in enumerate(text):
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+        elif ch in "}]":
+            if stack and stack[-1] == ch:
+                stack.pop()
+            # Coma justo antes del cierre: ", }" -> " }"
+            j = len(out) - 1
+            while j >= 0 and out[j].isspace():
+                j -= 1
+            if j >= 0 and out[j] == ",":
+                del out[j]
+                removed = True
+            if not stack:
+                out.append(ch)
+                out.extend(text[i + 1 :])
+                return "".join(out), removed, ""
+        out.append(ch)
+    closers = "".join(reversed(stack))
+    if in_string:
+        closers = '"' + closers
+    return "".join(out), removed, closers
+
+
+# ---------- Validación incremental ----------
+class IncrementalJSONValidator:
+    """Sigue la estructura del JSON según llegan fragmentos.
+
+    `feed` devuelve True cuando el valor de primer nivel está completo (se puede
+    dejar de leer) y lanza MalformedJSON cuando la salida no puede ser JSON:
+    demasiado texto antes del primer `{`/`[` o un cierre que no corresponde.
+    """
+
+    def __init__(self, max_prefix: int = 200):
+        self.max_prefix = max_prefix
+        self._prefix = 0
+        self._started = False
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escaped = False
+        self.complete = False
+
+    def feed(self, chunk: str) -> bool:
+        if self.complete:
+            return True
+        for ch in chunk:
+            if not self._started:
+                if ch in _CLOSERS:
+                    self._started = True
+                    self._stack.append(_CLOSERS[ch])
+                    continue
+                self._prefix += 1
+                if self._prefix > self.max_prefix:
+                    raise MalformedJSON("Output does not start with a JSON value.")
+                continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                self._in_string = True
+            elif ch in _CLOSERS:
+                self._stack.append(_CLOSERS[ch])
+            elif ch in "}]":
+                if self._stack.pop() != ch:
+                    raise MalformedJSON(f"Unexpected '{ch}' in JSON output.")
+                if not self._stack:
+                    self.complete = True
+                    return True
+        return False
+
+
+# ---------- Estadísticas ----------
+class JSONStats:
+    """Contadores por tipo de salida (turning-points, character...)."""
+
+    def __init__(self):
+        self._counts: dict[str, dict[str, int]] = {}
+
+    def record(self, name: str, ok: bool, repaired: bool) -> dict[str, int]:
+        counts = self._counts.setdefault(name, {"ok": 0, "failed": 0, "repaired": 0})
+        counts["ok" if ok else "failed"] += 1
+        if repaired:
+            counts["repaired"] += 1
+        return counts
+
+    def success_rate(self, name: str) -> float:
+        counts = self._counts.get(name)
+        if not counts:
+            return 1.0
+        total = counts["ok"] + counts["failed"]
+        return counts["ok"] / total if total else 1.0
+
+    def snapshot(self) -> dict:
+        return {name: dict(c) for name, c in self._counts.items()}
+
+
+json_stats = JSONStats()
@@ -0,0 +1,330 @@
+# utils/metrics.py
+"""Métricas en formato de exposición de Prometheus (texto 0.0.4), sin dependencias.
+
+Contadores, gauges e histogramas con etiquetas. Todo corre en el event loop,
+así que no hay locks: cada observación es un `+=` sobre valores ya reservados
+(el histograma tiene sus buckets preasignados). Los hijos por etiqueta se crean
+una vez con `labels(...)`; en el camino caliente conviene guardarlos.
+
+`CallbackGauge` lee su valor en el momento del scrape (pool de la BD, colas
+de IA...), así que no cuesta nada entre scrapes.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from time import perf_counter
+from typing import Callable, Iterable, Optional, Union
+
+from starlette.routing import Match
+
+# Latencias HTTP / BD en segundos
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Generaciones de Ollama: de segundos a minutos
+AI_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+Number = Union[int, float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(value: Number) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} espera etiquetas {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self._children.items():
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child) -> list[str]:
+        return [f"{self.name}{_fmt_labels(self.labelnames, values)} {_fmt_value(child.value)}"]
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value: Number = 0
+
+    def inc(self, amount: Number = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: Number = 1) -> None:
+        self.value -= amount
+
+    def set(self, value: Number) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: Number = 1) -> None:
+        self._children[()].inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: Number = 1) -> None:
+        self._children[()].inc(amount)
+
+    def dec(self, amount: Number = 1) -> None:
+        self._children[()].dec(amount)
+
+    def set(self, value: Number) -> None:
+        self._children[()].set(value)
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # el último es +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("child", "start")
+
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(perf_counter() - self.start)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float) -> None:
+        self._children[()].observe(value)
+
+    def _render_child(self, values, child: _HistogramChild) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.bounds, float("inf")), child.counts):
+            cumulative += count
+            le = f'le="{_fmt_value(bound)}"'
+            lines.append(
+                f"{self.name}_bucket{_fmt_labels(self.labelnames, values, le)} {cumulative}"
+            )
+        labels = _fmt_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_fmt_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class CallbackGauge(_Metric):
+    """Gauge cuyo valor se calcula al hacer scrape.
+
+    `fn` devuelve un número (sin etiquetas) o un dict {tupla de etiquetas: valor}.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        fn: Callable[[], Union[Number, dict[tuple[str, ...], Number], None]],
+        labelnames: Iterable[str] = (),
+    ):
+        self.fn = fn
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return None
+
+    def render(self) -> list[str]:
+        try:
+            result = self.fn()
+        except Exception:
+            return []
+        if result is None:
+            return []
+        samples = result if isinstance(result, dict) else {(): result}
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, value in samples.items():
+            lines.append(f"{self.name}{_fmt_labels(self.labelnames, values)} {_fmt_value(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        # Idempotente por nombre: los módulos se pueden recargar en tests
+        return self._metrics.setdefault(metric.name, metric)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def counter(name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+    return registry.register(Counter(name, help, labelnames))
+
+
+def gauge(name: str, help: str, labelnames: Iterable[str] = ()) -> Gauge:
+    return registry.register(Gauge(name, help, labelnames))
+
+
+def histogram(
+    name: str, help: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS
+) -> Histogram:
+    return registry.register(Histogram(name, help, labelnames, buckets))
+
+
+def callback_gauge(name: str, help: str, fn, labelnames: Iterable[str] = ()) -> CallbackGauge:
+    return registry.register(CallbackGauge(name, help, fn, labelnames))
+
+
+# ---------- HTTP ----------
+http_requests = counter(
+    "http_requests_total", "Peticiones HTTP por ruta, método y código", ("method", "route", "status")
+)
+http_latency = histogram(
+    "http_request_duration_seconds", "Duración de las peticiones HTTP", ("method", "route")
+)
+http_in_flight = gauge("http_requests_in_flight", "Peticiones HTTP en curso", ("method", "route"))
+
+
+class MetricsMiddleware:
+    """Middleware ASGI: latencia, código y peticiones en curso por ruta.
+
+    La etiqueta `route` es la plantilla de la ruta (`/ai/jobs/{job_id}`), nunca
+    la URL concreta, para no disparar la cardinalidad.
+    """
+
+    # Rutas concretas (método, path) recordadas; se vacía al llenarse
+    MAX_CACHED_PATHS = 4096
+
+    def __init__(self, app, skip: Iterable[str] = ("/metrics",)):
+        self.app = app
+        self.skip = frozenset(skip)
+        self._templates: dict[tuple[str, str], str] = {}
+        # (método, plantilla) -> hijos ya creados; evita recrearlos por petición
+        self._children: dict[tuple[str, str], tuple] = {}
+
+    def _route_template(self, scope) -> str:
+        path_key = (scope["method"], scope["path"])
+        template = self._templates.get(path_key)
+        if template is not None:
+            return template
+        template = "unmatched"
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                template = getattr(route, "path", "unmatched")
+                break
+        if len(self._templates) >= self.MAX_CACHED_PATHS:
+            self._templates.clear()
+        self._templates[path_key] = template
+        return template
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip:
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        key = (method, self._route_template(scope))
+        children = self._children.get(key)
+        if children is None:
+            children = self._children[key] = (
+                http_in_flight.labels(*key),
+                http_latency.labels(*key),
+            )
+        in_flight, latency = children
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            latency.observe(perf_counter() - start)
+            in_flight.dec()
+            http_requests.labels(method, key[1], str(status)).inc()
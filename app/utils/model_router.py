@@ -0,0 +1,151 @@
+# utils/model_router.py
+"""Elección de modelo según un plazo (SLO de latencia) y la carga observada.
+
+Cada petición de IA puede traer un plazo en segundos (cabecera
+`X-AI-Deadline`) o usar el de su ruta (`settings.ai_route_deadlines`). Con
+plazo, `ModelRouter.choose` estima cuánto tardaría cada modelo:
+
+- cola: generaciones delante en el `ModelGate` del modelo (activas + en
+  espera, repartidas entre su concurrencia) por su duración media;
+- servicio: carga + evaluación del prompt más los tokens esperados de esa
+  ruta divididos por los tokens/s observados (medias móviles por modelo).
+
+Se usa el modelo pedido si cabe en el plazo; si no, se baja por la escalera
+`settings.ai_model_ladder` hasta el primero que quepa y, si ninguno cabe, el
+que antes termine. Un modelo sin observaciones se considera que cabe.
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Optional
+
+from app.settings import settings
+from app.utils.metrics import counter
+from app.utils.scheduler import GenerationScheduler, scheduler
+
+# Peso de la última observación en las medias móviles
+ALPHA = 0.2
+
+routing_decisions = counter(
+    "ai_routing_decisions_total",
+    "Modelos elegidos por el router de plazos",
+    ("requested", "model", "reason"),
+)
+
+
+def _ewma(old: Optional[float], value: float) -> float:
+    return value if old is None else (1 - ALPHA) * old + ALPHA * value
+
+
+@dataclass
+class Decision:
+    requested: str
+    model: str
+    # "no-deadline" | "fits" | "no-data" | "degraded" | "fastest"
+    reason: str
+    deadline: Optional[float] = None
+    predicted: Optional[float] = None
+
+
+class ModelStats:
+    def __init__(self):
+        self.tokens_per_second: Optional[float] = None
+        # Carga + evaluación del prompt (segundos antes del primer token)
+        self.overhead: Optional[float] = None
+        # Tokens generados por ruta (la longitud de salida depende de la tarea)
+        self.eval_tokens: dict[str, float] = {}
+
+
+class ModelRouter:
+    def __init__(self, gates: GenerationScheduler = scheduler):
+        self.gates = gates
+        self._stats: dict[str, ModelStats] = {}
+
+    def observe(
+        self,
+        model: str,
+        route: str,
+        eval_count: Optional[int],
+        eval_duration: Optional[float],
+        overhead: Optional[float] = None,
+    ) -> None:
+        """Registra una generación terminada (contadores de GenerationMetrics)."""
+        if not eval_count or not eval_duration:
+            return
+        stats = self._stats.setdefault(model, ModelStats())
+        stats.tokens_per_second = _ewma(stats.tokens_per_second, eval_count / eval_duration)
+        if overhead is not None:
+            stats.overhead = _ewma(stats.overhead, overhead)
+        stats.eval_tokens[route] = _ewma(stats.eval_tokens.get(route), eval_count)
+
+    def predict(self, model: str, route: str, max_tokens: Optional[int] = None) -> Optional[float]:
+        """Segundos estimados hasta terminar en `model`; None sin observaciones."""
+        stats = self._stats.get(model)
+        if stats is None or stats.tokens_per_second is None:
+            return None
+        tokens = stats.eval_tokens.get(route)
+        if tokens is None:
+            tokens = max_tokens or settings.ai_max_tokens
+        elif max_tokens:
+            tokens = min(tokens, max_tokens)
+        service = (stats.overhead or 0.0) + tokens / stats.tokens_per_second
+
+        gate = self.gates.gate(model)
+        ahead = gate.active + gate.waiting - gate.limit.concurrency + 1
+        rounds = math.ceil(ahead / gate.limit.concurrency) if ahead > 0 else 0
+        return rounds * (gate.avg_duration or service) + service
+
+    def ladder(self, model: str) -> list[str]:
+        """`model` seguido de sus alternativas más rápidas, sin repetir."""
+        models = [model]
+        for candidate in settings.ai_model_ladder.get(model, []):
+            if candidate not in models:
+                models.append(candidate)
+        return models
+
+    def deadline_for(self, route: str, deadline: Optional[float]) -> Optional[float]:
+        if deadline is not None:
+            return deadline if deadline > 0 else None
+        return settings.ai_route_deadlines.get(route)
+
+    def choose(
+        self,
+        model: str,
+        route: str,
+        deadline: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> Decision:
+        deadline = self.deadline_for(route, deadline)
+        if deadline is None or not settings.ai_routing_enabled:
+            return Decision(requested=model, model=model, reason="no-deadline")
+
+        fastest: Optional[Decision] = None
+        for candidate in self.ladder(model):
+            predicted = self.predict(candidate, route, max_tokens)
+            if predicted is None or predicted <= deadline:
+                if candidate == model:
+                    reason = "fits" if predicted is not None else "no-data"
+                else:
+                    reason = "degraded"
+                return self._decided(Decision(model, candidate, reason, deadline, predicted))
+            if fastest is None or predicted < fastest.predicted:
+                fastest = Decision(model, candidate, "fastest", deadline, predicted)
+        return self._decided(fastest)
+
+    def _decided(self, decision: Decision) -> Decision:
+        routing_decisions.labels(decision.requested, decision.model, decision.reason).inc()
+        return decision
+
+    def stats(self) -> dict:
+        return {
+            model: {
+                "tokens_per_second": s.tokens_per_second,
+                "overhead": s.overhead,
+                "eval_tokens": dict(s.eval_tokens),
+            }
+            for model, s in self._stats.items()
+        }
+
+
+model_router = ModelRouter()
@@ -2,29 +2,170 @@
 from __future__ import annotations
 
 import asyncio
+import importlib.util
 import json
-from typing import Optional
+import logging
+from time import monotonic, perf_counter
+from typing import Any, AsyncIterator, Iterable, Optional
 
 import httpx
+from pydantic import BaseModel
 
 from app.settings import settings
+from app.utils.json_output import IncrementalJSONValidator, MalformedJSON
+from app.utils.metrics import AI_BUCKETS, counter, histogram
+from app.utils.ollama_pool import Backend, BackendPool
+from app.utils.prompt_sessions import PromptSession, prompt_sessions
 
+logger = logging.getLogger(__name__)
 
 DEFAULT_TIMEOUT = getattr(settings, "ai_timeout_seconds", 120)
 DEFAULT_TEMP = getattr(settings, "ai_temperature", 0.7)
 DEFAULT_MAX_TOKENS = getattr(settings, "ai_max_tokens", 512)
+# Una carga por encima de esto cuenta como arranque en frío del modelo
+COLD_LOAD_SECONDS = 1.0
 
 
 class OllamaError(RuntimeError):
     pass
 
 
+class OllamaUnavailable(OllamaError):
+    """Todos los nodos de Ollama están fuera (circuit breaker abierto)."""
+
+
+class GenerationMetrics(BaseModel):
+    """Contadores que Ollama devuelve al terminar una generación.
+
+    Las duraciones se guardan en segundos (Ollama las envía en nanosegundos).
+    """
+
+    prompt_eval_count: Optional[int] = None
+    eval_count: Optional[int] = None
+    load_duration: Optional[float] = None
+    prompt_eval_duration: Optional[float] = None
+    eval_duration: Optional[float] = None
+    total_duration: Optional[float] = None
+    tokens_per_second: Optional[float] = None
+    # Medido en el cliente con streaming; sin él, carga + evaluación del prompt
+    time_to_first_token: Optional[float] = None
+    # Modo sesión: si se esperaba reutilizar el prefijo y el ahorro estimado
+    prefix_reused: Optional[bool] = None
+    prompt_tokens_saved: Optional[int] = None
+    prompt_eval_saved: Optional[float] = None
+
+    def update_from(self, data: dict) -> None:
+        for field in ("prompt_eval_count", "eval_count"):
+            if data.get(field) is not None:
+                setattr(self, field, data[field])
+        for field in ("load_duration", "prompt_eval_duration", "eval_duration", "total_duration"):
+            if data.get(field) is not None:
+                setattr(self, field, data[field] / 1e9)
+        if self.eval_count and self.eval_duration:
+            self.tokens_per_second = self.eval_count / self.eval_duration
+        if self.time_to_first_token is None and self.prompt_eval_duration is not None:
+            self.time_to_first_token = (self.load_duration or 0.0) + self.prompt_eval_duration
+
+
+ollama_latency = histogram(
+    "ollama_request_duration_seconds",
+    "Duración de las llamadas a Ollama (incluidos reintentos)",
+    ("model", "mode"),
+    buckets=AI_BUCKETS,
+)
+ollama_retries = counter("ollama_retries_total", "Reintentos de llamadas a Ollama", ("model",))
+ollama_errors = counter(
+    "ollama_errors_total", "Llamadas a Ollama fallidas por tipo de error", ("model", "error")
+)
+
+
+# Fallos que cuentan para el circuit breaker y permiten probar otro nodo
+_NODE_ERRORS = (httpx.ReadTimeout, httpx.ConnectError, httpx.RemoteProtocolError)
+
+
+def _endpoint(payload: dict) -> str:
+    return "/api/chat" if "messages" in payload else "/api/generate"
+
+
+def _prompt_text(payload: dict) -> str:
+    """El prompt tal y como lo evalúa Ollama (mensajes concatenados en modo chat)."""
+    if "messages" in payload:
+        return "\n".join(m["content"] for m in payload["messages"])
+    return payload["prompt"]
+
+
+def _response_text(obj: dict) -> str:
+    # /api/generate -> "response"; /api/chat -> "message.content"
+    if "message" in obj:
+        return (obj["message"] or {}).get("content") or ""
+    return obj.get("response") or ""
+
+
+def _status_error(e: httpx.HTTPStatusError) -> OllamaError:
+    try:
+        detail = e.response.json()
+    except Exception:
+        detail = e.response.text
+    return OllamaError(f"Ollama devolvió {e.response.status_code}: {detail}")
+
+
 class OllamaClient:
-    def __init__(self, base_url: Optional[str] = None, timeout: Optional[float] = None):
-        self.base_url = base_url or settings.ollama_base_url
+    def __init__(
+        self,
+        base_url: Optional[str | list[str]] = None,
+        timeout: Optional[float] = None,
+        *,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        http2: Optional[bool] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        if isinstance(base_url, str):
+            base_urls = [base_url]
+        else:
+            base_urls = base_url or settings.ollama_base_urls or [settings.ollama_base_url]
+        self.base_urls = list(base_urls)
+        self.base_url = self.base_urls[0]
         self.timeout = timeout or DEFAULT_TIMEOUT
-        # Un único AsyncClient reutilizable
-        self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections or settings.ollama_max_connections,
+            max_keepalive_connections=(
+                max_keepalive_connections or settings.ollama_max_keepalive_connections
+            ),
+            keepalive_expiry=(
+                keepalive_expiry
+                if keepalive_expiry is not None
+                else settings.ollama_keepalive_expiry
+            ),
+        )
+        self.http2 = settings.ollama_http2 if http2 is None else http2
+        if self.http2 and importlib.util.find_spec("h2") is None:
+            # httpx necesita el extra `httpx[http2]`; sin él seguimos en HTTP/1.1
+            logger.warning("ollama_http2 activado pero 'h2' no está instalado; usando HTTP/1.1")
+            self.http2 = False
+        # Contadores propios: httpx no expone cuántas peticiones hay en vuelo
+        self._requests_total = 0
+        self._in_flight = 0
+        # Por modelo: tiempos de carga que informa Ollama y último uso
+        self._model_stats: dict[str, dict] = {}
+        self._hedges_total = 0
+        # Un AsyncClient reutilizable por nodo (pool de conexiones keep-alive)
+        self.pool = BackendPool(
+            [
+                Backend(
+                    url,
+                    httpx.AsyncClient(
+                        base_url=url,
+                        timeout=self.timeout,
+                        limits=self.limits,
+                        http2=self.http2,
+                        transport=transport,
+                    ),
+                )
+                for url in self.base_urls
+            ]
+        )
 
     async def __aenter__(self) -> "OllamaClient":
         return self
@@ -32,9 +173,81 @@ class OllamaClient:
     async def __aexit__(self, exc_type, exc, tb):
         await self.close()
 
+    def start_health_checks(self) -> None:
+        self.pool.start()
+
     async def close(self) -> None:
-        if not self._client.is_closed:
-            await self._client.aclose()
+        await self.pool.stop()
+        for backend in self.pool.backends:
+            if not backend.client.is_closed:
+                await backend.client.aclose()
+
+    @property
+    def is_closed(self) -> bool:
+        return all(b.client.is_closed for b in self.pool.backends)
+
+    def pool_stats(self) -> dict:
+        """Estado del pool de conexiones hacia Ollama (para /ai/status)."""
+        connections = []
+        for backend in self.pool.backends:
+            pool = getattr(getattr(backend.client, "_transport", None), "_pool", None)
+            if pool is not None:
+                connections.extend(getattr(pool, "connections", []))
+        idle = sum(1 for c in connections if c.is_idle())
+        return {
+            "base_url": self.base_url,
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "connections": len(connections),
+            "idle_connections": idle,
+            "active_connections": len(connections) - idle,
+            "requests_total": self._requests_total,
+            "requests_in_flight": self._in_flight,
+            "hedged_requests": self._hedges_total,
+            "closed": self.is_closed,
+            "backends": self.pool.stats(),
+        }
+
+    def model_stats(self) -> dict[str, dict]:
+        """Tiempos de carga (load_duration de Ollama) y último uso por modelo."""
+        return {model: dict(stats) for model, stats in self._model_stats.items()}
+
+    def _record_timings(
+        self,
+        model: str,
+        data: dict,
+        metrics: Optional[GenerationMetrics] = None,
+        backend: Optional[Backend] = None,
+        payload: Optional[dict] = None,
+        session: Optional[PromptSession] = None,
+    ) -> None:
+        if metrics is not None:
+            metrics.update_from(data)
+        if session is not None and backend is not None and payload is not None:
+            saved = prompt_sessions.observe(session, backend.url, _prompt_text(payload), data)
+            if metrics is not None:
+                for field, value in saved.items():
+                    setattr(metrics, field, value)
+        stats = self._model_stats.setdefault(
+            model,
+            {
+                "responses": 0,
+                "cold_loads": 0,
+                "last_load_seconds": 0.0,
+                "max_load_seconds": 0.0,
+                "last_used": 0.0,
+            },
+        )
+        stats["responses"] += 1
+        stats["last_used"] = monotonic()
+        # Ollama informa las duraciones en nanosegundos
+        load = data.get("load_duration", 0) / 1e9
+        stats["last_load_seconds"] = load
+        stats["max_load_seconds"] = max(stats["max_load_seconds"], load)
+        if load >= COLD_LOAD_SECONDS:
+            stats["cold_loads"] += 1
 
     def _build_payload(
         self,
@@ -43,16 +256,41 @@ class OllamaClient:
         temperature: Optional[float],
         max_tokens: Optional[int],
         stream: bool,
+        format: Optional[Any] = None,
+        system: Optional[str] = None,
+        context: Optional[str] = None,
     ) -> dict:
-        return {
+        payload: dict[str, Any] = {
             "model": model,
-            "prompt": prompt,
             "stream": stream,
             "options": {
                 "temperature": float(temperature if temperature is not None else DEFAULT_TEMP),
                 "num_predict": int(max_tokens if max_tokens is not None else DEFAULT_MAX_TOKENS),
             },
         }
+        if system is None and context is None:
+            payload["prompt"] = prompt
+        elif not settings.ai_prompt_sessions_enabled:
+            # Sin modo sesión: una sola llamada a /api/generate con el mismo texto
+            payload["prompt"] = prompt if context is None else f"{context}\n{prompt}"
+            if system is not None:
+                payload["system"] = system
+        else:
+            # Modo sesión (/api/chat): lo estable primero, la tarea al final
+            messages = []
+            if system is not None:
+                messages.append({"role": "system", "content": system})
+            if context is not None:
+                messages.append({"role": "user", "content": context})
+            messages.append({"role": "user", "content": prompt})
+            payload["messages"] = messages
+        if format is not None:
+            # "json" o un JSON Schema (salidas estructuradas de Ollama)
+            payload["format"] = format
+        keep_alive = settings.ai_keep_alive.get(model, settings.ai_keep_alive_default)
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        return payload
 
     async def generate(
         self,
@@ -65,62 +303,110 @@ class OllamaClient:
         timeout: Optional[float] = None,
         retries: int = 2,
         retry_backoff: float = 1.5,
+        format: Optional[Any] = None,
+        validate_json: bool = False,
+        metrics: Optional[GenerationMetrics] = None,
+        system: Optional[str] = None,
+        context: Optional[str] = None,
+        session: Optional[str] = None,
     ) -> str:
         """
         Llama a /api/generate de Ollama y devuelve el texto completo.
         - stream=False (por defecto): una única respuesta JSON.
         - stream=True: consume los fragmentos 'response' hasta 'done': true.
+        - format: "json" o un JSON Schema para restringir la salida.
+        - validate_json: valida el JSON según llega (fuerza streaming); descarta
+          lo que llegue tras el valor completo y lanza MalformedJSON (cortando la
+          generación) en cuanto no puede serlo.
+        - metrics: se rellena con los contadores de Ollama (tokens, duraciones).
+        - system / context: modo sesión; va por /api/chat con el system y el
+          contexto como prefijo estable y `prompt` como último mensaje. Con
+          `ai_prompt_sessions_enabled` apagado va por /api/generate, con el
+          contexto delante del prompt.
+        - session: clave (p. ej. el id del guion) para volver al nodo que ya
+          tiene evaluado el prefijo; el ahorro estimado se anota en `metrics`.
         """
-        payload = self._build_payload(model, prompt, temperature, max_tokens, stream=stream)
-        last_exc: Optional[Exception] = None
+        stream = stream or validate_json
+        payload = self._build_payload(
+            model,
+            prompt,
+            temperature,
+            max_tokens,
+            stream=stream,
+            format=format,
+            system=system,
+            context=context,
+        )
+        prompt_session = self._session(session, model)
         per_request_timeout = timeout or self.timeout
 
+        self._requests_total += 1
+        self._in_flight += 1
+        start = perf_counter()
+        try:
+            return await self._generate_with_retries(
+                payload,
+                stream,
+                per_request_timeout,
+                retries,
+                retry_backoff,
+                validate_json,
+                metrics,
+                prompt_session,
+            )
+        except Exception as e:
+            ollama_errors.labels(model, type(e).__name__).inc()
+            raise
+        finally:
+            self._in_flight -= 1
+            ollama_latency.labels(model, "stream" if stream else "single").observe(
+                perf_counter() - start
+            )
+
+    async def _generate_with_retries(
+        self,
+        payload: dict,
+        stream: bool,
+        per_request_timeout: float,
+        retries: int,
+        retry_backoff: float,
+        validate_json: bool = False,
+        metrics: Optional[GenerationMetrics] = None,
+        session: Optional[PromptSession] = None,
+    ) -> str:
+        last_exc: Optional[Exception] = None
+        tried: list[str] = []
         for attempt in range(retries + 1):
+            backend = self._pick(payload["model"], exclude=tried, session=session)
             try:
-                if not stream:
-                    r = await self._client.post("/api/generate", json=payload, timeout=per_request_timeout)
-                    r.raise_for_status()
-                    data = r.json()
-                    return data.get("response", "")
-                else:
-                    # Streaming NDJSON: cada línea es un objeto con { "response": "...", "done": bool }
-                    text_parts: list[str] = []
-                    async with self._client.stream(
-                        "POST", "/api/generate", json=payload, timeout=per_request_timeout
-                    ) as r:
-                        r.raise_for_status()
-                        async for line in r.aiter_lines():
-                            if not line:
-                                continue
-                            try:
-                                obj = json.loads(line)
-                            except json.JSONDecodeError:
-                                # Algunas veces llega basura / keep-alives vacíos
-                                continue
-                            chunk = obj.get("response")
-                            if chunk:
-                                text_parts.append(chunk)
-                            if obj.get("done"):
-                                break
-                    return "".join(text_parts)
-            except (httpx.ReadTimeout, httpx.ConnectError, httpx.RemoteProtocolError) as e:
+                if session is None and self._should_hedge(payload, stream):
+                    return await self._hedged(backend, payload, per_request_timeout, metrics)
+                return await self._attempt(
+                    backend, payload, stream, per_request_timeout, validate_json, metrics, session
+                )
+            except _NODE_ERRORS as e:
                 last_exc = e
                 if attempt >= retries:
                     break
-                # pequeño backoff para modelos pesados (e.g., qwen2.5:32b)
-                await asyncio.sleep(retry_backoff * (attempt + 1))
+                ollama_retries.labels(payload["model"]).inc()
+                tried.append(backend.url)
+                # Si queda otro nodo se reintenta allí sin esperar; si no, pequeño
+                # backoff para modelos pesados (e.g., qwen2.5:32b)
+                if self.pool.pick(payload["model"], exclude=tried) in (None, backend):
+                    await asyncio.sleep(retry_backoff * (attempt + 1))
             except httpx.HTTPStatusError as e:
                 # Errores 4xx/5xx: no solemos reintentar salvo 5xx
                 if 500 <= e.response.status_code < 600 and attempt < retries:
                     last_exc = e
+                    ollama_retries.labels(payload["model"]).inc()
+                    tried.append(backend.url)
                     await asyncio.sleep(retry_backoff * (attempt + 1))
                     continue
                 # Propagamos el detalle
-                try:
-                    detail = e.response.json()
-                except Exception:
-                    detail = e.response.text
-                raise OllamaError(f"Ollama devolvió {e.response.status_code}: {detail}") from e
+                raise _status_error(e) from e
+            except MalformedJSON:
+                # Reintentar no arregla una salida mal formada: decide el llamante
+                raise
             except Exception as e:
                 last_exc = e
                 break
@@ -128,7 +414,310 @@ class OllamaClient:
         # Si llegamos aquí, agotamos reintentos
         raise OllamaError(f"Fallo al generar con Ollama tras reintentos: {last_exc!r}")
 
+    def _session(self, key: Optional[str], model: str) -> Optional[PromptSession]:
+        if key is None or not settings.ai_prompt_sessions_enabled:
+            return None
+        return prompt_sessions.get(key, model)
+
+    def _pick(
+        self,
+        model: str,
+        exclude: Iterable[str] = (),
+        session: Optional[PromptSession] = None,
+    ) -> Backend:
+        prefer = session.backend_url if session is not None else None
+        backend = self.pool.pick(model, exclude=exclude, prefer=prefer)
+        if backend is None:
+            raise OllamaUnavailable("Ningún nodo de Ollama disponible (circuit breaker abierto).")
+        return backend
+
+    async def _attempt(
+        self,
+        backend: Backend,
+        payload: dict,
+        stream: bool,
+        timeout: float,
+        validate_json: bool = False,
+        metrics: Optional[GenerationMetrics] = None,
+        session: Optional[PromptSession] = None,
+    ) -> str:
+        if stream:
+            validator = IncrementalJSONValidator() if validate_json else None
+            return await self._collect(
+                self._iter_stream(backend, payload, timeout, metrics, session), validator
+            )
+        backend.in_flight += 1
+        backend.requests_total += 1
+        try:
+            r = await backend.client.post(_endpoint(payload), json=payload, timeout=timeout)
+            r.raise_for_status()
+        except _NODE_ERRORS:
+            backend.record_failure()
+            raise
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code >= 500:
+                backend.record_failure()
+            raise
+        finally:
+            backend.in_flight -= 1
+        backend.record_success()
+        data = r.json()
+        self._record_timings(payload["model"], data, metrics, backend, payload, session)
+        return _response_text(data)
+
+    def _should_hedge(self, payload: dict, stream: bool) -> bool:
+        return (
+            settings.ai_hedge_enabled
+            and not stream
+            and len(self.pool.backends) > 1
+            and len(_prompt_text(payload)) <= settings.ai_hedge_max_prompt_chars
+        )
+
+    async def _hedged(
+        self,
+        primary: Backend,
+        payload: dict,
+        timeout: float,
+        metrics: Optional[GenerationMetrics] = None,
+    ) -> str:
+        """Petición cubierta: si `primary` tarda más de `ai_hedge_delay`, se lanza
+        la misma petición en otro nodo y gana la primera respuesta correcta."""
+        first = asyncio.create_task(self._attempt(primary, payload, False, timeout, metrics=metrics))
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=settings.ai_hedge_delay)
+            secondary = None if done else self.pool.alternative(payload["model"], primary)
+            if secondary is None:
+                return await first
+            self._hedges_total += 1
+            tasks.add(
+                asyncio.create_task(
+                    self._attempt(secondary, payload, False, timeout, metrics=metrics)
+                )
+            )
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            # Fallaron las dos: propagamos el error del nodo principal
+            return first.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _collect(
+        self,
+        chunks: AsyncIterator[str],
+        validator: Optional[IncrementalJSONValidator] = None,
+    ) -> str:
+        text_parts: list[str] = []
+        complete = False
+        try:
+            async for chunk in chunks:
+                if complete:
+                    # JSON completo: se sigue leyendo hasta la línea `done`, que
+                    # trae los contadores de Ollama, pero el resto se descarta
+                    continue
+                text_parts.append(chunk)
+                if validator is not None and validator.feed(chunk):
+                    complete = True
+        except MalformedJSON as e:
+            e.partial = "".join(text_parts)
+            raise
+        finally:
+            await chunks.aclose()
+        return "".join(text_parts)
+
+    async def _iter_stream(
+        self,
+        backend: Backend,
+        payload: dict,
+        timeout: float,
+        metrics: Optional[GenerationMetrics] = None,
+        session: Optional[PromptSession] = None,
+    ) -> AsyncIterator[str]:
+        started = monotonic()
+        backend.in_flight += 1
+        backend.requests_total += 1
+        try:
+            # Streaming NDJSON: cada línea es un objeto con { "response": "...", "done": bool }
+            # (en /api/chat el texto llega en "message.content")
+            async with backend.client.stream(
+                "POST", _endpoint(payload), json=payload, timeout=timeout
+            ) as r:
+                if r.is_error:
+                    await r.aread()
+                r.raise_for_status()
+                backend.record_success()
+                async for line in r.aiter_lines():
+                    if not line:
+                        continue
+                    try:
+                        obj = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Algunas veces llega basura / keep-alives vacíos
+                        continue
+                    chunk = _response_text(obj)
+                    if chunk:
+                        if metrics is not None and metrics.time_to_first_token is None:
+                            metrics.time_to_first_token = monotonic() - started
+                        yield chunk
+                    if obj.get("done"):
+                        self._record_timings(
+                            payload["model"], obj, metrics, backend, payload, session
+                        )
+                        break
+        except _NODE_ERRORS:
+            backend.record_failure()
+            raise
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code >= 500:
+                backend.record_failure()
+            raise
+        finally:
+            backend.in_flight -= 1
+
+    async def stream_generate(
+        self,
+        model: str,
+        prompt: str,
+        *,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+        timeout: Optional[float] = None,
+        retries: int = 2,
+        retry_backoff: float = 1.5,
+        metrics: Optional[GenerationMetrics] = None,
+        system: Optional[str] = None,
+        context: Optional[str] = None,
+        session: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Como generate(stream=True) pero entrega cada fragmento según llega.
+        Solo se reintenta si el fallo ocurre antes del primer fragmento.
+        """
+        payload = self._build_payload(
+            model, prompt, temperature, max_tokens, stream=True, system=system, context=context
+        )
+        prompt_session = self._session(session, model)
+        per_request_timeout = timeout or self.timeout
+
+        self._requests_total += 1
+        self._in_flight += 1
+        start = perf_counter()
+        try:
+            tried: list[str] = []
+            for attempt in range(retries + 1):
+                started = False
+                backend = self._pick(model, exclude=tried, session=prompt_session)
+                try:
+                    async for chunk in self._iter_stream(
+                        backend, payload, per_request_timeout, metrics, prompt_session
+                    ):
+                        started = True
+                        yield chunk
+                    return
+                except _NODE_ERRORS as e:
+                    if started or attempt >= retries:
+                        raise OllamaError(f"Fallo en el streaming de Ollama: {e!r}") from e
+                    ollama_retries.labels(model).inc()
+                    tried.append(backend.url)
+                    if self.pool.pick(model, exclude=tried) in (None, backend):
+                        await asyncio.sleep(retry_backoff * (attempt + 1))
+                except httpx.HTTPStatusError as e:
+                    if 500 <= e.response.status_code < 600 and attempt < retries:
+                        ollama_retries.labels(model).inc()
+                        tried.append(backend.url)
+                        await asyncio.sleep(retry_backoff * (attempt + 1))
+                        continue
+                    raise _status_error(e) from e
+        except Exception as e:
+            ollama_errors.labels(model, type(e).__name__).inc()
+            raise
+        finally:
+            self._in_flight -= 1
+            ollama_latency.labels(model, "stream").observe(perf_counter() - start)
+
+    async def load_model(self, model: str, keep_alive: Optional[str | int] = None) -> float:
+        """Carga `model` en Ollama sin generar (petición sin prompt).
+
+        Devuelve los segundos de carga que informa Ollama (≈0 si ya estaba cargado).
+        """
+        payload: dict[str, Any] = {"model": model, "stream": False}
+        if keep_alive is None:
+            keep_alive = settings.ai_keep_alive.get(model, settings.ai_keep_alive_default)
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        backend = self._pick(model)
+        try:
+            r = await backend.client.post("/api/generate", json=payload)
+            r.raise_for_status()
+        except _NODE_ERRORS:
+            backend.record_failure()
+            raise
+        except httpx.HTTPStatusError as e:
+            raise _status_error(e) from e
+        data = r.json()
+        self._record_timings(model, data)
+        return data.get("load_duration", 0) / 1e9
+
+    async def embed(self, model: str, input: str | list[str]) -> list[list[float]]:
+        """Embeddings de `input` con /api/embed (un vector por texto)."""
+        payload: dict[str, Any] = {"model": model, "input": input}
+        backend = self._pick(model)
+        start = perf_counter()
+        backend.in_flight += 1
+        backend.requests_total += 1
+        try:
+            r = await backend.client.post("/api/embed", json=payload)
+            r.raise_for_status()
+        except _NODE_ERRORS as e:
+            backend.record_failure()
+            ollama_errors.labels(model, type(e).__name__).inc()
+            raise
+        except httpx.HTTPStatusError as e:
+            ollama_errors.labels(model, type(e).__name__).inc()
+            raise _status_error(e) from e
+        finally:
+            backend.in_flight -= 1
+            ollama_latency.labels(model, "embed").observe(perf_counter() - start)
+        backend.record_success()
+        return r.json().get("embeddings", [])
+
     async def list_models(self) -> dict:
-        r = await self._client.get("/api/tags")
-        r.raise_for_status()
-        return r.json()
+        """Unión de los `/api/tags` de los nodos disponibles."""
+        models: dict[str, dict] = {}
+        for backend in self.pool.backends:
+            if not backend.available:
+                continue
+            r = await backend.client.get("/api/tags")
+            r.raise_for_status()
+            for m in r.json().get("models", []):
+                models.setdefault(m["name"], m)
+        return {"models": list(models.values())}
+
+
+# ---------- Cliente compartido (vida de la app) ----------
+_shared_client: Optional[OllamaClient] = None
+
+
+def get_ollama_client() -> OllamaClient:
+    """Dependencia FastAPI: devuelve el OllamaClient compartido.
+
+    Se crea en el lifespan de la app; si no existe (p. ej. en tests sin
+    lifespan) se crea bajo demanda con la configuración de `settings`.
+    """
+    global _shared_client
+    if _shared_client is None or _shared_client.is_closed:
+        _shared_client = OllamaClient()
+    return _shared_client
+
+
+async def close_ollama_client() -> None:
+    global _shared_client
+    if _shared_client is not None:
+        await _shared_client.close()
+        _shared_client = None
@@ -0,0 +1,144 @@
+# utils/ollama_pool.py
+"""Varios nodos de Ollama detrás de un mismo OllamaClient.
+
+- Enrutado: el nodo con menos peticiones en vuelo entre los que tienen el
+  modelo (según su `/api/tags`, refrescado en segundo plano).
+- Salud: un bucle consulta `/api/tags` de cada nodo cada
+  `settings.ollama_health_interval` segundos.
+- Circuit breaker: tras `ollama_breaker_threshold` fallos seguidos el nodo
+  queda fuera `ollama_breaker_cooldown` segundos; después recibe tráfico de
+  nuevo y un solo fallo más lo vuelve a expulsar (semiabierto).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from time import monotonic
+from typing import Iterable, Optional
+
+import httpx
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Backend:
+    def __init__(self, url: str, client: httpx.AsyncClient):
+        self.url = url
+        self.client = client
+        self.in_flight = 0
+        self.requests_total = 0
+        # None = aún no sabemos qué modelos tiene (se asume que todos)
+        self.models: Optional[set[str]] = None
+        self.tags_at: Optional[float] = None
+        self.failures = 0  # fallos consecutivos
+        self.ejections = 0
+        self.open_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return monotonic() >= self.open_until
+
+    def has_model(self, model: str) -> bool:
+        if self.models is None:
+            return True
+        # "mistral" equivale a "mistral:latest" en Ollama
+        return model in self.models or (":" not in model and f"{model}:latest" in self.models)
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.open_until = 0.0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= settings.ollama_breaker_threshold:
+            if self.available:
+                self.ejections += 1
+                logger.warning(
+                    "Nodo de Ollama %s expulsado %.0fs tras %d fallos",
+                    self.url,
+                    settings.ollama_breaker_cooldown,
+                    self.failures,
+                )
+            self.open_until = monotonic() + settings.ollama_breaker_cooldown
+
+    def stats(self) -> dict:
+        return {
+            "url": self.url,
+            "available": self.available,
+            "in_flight": self.in_flight,
+            "requests_total": self.requests_total,
+            "consecutive_failures": self.failures,
+            "ejections": self.ejections,
+            "models": sorted(self.models) if self.models is not None else None,
+            "tags_age": round(monotonic() - self.tags_at, 1) if self.tags_at else None,
+        }
+
+
+class BackendPool:
+    def __init__(self, backends: list[Backend]):
+        if not backends:
+            raise ValueError("Se necesita al menos un nodo de Ollama.")
+        self.backends = backends
+        self._health_task: Optional[asyncio.Task] = None
+
+    def pick(
+        self, model: str, exclude: Iterable[str] = (), prefer: Optional[str] = None
+    ) -> Optional[Backend]:
+        """Nodo disponible con menos carga, prefiriendo los que tienen `model`.
+
+        `exclude` (URLs ya intentadas) se ignora si deja sin candidatos.
+        `prefer` (URL) gana si es candidato: ahí Ollama ya tiene el prompt
+        anterior de la sesión evaluado.
+        """
+        available = [b for b in self.backends if b.available]
+        excluded = set(exclude)
+        candidates = [b for b in available if b.url not in excluded] or available
+        if not candidates:
+            return None
+        with_model = [b for b in candidates if b.has_model(model)]
+        for backend in with_model:
+            if backend.url == prefer:
+                return backend
+        # Si ninguno lo tiene (tags desactualizados) dejamos que Ollama decida
+        return min(with_model or candidates, key=lambda b: (b.in_flight, b.requests_total))
+
+    def alternative(self, model: str, primary: Backend) -> Optional[Backend]:
+        """Otro nodo disponible distinto de `primary` (para peticiones cubiertas)."""
+        backend = self.pick(model, exclude=[primary.url])
+        return backend if backend is not primary else None
+
+    async def refresh(self, backend: Backend) -> bool:
+        try:
+            r = await backend.client.get("/api/tags", timeout=settings.ollama_health_timeout)
+            r.raise_for_status()
+            backend.models = {m["name"] for m in r.json().get("models", [])}
+        except Exception as e:
+            logger.debug("Health check de %s falló: %r", backend.url, e)
+            backend.record_failure()
+            return False
+        backend.tags_at = monotonic()
+        backend.record_success()
+        return True
+
+    async def refresh_all(self) -> None:
+        await asyncio.gather(*(self.refresh(b) for b in self.backends))
+
+    def start(self) -> None:
+        if self._health_task is None and settings.ollama_health_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+
+    async def _health_loop(self) -> None:
+        while True:
+            await self.refresh_all()
+            await asyncio.sleep(settings.ollama_health_interval)
+
+    def stats(self) -> list[dict]:
+        return [b.stats() for b in self.backends]
@@ -0,0 +1,132 @@
+# utils/prompt_sessions.py
+"""Sesiones de prompt por guion: reutilizar el prefijo ya evaluado en Ollama.
+
+La cadena S1→S3 (sinopsis → tratamiento → puntos de giro) manda cada vez el
+mismo system y el mismo contexto del guion. Ollama guarda la evaluación del
+último prompt de cada modelo y, si la siguiente petición empieza igual, solo
+evalúa lo nuevo; pero esa caché vive en un nodo concreto. Una `PromptSession`
+por (guion, modelo) recuerda:
+
+- el nodo que atendió la última llamada, para volver a él (afinidad);
+- el último prompt, para saber qué parte se espera reutilizar.
+
+El ahorro se estima con los tokens por carácter y el tiempo por token que
+Ollama informa en las llamadas sin prefijo reutilizado: lo que debería haber
+costado el prompt completo menos lo que informa `prompt_eval_count`. Si Ollama
+no reutilizó nada (modelo descargado, nodo distinto) el ahorro sale ≈0.
+
+Las sesiones caducan a los `ai_prompt_session_ttl` segundos sin uso y, por
+encima de `ai_prompt_session_max`, se expulsa la menos usada recientemente.
+"""
+from __future__ import annotations
+
+import os
+from collections import OrderedDict
+from time import monotonic
+from typing import Optional
+
+from app.settings import settings
+
+
+class PromptSession:
+    def __init__(self, key: str, model: str):
+        self.key = key
+        self.model = model
+        self.backend_url: Optional[str] = None
+        self.last_prompt = ""
+        self.last_used = monotonic()
+        self.calls = 0
+        self.reused = 0
+
+    def expected_reuse(self, backend_url: str, prompt: str) -> int:
+        """Caracteres del principio de `prompt` que Ollama debería tener evaluados."""
+        if backend_url != self.backend_url:
+            return 0
+        return len(os.path.commonprefix([self.last_prompt, prompt]))
+
+
+class PromptSessionStore:
+    def __init__(self):
+        self._sessions: OrderedDict[tuple[str, str], PromptSession] = OrderedDict()
+        # Por modelo (depende del tokenizador y del hardware): tokens por
+        # carácter y segundos de evaluación por token del prompt
+        self._tokens_per_char: dict[str, float] = {}
+        self._seconds_per_token: dict[str, float] = {}
+        self.evictions = 0
+        self.tokens_saved = 0
+        self.seconds_saved = 0.0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _expire(self) -> None:
+        deadline = monotonic() - settings.ai_prompt_session_ttl
+        for k in [k for k, s in self._sessions.items() if s.last_used < deadline]:
+            del self._sessions[k]
+            self.evictions += 1
+        while len(self._sessions) > settings.ai_prompt_session_max:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str, model: str) -> PromptSession:
+        """Sesión de `key` para `model`; la crea si no existe o ha caducado."""
+        session = self._sessions.get((key, model))
+        if session is None:
+            session = self._sessions[(key, model)] = PromptSession(key, model)
+        self._sessions.move_to_end((key, model))
+        session.last_used = monotonic()
+        self._expire()
+        return session
+
+    def observe(
+        self, session: PromptSession, backend_url: str, prompt: str, data: dict
+    ) -> dict:
+        """Registra una respuesta de Ollama; devuelve el ahorro estimado.
+
+        `data` es el último objeto de Ollama (con `prompt_eval_count` y
+        `prompt_eval_duration` en nanosegundos).
+        """
+        reused_chars = session.expected_reuse(backend_url, prompt)
+        session.backend_url = backend_url
+        session.last_prompt = prompt
+        session.last_used = monotonic()
+        session.calls += 1
+
+        model = session.model
+        count = data.get("prompt_eval_count") or 0
+        duration = (data.get("prompt_eval_duration") or 0) / 1e9
+        if count and duration:
+            self._seconds_per_token[model] = duration / count
+        if not reused_chars:
+            # Prompt evaluado entero: sirve para calibrar tokens por carácter
+            if count and prompt:
+                self._tokens_per_char[model] = count / len(prompt)
+            return {"prefix_reused": False}
+
+        session.reused += 1
+        tokens_per_char = self._tokens_per_char.get(model)
+        seconds_per_token = self._seconds_per_token.get(model)
+        if tokens_per_char is None or seconds_per_token is None:
+            return {"prefix_reused": True}
+        saved_tokens = max(round(len(prompt) * tokens_per_char) - count, 0)
+        saved_seconds = saved_tokens * seconds_per_token
+        self.tokens_saved += saved_tokens
+        self.seconds_saved += saved_seconds
+        return {
+            "prefix_reused": True,
+            "prompt_tokens_saved": saved_tokens,
+            "prompt_eval_saved": saved_seconds,
+        }
+
+    def stats(self) -> dict:
+        self._expire()
+        return {
+            "sessions": len(self._sessions),
+            "evictions": self.evictions,
+            "reused_calls": sum(s.reused for s in self._sessions.values()),
+            "tokens_saved": self.tokens_saved,
+            "seconds_saved": round(self.seconds_saved, 3),
+        }
+
+
+prompt_sessions = PromptSessionStore()
@@ -0,0 +1,161 @@
+# utils/residency.py
+"""Residencia de modelos en Ollama: precarga al arrancar y según el flujo.
+
+Cargar en frío qwen2.5:32b o mythomax:13b cuesta muchos segundos; sin esto la
+primera petición tras una expulsión paga ese coste. `ModelResidency`:
+
+- al arrancar precarga los modelos `ai_text_*` (uno a uno, en segundo plano);
+- cuando un guion cambia de estado (S1–S9) precarga los modelos de esa etapa
+  según `settings.ai_stage_models`;
+- no recarga un modelo que sigue dentro de su `keep_alive` ni lanza dos
+  cargas simultáneas del mismo modelo.
+
+Los tiempos de carga que informa Ollama salen en /ai/status.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+from time import monotonic
+from typing import Optional
+
+from app.settings import settings
+from app.utils.ollama_client import OllamaClient
+
+logger = logging.getLogger(__name__)
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def keep_alive_seconds(value: str | int | float | None) -> Optional[float]:
+    """Segundos que Ollama mantiene el modelo; None si es indefinido (negativo)."""
+    if value is None:
+        # Por defecto Ollama descarga a los 5 minutos
+        return 300.0
+    if isinstance(value, (int, float)):
+        return None if value < 0 else float(value)
+    value = value.strip()
+    if value.startswith("-"):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        raise ValueError(f"keep_alive no válido: {value!r}")
+    return sum(float(n) * _UNITS[unit] for n, unit in parts)
+
+
+def keep_alive_for(model: str) -> str | int | None:
+    return settings.ai_keep_alive.get(model, settings.ai_keep_alive_default)
+
+
+def models_for_roles(roles: list[str]) -> list[str]:
+    """Nombres de modelo de los roles `ai_text_<rol>`, sin repetir."""
+    models: list[str] = []
+    for role in roles:
+        model = getattr(settings, f"ai_text_{role}", None)
+        if model is None:
+            logger.warning("Rol de modelo desconocido en ai_stage_models: %s", role)
+        elif model not in models:
+            models.append(model)
+    return models
+
+
+class ModelResidency:
+    def __init__(self):
+        self.client: Optional[OllamaClient] = None
+        self._loading: dict[str, asyncio.Task] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._failures: dict[str, int] = {}
+
+    async def start(self, client: OllamaClient) -> None:
+        self.client = client
+        if settings.ai_warmup_enabled:
+            self._spawn(self.warm_up())
+
+    async def stop(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        self.client = None
+
+    def warmup_models(self) -> list[str]:
+        if settings.ai_warmup_models is not None:
+            return list(settings.ai_warmup_models)
+        return models_for_roles(["default", "screenwriter", "scene_default", "scene_creative"])
+
+    async def warm_up(self) -> None:
+        # Secuencial: cargar todos a la vez compite por la misma memoria de GPU
+        for model in self.warmup_models():
+            await self.preload(model)
+
+    def preload_for_state(self, state: str) -> list[str]:
+        """Lanza en segundo plano la precarga de los modelos de la etapa `state`."""
+        if self.client is None or not settings.ai_warmup_enabled:
+            return []
+        models = models_for_roles(settings.ai_stage_models.get(state, []))
+        for model in models:
+            self._spawn(self.preload(model))
+        return models
+
+    def is_resident(self, model: str) -> bool:
+        """True si el modelo se usó dentro de su keep_alive (según este proceso)."""
+        if self.client is None:
+            return False
+        stats = self.client.model_stats().get(model)
+        if not stats:
+            return False
+        ttl = keep_alive_seconds(keep_alive_for(model))
+        return ttl is None or monotonic() - stats["last_used"] < ttl
+
+    async def preload(self, model: str) -> Optional[float]:
+        """Carga `model` si no está residente; devuelve los segundos de carga."""
+        if self.client is None or self.is_resident(model):
+            return None
+        task = self._loading.get(model)
+        if task is None:
+            task = asyncio.create_task(self._load(model))
+            self._loading[model] = task
+            task.add_done_callback(lambda _: self._loading.pop(model, None))
+        return await asyncio.shield(task)
+
+    async def _load(self, model: str) -> Optional[float]:
+        try:
+            seconds = await self.client.load_model(model, keep_alive=keep_alive_for(model))
+        except Exception as e:
+            # La precarga es una optimización: nunca debe romper nada
+            self._failures[model] = self._failures.get(model, 0) + 1
+            logger.warning("No se pudo precargar %s: %r", model, e)
+            return None
+        logger.info("Modelo %s cargado en %.1fs", model, seconds)
+        return seconds
+
+    def stats(self) -> dict:
+        seen = self.client.model_stats() if self.client is not None else {}
+        models = dict.fromkeys([*self.warmup_models(), *seen, *self._failures])
+        out = {}
+        for model in models:
+            stats = seen.get(model, {})
+            out[model] = {
+                "keep_alive": keep_alive_for(model),
+                "resident": self.is_resident(model),
+                "loading": model in self._loading,
+                "cold_loads": stats.get("cold_loads", 0),
+                "last_load_seconds": stats.get("last_load_seconds"),
+                "max_load_seconds": stats.get("max_load_seconds"),
+                "preload_failures": self._failures.get(model, 0),
+            }
+        return out
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+residency = ModelResidency()
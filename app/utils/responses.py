@@ -0,0 +1,43 @@
+# utils/responses.py
+"""Respuestas JSON sin doble validación.
+
+Cuando un handler devuelve un modelo, FastAPI lo vuelca a dict, lo valida
+de nuevo contra `response_model` y lo codifica con `json.dumps`. Para guiones
+con cientos de escenas ese trabajo domina la CPU de la petición.
+
+- `FastJSONResponse` codifica con orjson si está instalado (extra `speed`);
+  si no, igual que la `JSONResponse` de Starlette.
+- `trusted_response` envuelve datos que salen de nuestra propia BD (ya
+  validados al escribirse): FastAPI no pasa por `response_model`, que se
+  mantiene en la ruta solo para OpenAPI. Con `settings.api_validate_responses`
+  se validan igualmente contra el modelo (tests, depuración).
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+from app.settings import settings
+
+try:
+    import orjson
+except ImportError:  # extra opcional
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content)
+
+
+def trusted_response(
+    model: type[BaseModel] | Any, content: Any, status_code: int = 200
+) -> FastJSONResponse:
+    """`content` (tipos JSON nativos) tal cual; `model` es el response_model de la ruta."""
+    if settings.api_validate_responses:
+        TypeAdapter(model).validate_python(content, strict=True)
+    return FastJSONResponse(content, status_code=status_code)
@@ -0,0 +1,145 @@
+# utils/scheduler.py
+"""Control de admisión por modelo entre los routers y OllamaClient.
+
+Cada modelo tiene un límite de generaciones concurrentes y una cola de espera
+acotada (longitud y tiempo máximo). Si la cola está llena o la espera se agota
+se lanza `SchedulerBusy` con un `retry_after` estimado, en vez de apilar
+peticiones dentro de Ollama hasta que venzan por timeout.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+from contextlib import asynccontextmanager
+from time import monotonic
+from typing import AsyncIterator, Optional
+
+from app.settings import ModelLimit, settings
+from app.utils.metrics import callback_gauge
+
+
+class SchedulerBusy(RuntimeError):
+    def __init__(self, model: str, retry_after: int, reason: str):
+        super().__init__(f"Modelo {model} saturado ({reason}); reintentar en {retry_after}s")
+        self.model = model
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class Ticket:
+    """Plaza concedida en un ModelGate; hay que liberarla exactamente una vez."""
+
+    def __init__(self, gate: "ModelGate", waited: float):
+        self.gate = gate
+        self.waited = waited
+        self._acquired_at = monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self.gate._release(monotonic() - self._acquired_at)
+
+
+class ModelGate:
+    def __init__(self, model: str, limit: ModelLimit):
+        self.model = model
+        self.limit = limit
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        # Media móvil de la duración de una generación, para estimar Retry-After
+        self.avg_duration: Optional[float] = None
+        self._sem = asyncio.Semaphore(limit.concurrency)
+
+    def retry_after(self) -> int:
+        avg = self.avg_duration or 5.0
+        rounds = (self.waiting + 1) / self.limit.concurrency
+        return max(1, math.ceil(avg * rounds))
+
+    async def acquire(self) -> Ticket:
+        start = monotonic()
+        if self._sem.locked():
+            if self.waiting >= self.limit.max_queue:
+                self.rejected += 1
+                raise SchedulerBusy(self.model, self.retry_after(), "queue full")
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._sem.acquire(), timeout=self.limit.max_wait)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise SchedulerBusy(self.model, self.retry_after(), "wait timeout") from None
+            finally:
+                self.waiting -= 1
+        else:
+            await self._sem.acquire()
+        self.active += 1
+        return Ticket(self, monotonic() - start)
+
+    def _release(self, duration: float) -> None:
+        self.active -= 1
+        self._sem.release()
+        if self.avg_duration is None:
+            self.avg_duration = duration
+        else:
+            self.avg_duration = 0.8 * self.avg_duration + 0.2 * duration
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "concurrency": self.limit.concurrency,
+            "max_queue": self.limit.max_queue,
+            "max_wait": self.limit.max_wait,
+            "avg_duration": self.avg_duration,
+        }
+
+
+class GenerationScheduler:
+    def __init__(self):
+        self._gates: dict[str, ModelGate] = {}
+
+    def gate(self, model: str) -> ModelGate:
+        gate = self._gates.get(model)
+        if gate is None:
+            limit = settings.ai_model_limits.get(model, settings.ai_model_limit_default)
+            gate = self._gates[model] = ModelGate(model, limit)
+        return gate
+
+    async def acquire(self, model: str) -> Ticket:
+        return await self.gate(model).acquire()
+
+    @asynccontextmanager
+    async def slot(self, model: str) -> AsyncIterator[Ticket]:
+        ticket = await self.acquire(model)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def queue_depth(self, model: str) -> int:
+        gate = self._gates.get(model)
+        return gate.waiting if gate else 0
+
+    def stats(self) -> dict:
+        return {model: gate.stats() for model, gate in self._gates.items()}
+
+
+scheduler = GenerationScheduler()
+
+
+def _per_model(field: str):
+    return lambda: {(model,): stats[field] for model, stats in scheduler.stats().items()}
+
+
+callback_gauge(
+    "ai_queue_active", "Generaciones en curso por modelo", _per_model("active"), ("model",)
+)
+callback_gauge(
+    "ai_queue_waiting", "Peticiones en cola por modelo", _per_model("waiting"), ("model",)
+)
+callback_gauge(
+    "ai_queue_rejected", "Peticiones rechazadas (429) por modelo", _per_model("rejected"), ("model",)
+)
@@ -0,0 +1,52 @@
+# utils/singleflight.py
+"""Coalescencia de llamadas idénticas en vuelo ("single flight").
+
+Si llega una llamada con la misma clave que otra que aún no ha terminado, no se
+lanza de nuevo: se espera al mismo resultado. La llamada corre en su propia
+tarea, así que cancelar a un solicitante no afecta a los demás; solo se cancela
+cuando se va el último.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: dict[str, _Call] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """Ejecuta `fn` una sola vez por clave en vuelo.
+
+        Devuelve (resultado, compartido); `compartido` es True si este
+        solicitante reutilizó una llamada que ya estaba en curso.
+        """
+        call = self._calls.get(key)
+        shared = call is not None
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _t, c=call: self._forget(key, c))
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task), shared
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
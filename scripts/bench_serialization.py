@@ -0,0 +1,318 @@
+"""Microbenchmarks de validación y serialización de guiones.
+
+Mide, con guiones sintéticos de 10/100/1000 escenas:
+
+- parse: `ScreenplayUpdate` desde el cuerpo JSON de un PATCH;
+- out: construcción de `ScreenplayOut` desde el objeto ORM, campo a campo;
+- response: lo que hace FastAPI después con `response_model` (revalidación,
+  serialización y render de la respuesta), usando la ruta real;
+- estrategias completas ORM -> bytes de la respuesta (`STRATEGIES`): la de
+  los handlers (`fast_response`), la anterior (`response_model`) y otras.
+
+De cada caso se informa del tiempo (mejor, media y desviación de `--repeat`
+rondas) y del pico de memoria (tracemalloc, en una ejecución aparte).
+`--output` guarda los resultados en JSON y `--compare` los compara con otro
+fichero (ratio de tiempos).
+
+Usage:
+    poetry run python scripts/bench_serialization.py
+    poetry run python scripts/bench_serialization.py --sizes 100,1000 --output bench.json
+    poetry run python scripts/bench_serialization.py --compare bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import APIRoute, serialize_response  # noqa: E402
+
+from app.db.models import (  # noqa: E402
+    Screenplay,
+    ScreenplayCharacter,
+    ScreenplayLocation,
+    ScreenplayScene,
+    ScreenplaySubplot,
+)
+from app.screenplays.router import (  # noqa: E402
+    COLLECTIONS,
+    ScreenplayOut,
+    ScreenplayUpdate,
+    _iso,
+    item_payload,
+    orm_items,
+    router as screenplays_router,
+    screenplay_payload,
+)
+from app.utils.responses import trusted_response  # noqa: E402
+
+SCENE_TEXT = (
+    "LUCÍA sube la escalera del faro con una linterna. El viento golpea los cristales.\n\n"
+    "LUCÍA\nNadie ha subido aquí en diez años.\n\n"
+    "TOMÁS (O.S.)\nYo sí. Cada noche.\n\n"
+    "Lucía se gira. La linterna ilumina unas botas mojadas en el rellano.\n"
+) * 6
+
+
+def make_screenplay(n_scenes: int) -> Screenplay:
+    """Guion ORM transitorio con `n_scenes` escenas y un personaje por cada diez."""
+    now = datetime.now(timezone.utc)
+    n_characters = max(n_scenes // 10, 1)
+    return Screenplay(
+        id="bench-sp",
+        project_id="bench-project",
+        owner_id="bench-user",
+        title="El faro",
+        logline="Una farera debe reabrir el faro que apagó su familia.",
+        synopsis="Sinopsis. " * 80,
+        treatment="Tratamiento. " * 400,
+        state="S8",
+        turning_points=[
+            {"id": f"TP{i}", "title": f"Punto {i}", "description": "Descripción del punto. " * 4}
+            for i in range(1, 6)
+        ],
+        characters=[
+            ScreenplayCharacter(
+                id=f"ch{i}",
+                position=i,
+                name=f"Personaje {i}",
+                bio="Biografía del personaje. " * 8,
+                goal="Objetivo",
+                conflict="Conflicto",
+                arc="Arco",
+            )
+            for i in range(n_characters)
+        ],
+        subplots=[ScreenplaySubplot(id="sub1", position=0, logline="Subtrama", relevance="alta")],
+        locations=[
+            ScreenplayLocation(id=f"loc{i}", position=i, name=f"Localización {i}", details="Detalles")
+            for i in range(5)
+        ],
+        scenes=[
+            ScreenplayScene(
+                id=f"sc{i}", position=i, header=f"INT. FARO - NOCHE {i}", content=SCENE_TEXT, order=i
+            )
+            for i in range(1, n_scenes + 1)
+        ],
+        created_at=now,
+        updated_at=now,
+    )
+
+
+def items(sp: Screenplay, field: str) -> list[dict]:
+    """Elementos de una colección como los serializa la API."""
+    return [item_payload(row, COLLECTIONS[field][1]) for row in getattr(sp, field)]
+
+
+def update_body(sp: Screenplay) -> bytes:
+    """Cuerpo de un PATCH que reenvía escenas y personajes (como el editor)."""
+    return json.dumps(
+        {"scenes": items(sp, "scenes"), "characters": items(sp, "characters"), "state": sp.state}
+    ).encode("utf-8")
+
+
+def _route(path: str, method: str) -> APIRoute:
+    for route in screenplays_router.routes:
+        if isinstance(route, APIRoute) and route.path == path and method in route.methods:
+            return route
+    raise LookupError(f"{method} {path}")
+
+
+# PATCH declara ScreenplayOut tal cual (GET admite además la respuesta parcial)
+OUT_ROUTE = _route("/screenplays/{screenplay_id}", "PATCH")
+
+
+def build_out(sp: Screenplay) -> ScreenplayOut:
+    """ScreenplayOut campo a campo (lo que hacían los handlers antes de `screenplay_payload`)."""
+    return ScreenplayOut(
+        id=sp.id,
+        project_id=sp.project_id,
+        owner_id=sp.owner_id,
+        title=sp.title,
+        logline=sp.logline,
+        synopsis=sp.synopsis,
+        treatment=sp.treatment,
+        state=sp.state,
+        turning_points=sp.turning_points,
+        characters=items(sp, "characters"),
+        subplots=items(sp, "subplots"),
+        locations=items(sp, "locations"),
+        scenes=items(sp, "scenes"),
+        created_at=_iso(sp.created_at),
+        updated_at=_iso(sp.updated_at),
+    )
+
+
+# serialize_response es async aunque no espera nada: un único bucle para todas
+# las llamadas (run_until_complete añade unos µs constantes por medición)
+LOOP = asyncio.new_event_loop()
+
+
+def fastapi_response(content: Any) -> bytes:
+    """`response_model` + render con la JSONResponse por defecto de FastAPI."""
+    data = LOOP.run_until_complete(
+        serialize_response(
+            field=OUT_ROUTE.response_field, response_content=content, is_coroutine=True
+        )
+    )
+    return JSONResponse(data).body
+
+
+# ---------- Estrategias ORM -> bytes ----------
+
+
+def strategy_response_model(sp: Screenplay) -> bytes:
+    """ScreenplayOut a mano y después `response_model` (doble validación)."""
+    return fastapi_response(build_out(sp))
+
+
+def strategy_fast_response(sp: Screenplay) -> bytes:
+    """La de los handlers: dict de las filas sin revalidar y FastJSONResponse (orjson)."""
+    return trusted_response(ScreenplayOut, screenplay_payload(sp, orm_items(sp))).body
+
+
+def strategy_model_dump_json(sp: Screenplay) -> bytes:
+    """ScreenplayOut a mano y `model_dump_json` (sin revalidar)."""
+    return build_out(sp).model_dump_json().encode("utf-8")
+
+
+def strategy_construct(sp: Screenplay) -> bytes:
+    """Sin validación: `model_construct` con las filas como dicts."""
+    out = ScreenplayOut.model_construct(
+        **{
+            f: items(sp, f) if f in COLLECTIONS else getattr(sp, f)
+            for f in ScreenplayOut.model_fields
+            if not f.endswith("_at")
+        },
+        created_at=_iso(sp.created_at),
+        updated_at=_iso(sp.updated_at),
+    )
+    return out.model_dump_json(warnings=False).encode("utf-8")
+
+
+def strategy_dict_json(sp: Screenplay) -> bytes:
+    """Diccionario con las filas como dicts y `json.dumps` de la stdlib."""
+    data = {f: items(sp, f) if f in COLLECTIONS else getattr(sp, f) for f in ScreenplayOut.model_fields}
+    data["created_at"] = _iso(sp.created_at)
+    data["updated_at"] = _iso(sp.updated_at)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+STRATEGIES: dict[str, Callable[[Screenplay], bytes]] = {
+    "response_model": strategy_response_model,
+    "fast_response": strategy_fast_response,
+    "model_dump_json": strategy_model_dump_json,
+    "construct": strategy_construct,
+    "dict_json": strategy_dict_json,
+}
+
+
+# ---------- Medición ----------
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> dict:
+    timer = timeit.Timer(fn)
+    # Tantas llamadas por ronda como hagan falta para ~0.2 s
+    number, _ = timer.autorange()
+    rounds = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "best": min(rounds),
+        "mean": statistics.mean(rounds),
+        "stdev": statistics.stdev(rounds) if len(rounds) > 1 else 0.0,
+        "loops": number,
+        "peak_bytes": peak,
+    }
+
+
+def cases(n_scenes: int) -> dict[str, Callable[[], Any]]:
+    sp = make_screenplay(n_scenes)
+    body = update_body(sp)
+    out = build_out(sp)
+    result = {
+        "parse/ScreenplayUpdate": lambda: ScreenplayUpdate.model_validate_json(body),
+        "out/ScreenplayOut": lambda: build_out(sp),
+        "response/response_model": lambda: fastapi_response(out),
+    }
+    for name, strategy in STRATEGIES.items():
+        result[f"strategy/{name}"] = (lambda s: lambda: s(sp))(strategy)
+    return result
+
+
+def run(sizes: list[int], repeat: int, only: str | None) -> list[dict]:
+    results = []
+    for n in sizes:
+        payload_bytes = len(strategy_fast_response(make_screenplay(n)))
+        for name, fn in cases(n).items():
+            if only and only not in name:
+                continue
+            stats = measure(fn, repeat)
+            results.append({"case": name, "scenes": n, "payload_bytes": payload_bytes, **stats})
+            print_row(results[-1])
+    return results
+
+
+def print_header() -> None:
+    print(f"{'caso':<30}{'escenas':>8}{'mejor ms':>11}{'media ms':>11}{'±':>8}{'pico KiB':>11}")
+    print("-" * 79)
+
+
+def print_row(r: dict) -> None:
+    print(
+        f"{r['case']:<30}{r['scenes']:>8}{r['best'] * 1000:>11.3f}{r['mean'] * 1000:>11.3f}"
+        f"{r['stdev'] / r['mean'] * 100 if r['mean'] else 0:>7.1f}%{r['peak_bytes'] / 1024:>11.1f}"
+    )
+
+
+def compare(results: list[dict], previous: list[dict]) -> None:
+    before = {(r["case"], r["scenes"]): r for r in previous}
+    print(f"\n{'caso':<30}{'escenas':>8}{'antes ms':>11}{'ahora ms':>11}{'ratio':>8}")
+    print("-" * 68)
+    for r in results:
+        old = before.get((r["case"], r["scenes"]))
+        if old is None:
+            continue
+        print(
+            f"{r['case']:<30}{r['scenes']:>8}{old['best'] * 1000:>11.3f}"
+            f"{r['best'] * 1000:>11.3f}{r['best'] / old['best']:>7.2f}x"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000", help="escenas por guion")
+    parser.add_argument("--repeat", type=int, default=5, help="rondas por caso")
+    parser.add_argument("--only", help="solo casos cuyo nombre contenga este texto")
+    parser.add_argument("--output", help="resultados en JSON")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior")
+    args = parser.parse_args()
+
+    print_header()
+    results = run([int(s) for s in args.sizes.split(",")], args.repeat, args.only)
+    if args.output:
+        Path(args.output).write_text(
+            json.dumps({"python": sys.version.split()[0], "results": results}, indent=2),
+            encoding="utf-8",
+        )
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text(encoding="utf-8"))["results"]
+        compare(results, previous)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+"""Prueba de carga del flujo completo de escritura.
+
+Cada usuario virtual recorre el flujo real: registro y login, proyecto y
+guion, sinopsis → tratamiento → puntos de giro → personajes → escenas, con
+PATCH del guion entre etapas y cada escena guardada con
+`POST /screenplays/{id}/scenes`. Al terminar se informa, por ruta, del
+rendimiento (peticiones/s) y de la latencia p50/p95/p99.
+
+Por defecto arranca en subprocesos un Ollama falso (app/testing/fake_ollama.py)
+y la API (uvicorn) contra SQLite; con `--database-url` se usa otra base de
+datos (p. ej. Postgres ya migrado con `alembic upgrade head`) y con
+`--base-url` / `--ollama-url` se apunta a servicios ya levantados.
+
+Regresiones: `--save-baseline` guarda el informe como referencia y
+`--baseline` lo compara; si alguna ruta empeora más de `--threshold` (0.2 =
+20 %) en las métricas de `--metrics`, o la tasa de errores supera
+`--max-error-rate`, el script termina con código 1.
+
+Usage:
+    poetry run python scripts/load_test.py --users 20 --flows 3
+    poetry run python scripts/load_test.py --users 20 --save-baseline loadtest-baseline.json
+    poetry run python scripts/load_test.py --users 20 --baseline loadtest-baseline.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import uuid
+from contextlib import AsyncExitStack, asynccontextmanager
+from pathlib import Path
+from time import monotonic, perf_counter
+from typing import Optional
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+PERCENTILES = {"p50": 0.50, "p95": 0.95, "p99": 0.99}
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Percentil por rango más cercano (`sorted_values` ya ordenado)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(q * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.error_samples: dict[str, str] = {}
+
+    async def call(self, client: httpx.AsyncClient, route: str, method: str, url: str, **kwargs):
+        start = perf_counter()
+        try:
+            r = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self._error(route, repr(e))
+            raise
+        elapsed = perf_counter() - start
+        if r.is_error:
+            self._error(route, f"{r.status_code} {r.text[:200]}")
+            r.raise_for_status()
+        self.latencies.setdefault(route, []).append(elapsed)
+        return r.json()
+
+    def _error(self, route: str, detail: str) -> None:
+        self.errors[route] = self.errors.get(route, 0) + 1
+        self.error_samples.setdefault(route, detail)
+
+    def report(self, elapsed: float) -> dict:
+        routes = {}
+        for route in sorted(set(self.latencies) | set(self.errors)):
+            values = sorted(self.latencies.get(route, []))
+            errors = self.errors.get(route, 0)
+            total = len(values) + errors
+            routes[route] = {
+                "requests": total,
+                "errors": errors,
+                "error_rate": errors / total if total else 0.0,
+                "rps": len(values) / elapsed if elapsed else 0.0,
+                **{name: percentile(values, q) for name, q in PERCENTILES.items()},
+            }
+        return {"elapsed": elapsed, "routes": routes, "error_samples": self.error_samples}
+
+
+async def writer_flow(
+    client: httpx.AsyncClient, rec: Recorder, headers: dict, name: str, scenes: int
+) -> None:
+    """Un guion de principio a fin, como lo haría la app."""
+    project = await rec.call(
+        client, "POST /projects", "POST", "/projects",
+        json={"name": f"Proyecto {name}"}, headers=headers,
+    )
+    sp = await rec.call(
+        client, "POST /screenplays", "POST", "/screenplays",
+        json={"project_id": project["id"], "title": f"Guion {name}"}, headers=headers,
+    )
+    sp_id = sp["id"]
+    patch = f"/screenplays/{sp_id}"
+
+    await rec.call(
+        client, "POST /ai/synopsis", "POST", "/ai/synopsis",
+        json={
+            "idea": "Una farera vuelve al pueblo del que huyó",
+            "premise": "Nadie escapa de su pasado",
+            "mainTheme": "Responsabilidad",
+            "genre": "Drama",
+            "screenplay_id": sp_id,
+        },
+        headers=headers,
+    )
+    await rec.call(
+        client, "PATCH /screenplays/{id}", "PATCH", patch,
+        json={"logline": "Una farera debe reabrir el faro que apagó su familia.", "state": "S2"},
+        headers=headers,
+    )
+    await rec.call(
+        client, "POST /ai/treatment", "POST", "/ai/treatment",
+        json={"logline": "Una farera debe reabrir el faro", "screenplay_id": sp_id},
+        headers=headers,
+    )
+    tps = await rec.call(
+        client, "POST /ai/turning-points", "POST", "/ai/turning-points",
+        json={"screenplay_id": sp_id}, headers=headers,
+    )
+    await rec.call(
+        client, "PATCH /screenplays/{id}", "PATCH", patch,
+        json={
+            "state": "S4",
+            "turning_points": [
+                {"id": p["id"], "description": p["description"]} for p in tps["points"]
+            ],
+        },
+        headers=headers,
+    )
+
+    # /ai/character ya guarda cada personaje en el guion
+    for role in ("protagonista", "antagonista"):
+        await rec.call(
+            client, "POST /ai/character", "POST", "/ai/character",
+            json={"seed_name": "Lucía", "role": role, "screenplay_id": sp_id}, headers=headers,
+        )
+    await rec.call(
+        client, "PATCH /screenplays/{id}", "PATCH", patch, json={"state": "S8"}, headers=headers
+    )
+
+    for order in range(1, scenes + 1):
+        header = f"INT. FARO - NOCHE {order}"
+        scene = await rec.call(
+            client, "POST /ai/scene", "POST", "/ai/scene",
+            json={
+                "header": header,
+                "context": "Lucía sube al faro",
+                "goal": "Descubrir la carta",
+                "screenplay_id": sp_id,
+            },
+            headers=headers,
+        )
+        # Guardado incremental, como el editor: solo la escena nueva
+        await rec.call(
+            client, "POST /screenplays/{id}/scenes", "POST", f"{patch}/scenes",
+            json={"id": f"sc{order}", "header": header, "content": scene["content"], "order": order},
+            headers=headers,
+        )
+    await rec.call(client, "GET /screenplays/{id}", "GET", patch, headers=headers)
+
+
+async def login(client: httpx.AsyncClient, rec: Recorder, user: int) -> dict:
+    email = f"load-{uuid.uuid4().hex[:12]}-{user}@example.com"
+    await rec.call(
+        client, "POST /auth/register", "POST", "/auth/register",
+        json={"email": email, "password": "load-test-pw", "full_name": f"Usuario {user}"},
+    )
+    data = await rec.call(
+        client, "POST /auth/login", "POST", "/auth/login",
+        json={"email": email, "password": "load-test-pw"},
+    )
+    return {"Authorization": f"Bearer {data['token']['access_token']}"}
+
+
+async def virtual_user(
+    client: httpx.AsyncClient, rec: Recorder, user: int, flows: int, scenes: int, delay: float
+) -> None:
+    await asyncio.sleep(delay)
+    try:
+        headers = await login(client, rec, user)
+    except httpx.HTTPError:
+        return  # error ya registrado
+    for flow in range(flows):
+        try:
+            await writer_flow(client, rec, headers, f"{user}-{flow}", scenes)
+        except httpx.HTTPError:
+            # Error ya registrado: este usuario empieza otro guion
+            continue
+
+
+# ---------- Servicios locales ----------
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_http(url: str, proc: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"El proceso terminó antes de estar listo: {proc.args}")
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} no respondió en {timeout} s")
+
+
+@asynccontextmanager
+async def process(args: list[str], ready_url: str, env: Optional[dict] = None):
+    proc = subprocess.Popen(args, cwd=ROOT, env={**os.environ, **(env or {})})
+    try:
+        await wait_http(ready_url, proc)
+        yield proc
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+async def create_schema(database_url: str) -> None:
+    """SQLite: tablas desde los modelos (Postgres debe estar migrado con alembic)."""
+    os.environ["DATABASE_URL"] = database_url
+    sys.path.insert(0, str(ROOT))
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.db.models import Base
+
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+
+
+def fake_config(args: argparse.Namespace) -> dict:
+    if args.fake_config:
+        return json.loads(Path(args.fake_config).read_text(encoding="utf-8"))
+    return {
+        "default": {
+            "load_seconds": args.fake_load_seconds,
+            "latency": args.fake_latency,
+            "tokens_per_second": args.fake_tokens_per_second,
+            "error_rate": args.fake_error_rate,
+        },
+        "seed": args.seed,
+    }
+
+
+# ---------- Baseline ----------
+
+
+def compare(
+    report: dict, baseline: dict, metrics: list[str], threshold: float, min_delta: float = 0.0
+) -> list[str]:
+    """Rutas que empeoran más de `threshold` respecto a `baseline`.
+
+    En latencias, además, la diferencia debe superar `min_delta` segundos (el
+    ruido de unos milisegundos en rutas rápidas no cuenta como regresión).
+    """
+    problems = []
+    for route, base in baseline.get("routes", {}).items():
+        current = report["routes"].get(route)
+        if current is None:
+            problems.append(f"{route}: sin peticiones (la referencia tiene {base['requests']})")
+            continue
+        for metric in metrics:
+            old, new = base.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            if metric == "rps":
+                worse = new < old * (1 - threshold)
+            else:
+                worse = new > old * (1 + threshold) and new - old > min_delta
+            if worse:
+                problems.append(f"{route}: {metric} {old:.4f} → {new:.4f} ({new / old - 1:+.0%})")
+    return problems
+
+
+def print_report(report: dict) -> None:
+    header = f"{'ruta':<28}{'n':>7}{'err':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for route, r in report["routes"].items():
+        print(
+            f"{route:<28}{r['requests']:>7}{r['errors']:>6}{r['rps']:>9.2f}"
+            f"{r['p50'] * 1000:>10.1f}{r['p95'] * 1000:>10.1f}{r['p99'] * 1000:>10.1f}"
+        )
+    print(f"\nDuración: {report['elapsed']:.1f} s")
+    for route, sample in report["error_samples"].items():
+        print(f"Error en {route}: {sample}")
+
+
+# ---------- Main ----------
+
+
+async def run(args: argparse.Namespace) -> int:
+    async with AsyncExitStack() as stack:
+        base_url = args.base_url
+        if base_url is None:
+            ollama_url = args.ollama_url
+            if ollama_url is None:
+                port = free_port()
+                config = Path(tempfile.mkstemp(suffix=".json")[1])
+                config.write_text(json.dumps(fake_config(args)), encoding="utf-8")
+                stack.callback(config.unlink)
+                ollama_url = f"http://127.0.0.1:{port}"
+                await stack.enter_async_context(
+                    process(
+                        [sys.executable, "-m", "app.testing.fake_ollama",
+                         "--port", str(port), "--config", str(config), "--log-level", "warning"],
+                        f"{ollama_url}/api/tags",
+                    )
+                )
+            database_url = args.database_url
+            if database_url is None:
+                db_file = Path(tempfile.mkstemp(suffix=".db")[1])
+                stack.callback(db_file.unlink)
+                database_url = f"sqlite+aiosqlite:///{db_file}"
+            if database_url.startswith("sqlite"):
+                await create_schema(database_url)
+            port = free_port()
+            base_url = f"http://127.0.0.1:{port}"
+            await stack.enter_async_context(
+                process(
+                    [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                     "--port", str(port), "--workers", str(args.workers), "--log-level", "warning"],
+                    f"{base_url}/health",
+                    env={
+                        "DATABASE_URL": database_url,
+                        "OLLAMA_BASE_URL": ollama_url,
+                        "OLLAMA_BASE_URLS": "[]",
+                        "AI_WARMUP_ENABLED": "false",
+                    },
+                )
+            )
+
+        rec = Recorder()
+        limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+        async with httpx.AsyncClient(
+            base_url=base_url, timeout=args.timeout, limits=limits
+        ) as client:
+            print(f"{args.users} usuarios × {args.flows} guiones contra {base_url}")
+            start = monotonic()
+            await asyncio.gather(
+                *(
+                    virtual_user(
+                        client, rec, u, args.flows, args.scenes, args.ramp * u / args.users
+                    )
+                    for u in range(args.users)
+                )
+            )
+            report = rec.report(monotonic() - start)
+
+    report["config"] = {
+        k: getattr(args, k) for k in ("users", "flows", "scenes", "workers", "seed")
+    }
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Referencia guardada en {args.save_baseline}")
+
+    failed = False
+    for route, r in report["routes"].items():
+        if r["error_rate"] > args.max_error_rate:
+            print(f"FALLO {route}: tasa de errores {r['error_rate']:.1%}")
+            failed = True
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        problems = compare(
+            report, baseline, args.metrics.split(","), args.threshold, args.min_delta
+        )
+        for problem in problems:
+            print(f"REGRESIÓN {problem}")
+        failed = failed or bool(problems)
+        if not problems:
+            print(f"Sin regresiones respecto a {args.baseline} (umbral {args.threshold:.0%})")
+    return 1 if failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10, help="usuarios concurrentes")
+    parser.add_argument("--flows", type=int, default=1, help="guiones por usuario")
+    parser.add_argument("--scenes", type=int, default=3, help="escenas por guion")
+    parser.add_argument("--ramp", type=float, default=0.0, help="segundos hasta arrancar a todos")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--base-url", help="API ya levantada (no se arranca ninguna)")
+    parser.add_argument("--database-url", help="por defecto SQLite temporal")
+    parser.add_argument("--workers", type=int, default=1, help="procesos de uvicorn")
+    parser.add_argument("--ollama-url", help="Ollama (o sustituto) ya levantado")
+    parser.add_argument("--fake-config", help="perfiles JSON del Ollama falso")
+    parser.add_argument("--fake-latency", type=float, default=0.05)
+    parser.add_argument("--fake-load-seconds", type=float, default=0.0)
+    parser.add_argument("--fake-tokens-per-second", type=float, default=500.0)
+    parser.add_argument("--fake-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="informe JSON")
+    parser.add_argument("--baseline", help="informe de referencia con el que comparar")
+    parser.add_argument("--save-baseline", help="guardar este informe como referencia")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--metrics", default="p95,p99", help="p50,p95,p99,rps")
+    parser.add_argument("--min-delta", type=float, default=0.02, help="segundos")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -27,6 +27,9 @@ pull_if "openhermes"
 
 # Mythomax no está en el registry oficial de Ollama; omitir
 
+# Embeddings para la caché semántica (AI_SEMANTIC_CACHE_ENABLED)
+# pull_if "nomic-embed-text"
+
 echo
 echo "Modelos disponibles:"
 ollama list
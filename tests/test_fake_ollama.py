@@ -0,0 +1,180 @@
+import asyncio
+import json
+
+import pytest
+
+from app.ai.router import run_ai_json
+from app.db.models import Project, Screenplay
+from app.settings import settings
+from app.testing.fake_ollama import (
+    TEXT_FIXTURE,
+    TURNING_POINTS_FIXTURE,
+    FakeOllama,
+    ModelProfile,
+    keep_alive_seconds,
+    split_tokens,
+)
+from app.utils.ollama_client import GenerationMetrics, OllamaClient, OllamaError
+
+
+def test_split_tokens_roundtrip():
+    assert "".join(split_tokens(TEXT_FIXTURE)) == TEXT_FIXTURE
+    assert split_tokens("hola  mundo") == ["hola", "  mundo"]
+
+
+def test_keep_alive_seconds():
+    assert keep_alive_seconds("10m") == 600
+    assert keep_alive_seconds("1h") == 3600
+    assert keep_alive_seconds(30) == 30
+    assert keep_alive_seconds(0) == 0
+    assert keep_alive_seconds(-1) is None
+
+
+async def test_generate_reports_configured_timings(fake_ollama: FakeOllama):
+    fake_ollama.models["m"] = ModelProfile(load_seconds=0.05, tokens_per_second=2000)
+    async with OllamaClient() as client:
+        metrics = GenerationMetrics()
+        text = await client.generate("m", "Escribe una escena", metrics=metrics, retries=0)
+        assert text == TEXT_FIXTURE
+        assert metrics.load_duration >= 0.05
+        assert metrics.eval_count == len(split_tokens(TEXT_FIXTURE))
+        assert metrics.tokens_per_second <= 2000
+
+        # Ya cargado: sin coste de carga
+        await client.generate("m", "Otra escena", metrics=(warm := GenerationMetrics()), retries=0)
+        assert warm.load_duration == 0
+
+
+async def test_stream_and_fixtures(fake_ollama: FakeOllama):
+    async with OllamaClient() as client:
+        chunks = [c async for c in client.stream_generate("m", "Genera los cinco Puntos de Giro")]
+        points = json.loads("".join(chunks))
+        assert [p["id"] for p in points] == ["TP1", "TP2", "TP3", "TP4", "TP5"]
+        assert len(chunks) > 1
+
+        character = json.loads(await client.generate("m", "Diseña un personaje memorable (S4)."))
+        assert {"id", "name", "bio", "goal", "conflict", "arc"} <= set(character)
+
+
+async def test_profile_fixture_overrides_default(fake_ollama: FakeOllama):
+    fake_ollama.models["m"] = ModelProfile(fixtures={"Puntos de Giro": "no es JSON"})
+    async with OllamaClient() as client:
+        assert await client.generate("m", "Genera los cinco Puntos de Giro") == "no es JSON"
+        other = await client.generate("otro", "Genera los cinco Puntos de Giro")
+    assert other == TURNING_POINTS_FIXTURE
+
+
+async def test_json_generation_keeps_ollama_timings(fake_ollama: FakeOllama):
+    async with OllamaClient() as client:
+        points, ia_log = await run_ai_json(
+            "m",
+            "Genera los cinco Puntos de Giro",
+            client=client,
+            schema={"type": "array"},
+            output="turning_points",
+        )
+    assert [p["id"] for p in points] == ["TP1", "TP2", "TP3", "TP4", "TP5"]
+    # El valor se completa antes de `done`: los contadores llegan igualmente
+    assert ia_log.metrics.eval_count == len(split_tokens(TURNING_POINTS_FIXTURE))
+    assert ia_log.metrics.tokens_per_second is not None
+
+
+async def test_chat_counts_only_new_prompt_tokens(fake_ollama: FakeOllama, monkeypatch):
+    monkeypatch.setattr(settings, "ai_prompt_sessions_enabled", True)
+    async with OllamaClient() as client:
+        first, second = GenerationMetrics(), GenerationMetrics()
+        context = "Contexto largo del guion. " * 40
+        await client.generate("m", "Tarea uno", system="Sistema", context=context, metrics=first)
+        await client.generate("m", "Tarea dos", system="Sistema", context=context, metrics=second)
+    assert second.prompt_eval_count < first.prompt_eval_count / 10
+    assert fake_ollama.requests["/api/chat"] == 2
+
+
+async def test_error_rate_is_deterministic(fake_ollama: FakeOllama):
+    fake_ollama.models["flaky"] = ModelProfile(error_rate=0.5)
+
+    async def outcomes() -> list[bool]:
+        fake_ollama.reset()
+        results = []
+        async with OllamaClient() as client:
+            for _ in range(10):
+                try:
+                    await client.generate("flaky", "hola", retries=0)
+                    results.append(True)
+                except OllamaError:
+                    results.append(False)
+        return results
+
+    first = await outcomes()
+    assert first == await outcomes()
+    assert True in first and False in first
+    assert fake_ollama.errors == first.count(False)
+
+
+async def test_strict_mode_rejects_unknown_models(fake_ollama: FakeOllama):
+    fake_ollama.default = None
+    async with OllamaClient() as client:
+        with pytest.raises(OllamaError, match="404"):
+            await client.generate("desconocido", "hola", retries=0)
+
+
+async def test_embeddings_and_tags(fake_ollama: FakeOllama):
+    fake_ollama.models["nomic-embed-text"] = ModelProfile(embed_dim=32)
+    async with OllamaClient() as client:
+        a, b, c = await client.embed(
+            "nomic-embed-text", ["el faro de noche", "el faro por la noche", "receta de tarta"]
+        )
+        tags = await client.list_models()
+    assert len(a) == 32
+    dot = lambda x, y: sum(i * j for i, j in zip(x, y))
+    assert dot(a, b) > dot(a, c)
+    assert [m["name"] for m in tags["models"]] == ["nomic-embed-text"]
+
+
+async def test_closing_stream_cancels_generation(fake_ollama: FakeOllama):
+    fake_ollama.models["slow"] = ModelProfile(tokens_per_second=50)
+    async with OllamaClient() as client:
+        stream = client.stream_generate("slow", "Escribe una escena")
+        await stream.__anext__()
+        await stream.aclose()
+    for _ in range(100):
+        if fake_ollama.cancelled:
+            break
+        await asyncio.sleep(0.01)
+    assert fake_ollama.cancelled == 1
+    assert fake_ollama.in_flight == 0
+
+
+async def test_api_endpoint_against_fake(
+    client, session_factory, user, fake_ollama: FakeOllama
+):
+    async with session_factory() as s:
+        s.add(Project(id="p1", name="P", owner_id=user.id))
+        s.add(Screenplay(id="sp1", project_id="p1", owner_id=user.id, title="Guion"))
+        await s.commit()
+
+    body = {"seed_name": "Faro", "genre": "drama", "screenplay_id": "sp1"}
+    r = await client.post("/ai/location", json=body)
+    again = await client.post("/ai/location", json=body)
+    sp = (await client.get("/screenplays/sp1")).json()
+    assert r.status_code == 200, r.text
+    assert r.json()["name"] == "Faro de Cabo Negro"
+    # Se guarda al final de las localizaciones; un id repetido lleva sufijo
+    assert again.json()["id"].startswith(f"{r.json()['id']}-")
+    assert [loc["id"] for loc in sp["locations"]] == [r.json()["id"], again.json()["id"]]
+
+
+async def test_cancelled_request_stops_generation(fake_ollama: FakeOllama):
+    fake_ollama.models["slow"] = ModelProfile(tokens_per_second=20)
+    async with OllamaClient() as client:
+        task = asyncio.create_task(client.generate("slow", "Escribe una escena", retries=0))
+        while not fake_ollama.in_flight:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    for _ in range(100):
+        if not fake_ollama.in_flight:
+            break
+        await asyncio.sleep(0.01)
+    assert fake_ollama.cancelled == 1
@@ -0,0 +1,71 @@
+import pytest
+
+from app.ai.router import TurningPointItem
+from app.utils.json_output import (
+    IncrementalJSONValidator,
+    MalformedJSON,
+    output_schema,
+    parse_json_lenient,
+)
+
+
+def test_valid_json_needs_no_repairs():
+    assert parse_json_lenient('[{"id": "a"}]') == ([{"id": "a"}], [])
+
+
+@pytest.mark.parametrize(
+    "text,repairs",
+    [
+        ('```json\n{"a": 1}\n```', ["code_fence"]),
+        ('Aquí tienes:\n{"a": 1}', ["leading_text"]),
+        ('{"a": 1,}', ["trailing_comma"]),
+        ('{"a": 1', ["unclosed"]),
+        ('{"a": 1} Espero que te sirva.', ["trailing_text"]),
+    ],
+)
+def test_common_failures_are_repaired(text, repairs):
+    assert parse_json_lenient(text) == ({"a": 1}, repairs)
+
+
+def test_commas_inside_strings_are_kept():
+    data, repairs = parse_json_lenient('{"a": "x,}", "b": [1, 2,],}')
+    assert data == {"a": "x,}", "b": [1, 2]}
+    assert repairs == ["trailing_comma"]
+
+
+def test_unrepairable_text_raises():
+    with pytest.raises(ValueError):
+        parse_json_lenient("invalid")
+
+
+def test_validator_detects_completion_across_chunks():
+    validator = IncrementalJSONValidator()
+    assert validator.feed('[{"id": "a", "d": "]}') is False
+    assert validator.feed('"}') is False
+    assert validator.feed("]") is True
+    assert validator.feed(" trailing") is True
+
+
+def test_validator_aborts_on_prose_and_bad_closers():
+    with pytest.raises(MalformedJSON):
+        IncrementalJSONValidator(max_prefix=10).feed("Lo siento, no puedo hacerlo")
+    with pytest.raises(MalformedJSON):
+        IncrementalJSONValidator().feed('{"a": [1}')
+
+
+def test_output_schema_excludes_fields_and_fixes_length():
+    schema = output_schema(TurningPointItem, exclude={"title"}, many=5)
+    assert schema["minItems"] == schema["maxItems"] == 5
+    assert set(schema["items"]["properties"]) == {"id", "description"}
+    assert "title" not in schema["items"]["required"]
+
+
+async def test_run_ai_json_propagates_errors_from_run_ai(monkeypatch):
+    from app.ai import router
+
+    async def failing_run_ai(*args, **kwargs):
+        raise ValueError("modelo desconocido")
+
+    monkeypatch.setattr(router, "run_ai", failing_run_ai)
+    with pytest.raises(ValueError, match="modelo desconocido"):
+        await router.run_ai_json("m", "p", client=None, schema={}, output="turning_points")
@@ -0,0 +1,62 @@
+import pytest
+from httpx import AsyncClient
+
+from app.main import app
+from app.utils import health
+from app.utils.metrics import Counter, Histogram, registry
+
+
+def test_histogram_renders_cumulative_buckets():
+    hist = Histogram("demo_seconds", "demo", ("model",), buckets=(0.1, 1.0))
+    child = hist.labels("m")
+    for value in (0.05, 0.5, 0.7, 3.0):
+        child.observe(value)
+    lines = hist.render()
+    assert 'demo_seconds_bucket{model="m",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{model="m",le="1.0"} 3' in lines
+    assert 'demo_seconds_bucket{model="m",le="+Inf"} 4' in lines
+    assert 'demo_seconds_count{model="m"} 4' in lines
+
+
+def test_labels_reuse_children_and_escape_values():
+    total = Counter("demo_total", "demo", ("route",))
+    assert total.labels('a"b') is total.labels('a"b')
+    total.labels('a"b').inc(2)
+    assert 'demo_total{route="a\\"b"} 2' in total.render()
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_route_templates():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        assert (await ac.get("/health")).status_code == 200
+        await ac.get("/ai/jobs/some-job-id")
+        body = (await ac.get("/metrics")).text
+    assert 'http_requests_total{method="GET",route="/health",status="200"}' in body
+    assert 'route="/ai/jobs/{job_id}"' in body
+    assert "some-job-id" not in body
+    assert "db_pool_size" in body
+    assert registry.get("ollama_request_duration_seconds") is not None
+
+
+@pytest.mark.asyncio
+async def test_readiness_is_cached_and_reports_failures(monkeypatch):
+    calls = {"db": 0}
+
+    async def db_ok():
+        calls["db"] += 1
+
+    async def ollama_down():
+        raise ConnectionError("refused")
+
+    probe = health.Readiness(
+        [health.CachedCheck("db", db_ok), health.CachedCheck("ollama", ollama_down)]
+    )
+    monkeypatch.setattr("app.main.readiness", probe)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        first = await ac.get("/health/ready")
+        second = await ac.get("/health/ready")
+    assert first.status_code == second.status_code == 503
+    checks = first.json()["checks"]
+    assert checks["db"]["ok"] is True
+    assert checks["ollama"]["ok"] is False
+    assert calls["db"] == 1
@@ -0,0 +1,72 @@
+import pytest
+
+from app.ai import router as ai_router
+from app.ai.router import run_ai
+from app.settings import ModelLimit, settings
+from app.utils.model_router import ModelRouter
+from app.utils.scheduler import GenerationScheduler
+
+
+@pytest.fixture
+def ladder(monkeypatch):
+    monkeypatch.setattr(settings, "ai_routing_enabled", True)
+    monkeypatch.setattr(settings, "ai_model_ladder", {"big": ["mid", "small"]})
+    monkeypatch.setattr(settings, "ai_route_deadlines", {"dialogue": 30})
+    monkeypatch.setattr(
+        settings, "ai_model_limits", {"big": ModelLimit(concurrency=1, max_queue=8)}
+    )
+
+
+def make_router() -> ModelRouter:
+    router = ModelRouter(GenerationScheduler())
+    # big: 10 tok/s, mid: 40 tok/s, small: 100 tok/s; 200 tokens por respuesta
+    for model, seconds in (("big", 20.0), ("mid", 5.0), ("small", 2.0)):
+        router.observe(model, "dialogue", eval_count=200, eval_duration=seconds, overhead=1.0)
+    return router
+
+
+def test_keeps_preferred_model_without_deadline_or_data(ladder):
+    router = make_router()
+    decision = router.choose("big", "scene")
+    assert (decision.model, decision.reason) == ("big", "no-deadline")
+
+    decision = ModelRouter(GenerationScheduler()).choose("big", "dialogue")
+    assert (decision.model, decision.reason) == ("big", "no-data")
+
+
+def test_steps_down_the_ladder_when_queue_is_backed_up(ladder):
+    router = make_router()
+    decision = router.choose("big", "dialogue")
+    assert (decision.model, decision.reason) == ("big", "fits")
+    assert decision.predicted == pytest.approx(21.0)
+
+    gate = router.gates.gate("big")
+    gate.active, gate.waiting, gate.avg_duration = 1, 2, 21.0
+    decision = router.choose("big", "dialogue")
+    assert (decision.model, decision.reason) == ("mid", "degraded")
+    assert decision.deadline == 30
+
+    # Plazo imposible: el que antes termine
+    decision = router.choose("big", "dialogue", deadline=1)
+    assert (decision.model, decision.reason) == ("small", "fastest")
+    # 0 desactiva el plazo por defecto de la ruta
+    assert router.choose("big", "dialogue", deadline=0).model == "big"
+
+
+class FakeClient:
+    async def generate(self, model, prompt, metrics=None, **kwargs):
+        return f"from {model}"
+
+
+@pytest.mark.asyncio
+async def test_run_ai_records_routing_in_ialog(ladder, monkeypatch):
+    router = make_router()
+    gate = router.gates.gate("big")
+    gate.active, gate.waiting, gate.avg_duration = 1, 2, 21.0
+    monkeypatch.setattr(ai_router, "model_router", router)
+
+    text, ia_log = await run_ai("big", "p", client=FakeClient(), route="dialogue")
+    assert text == "from mid"
+    assert ia_log.model == "mid"
+    assert ia_log.routing.requested == "big"
+    assert ia_log.routing.reason == "degraded"
@@ -0,0 +1,90 @@
+import json
+
+import httpx
+import pytest
+
+from app.utils import ollama_client
+from app.utils.json_output import MalformedJSON
+from app.utils.ollama_client import OllamaClient, close_ollama_client, get_ollama_client
+
+
+def make_transport(calls: list):
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(json.loads(request.content))
+        return httpx.Response(200, json={"response": "ok", "done": True})
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio
+async def test_client_uses_configured_pool_limits():
+    calls = []
+    client = OllamaClient(
+        base_url="http://ollama.test",
+        max_connections=7,
+        max_keepalive_connections=3,
+        keepalive_expiry=12.5,
+        transport=make_transport(calls),
+    )
+    assert await client.generate(model="m", prompt="p") == "ok"
+    assert await client.generate(model="m", prompt="p") == "ok"
+
+    stats = client.pool_stats()
+    assert stats["max_connections"] == 7
+    assert stats["max_keepalive_connections"] == 3
+    assert stats["keepalive_expiry"] == 12.5
+    assert stats["requests_total"] == 2
+    assert stats["requests_in_flight"] == 0
+    assert len(calls) == 2
+
+    await client.close()
+    assert client.pool_stats()["closed"] is True
+
+
+@pytest.mark.asyncio
+async def test_shared_client_is_reused_until_closed(monkeypatch):
+    monkeypatch.setattr(ollama_client, "_shared_client", None)
+    first = get_ollama_client()
+    assert get_ollama_client() is first
+
+    await close_ollama_client()
+    assert first.is_closed
+    second = get_ollama_client()
+    assert second is not first
+    await close_ollama_client()
+
+
+def ndjson_transport(chunks: list[str], calls: list):
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(json.loads(request.content))
+        body = "\n".join(json.dumps({"response": c, "done": False}) for c in chunks)
+        return httpx.Response(200, content=body.encode())
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio
+async def test_validate_json_sends_format_and_stops_at_value_end():
+    calls = []
+    client = OllamaClient(
+        base_url="http://ollama.test",
+        transport=ndjson_transport(['{"a":', " 1}", " y más texto"], calls),
+    )
+    schema = {"type": "object"}
+    text = await client.generate(model="m", prompt="p", format=schema, validate_json=True)
+    assert text == '{"a": 1}'
+    assert calls[0]["format"] == schema
+    assert calls[0]["stream"] is True
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_validate_json_aborts_on_prose():
+    client = OllamaClient(
+        base_url="http://ollama.test",
+        transport=ndjson_transport(["Lo siento, " * 40], []),
+    )
+    with pytest.raises(MalformedJSON) as exc:
+        await client.generate(model="m", prompt="p", validate_json=True)
+    assert exc.value.partial.startswith("Lo siento")
+    await client.close()
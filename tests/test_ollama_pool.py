@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.settings import settings
+from app.utils.ollama_client import OllamaClient, OllamaUnavailable
+
+URLS = ["http://node-a:11434", "http://node-b:11434"]
+
+
+def fake_nodes(models: dict[str, list[str]], calls: list, down=(), slow=None):
+    """Varios nodos de Ollama simulados, distinguidos por host."""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        if host in down:
+            raise httpx.ConnectError("connection refused", request=request)
+        if request.url.path == "/api/tags":
+            return httpx.Response(200, json={"models": [{"name": m} for m in models[host]]})
+        calls.append(host)
+        if slow and host in slow:
+            await asyncio.sleep(slow[host])
+        body = json.loads(request.content)
+        return httpx.Response(200, json={"response": f"{host}:{body['model']}", "done": True})
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio
+async def test_routes_to_node_with_model_and_least_in_flight():
+    calls = []
+    client = OllamaClient(
+        base_url=URLS,
+        transport=fake_nodes(
+            {"node-a": ["big:32b"], "node-b": ["small:8b", "big:32b"]},
+            calls,
+            slow={"node-a": 0.05, "node-b": 0.05},
+        ),
+    )
+    await client.pool.refresh_all()
+    assert await client.generate(model="small:8b", prompt="p") == "node-b:small:8b"
+
+    calls.clear()
+    await asyncio.gather(*(client.generate(model="big:32b", prompt="p") for _ in range(4)))
+    assert sorted(calls) == ["node-a", "node-a", "node-b", "node-b"]
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_failing_node_is_ejected(monkeypatch):
+    monkeypatch.setattr(settings, "ollama_breaker_threshold", 2)
+    calls = []
+    client = OllamaClient(
+        base_url=URLS,
+        transport=fake_nodes({"node-a": ["m"], "node-b": ["m"]}, calls, down={"node-a"}),
+    )
+    for _ in range(3):
+        # El fallo en node-a se reintenta al momento en node-b
+        assert await client.generate(model="m", prompt="p", retries=1) == "node-b:m"
+    node_a = client.pool.backends[0]
+    assert node_a.available is False
+    assert node_a.ejections == 1
+    assert calls == ["node-b"] * 3
+
+    client.pool.backends[1].open_until = float("inf")
+    with pytest.raises(OllamaUnavailable):
+        await client.generate(model="m", prompt="p")
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_takes_first_answer(monkeypatch):
+    monkeypatch.setattr(settings, "ai_hedge_enabled", True)
+    monkeypatch.setattr(settings, "ai_hedge_delay", 0.05)
+    calls = []
+    client = OllamaClient(
+        base_url=URLS,
+        transport=fake_nodes({"node-a": ["m"], "node-b": ["m"]}, calls, slow={"node-a": 5}),
+    )
+    assert await asyncio.wait_for(client.generate(model="m", prompt="p"), 2) == "node-b:m"
+    assert calls == ["node-a", "node-b"]
+    stats = client.pool_stats()
+    assert stats["hedged_requests"] == 1
+    assert all(b["in_flight"] == 0 for b in stats["backends"])
+    await client.close()
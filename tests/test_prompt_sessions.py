@@ -0,0 +1,116 @@
+import json
+
+import httpx
+import pytest
+
+from app.settings import settings
+from app.utils.ollama_client import GenerationMetrics, OllamaClient
+from app.utils.prompt_sessions import PromptSessionStore, prompt_sessions
+
+
+def chat_transport(calls: list):
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        calls.append((request.url.path, body))
+        prompt = "\n".join(m["content"] for m in body["messages"])
+        # Primera llamada: todo el prompt; después, solo lo que no es prefijo
+        count = len(prompt) if len(calls) == 1 else 10
+        return httpx.Response(
+            200,
+            json={
+                "message": {"role": "assistant", "content": "ok"},
+                "done": True,
+                "prompt_eval_count": count,
+                "prompt_eval_duration": count * 1_000_000,
+            },
+        )
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio
+async def test_session_mode_uses_chat_and_reports_saved_prompt_eval(monkeypatch):
+    monkeypatch.setattr(settings, "ai_prompt_sessions_enabled", True)
+    monkeypatch.setattr("app.utils.ollama_client.prompt_sessions", PromptSessionStore())
+    calls = []
+    client = OllamaClient(base_url="http://ollama.test", transport=chat_transport(calls))
+    context = "Sinopsis: " + "x" * 200
+
+    first = GenerationMetrics()
+    text = await client.generate(
+        model="m", prompt="tarea 1", system="sys", context=context, session="sp1", metrics=first
+    )
+    assert text == "ok"
+    path, body = calls[0]
+    assert path == "/api/chat"
+    assert [m["role"] for m in body["messages"]] == ["system", "user", "user"]
+    assert body["messages"][-1]["content"] == "tarea 1"
+    assert first.prefix_reused is False
+
+    second = GenerationMetrics()
+    await client.generate(
+        model="m", prompt="tarea 2", system="sys", context=context, session="sp1", metrics=second
+    )
+    assert second.prefix_reused is True
+    assert second.prompt_tokens_saved > 0
+    assert second.prompt_eval_saved == pytest.approx(second.prompt_tokens_saved / 1000)
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_plain_prompt_still_uses_generate():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(200, json={"response": "ok", "done": True})
+
+    client = OllamaClient(base_url="http://ollama.test", transport=httpx.MockTransport(handler))
+    assert await client.generate(model="m", prompt="p", session="sp1") == "ok"
+    assert calls == ["/api/generate"]
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_disabled_sessions_fall_back_to_generate(monkeypatch):
+    monkeypatch.setattr(settings, "ai_prompt_sessions_enabled", False)
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append((request.url.path, json.loads(request.content)))
+        return httpx.Response(200, json={"response": "ok", "done": True})
+
+    client = OllamaClient(base_url="http://ollama.test", transport=httpx.MockTransport(handler))
+    metrics = GenerationMetrics()
+    text = await client.generate(
+        model="m", prompt="tarea", system="sys", context="ctx", session="sp1", metrics=metrics
+    )
+    assert text == "ok"
+    path, body = calls[0]
+    assert path == "/api/generate"
+    assert body["system"] == "sys"
+    assert body["prompt"] == "ctx\ntarea"
+    assert "messages" not in body
+    assert metrics.prefix_reused is None
+    await client.close()
+
+
+def test_sessions_expire_and_evict(monkeypatch):
+    store = PromptSessionStore()
+    monkeypatch.setattr(settings, "ai_prompt_session_max", 2)
+    a = store.get("a", "m")
+    store.get("b", "m")
+    store.get("c", "m")
+    assert len(store) == 2
+    assert store.get("a", "m") is not a
+    assert store.evictions >= 1
+
+    monkeypatch.setattr(settings, "ai_prompt_session_ttl", -1)
+    assert store.stats()["sessions"] == 0
+
+
+def test_reuse_requires_same_node():
+    session = prompt_sessions.get("sp-node", "m")
+    prompt_sessions.observe(session, "http://a", "prefijo común y tarea", {})
+    assert session.expected_reuse("http://a", "prefijo común y otra") > 0
+    assert session.expected_reuse("http://b", "prefijo común y otra") == 0
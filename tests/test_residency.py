@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.settings import settings
+from app.utils.ollama_client import OllamaClient
+from app.utils.residency import ModelResidency, keep_alive_seconds
+
+
+def loading_client(calls: list, delay: float = 0.0) -> OllamaClient:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(json.loads(request.content))
+        await asyncio.sleep(delay)
+        # 2.5 s de carga en frío, en nanosegundos como Ollama
+        return httpx.Response(200, json={"response": "", "done": True, "load_duration": 2_500_000_000})
+
+    return OllamaClient(base_url="http://ollama.test", transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.parametrize(
+    "value,seconds",
+    [("10m", 600), ("1h30m", 5400), ("45s", 45), (120, 120), ("90", 90), (-1, None), ("-1m", None)],
+)
+def test_keep_alive_seconds(value, seconds):
+    assert keep_alive_seconds(value) == seconds
+
+
+@pytest.mark.asyncio
+async def test_preload_loads_once_and_records_load_time():
+    calls = []
+    client = loading_client(calls, delay=0.05)
+    residency = ModelResidency()
+    residency.client = client
+
+    first, second = await asyncio.gather(residency.preload("m"), residency.preload("m"))
+    assert first == second == 2.5
+    assert len(calls) == 1
+    assert "prompt" not in calls[0]
+    assert calls[0]["keep_alive"] == settings.ai_keep_alive_default
+
+    # Sigue dentro de su keep_alive: no se vuelve a cargar
+    assert await residency.preload("m") is None
+    stats = residency.stats()["m"]
+    assert stats["resident"] is True
+    assert stats["cold_loads"] == 1
+    assert stats["last_load_seconds"] == 2.5
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_entering_treatment_preloads_screenwriter_model(monkeypatch):
+    monkeypatch.setattr(settings, "ai_warmup_enabled", True)
+    calls = []
+    client = loading_client(calls)
+    residency = ModelResidency()
+    residency.client = client
+
+    assert residency.preload_for_state("S2") == [settings.ai_text_screenwriter]
+    await asyncio.gather(*residency._tasks)
+    assert [c["model"] for c in calls] == [settings.ai_text_screenwriter]
+    assert calls[0]["keep_alive"] == settings.ai_keep_alive[settings.ai_text_screenwriter]
+    await residency.stop()
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_preload_failure_is_counted_not_raised():
+    def handler(request):
+        return httpx.Response(404, json={"error": "model not found"})
+
+    client = OllamaClient(base_url="http://ollama.test", transport=httpx.MockTransport(handler))
+    residency = ModelResidency()
+    residency.client = client
+    assert await residency.preload("missing") is None
+    assert residency.stats()["missing"]["preload_failures"] == 1
+    await client.close()
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from app.screenplays.router import ScreenplayOut
+from app.settings import settings
+from app.utils.responses import FastJSONResponse
+
+
+@pytest.fixture(autouse=True)
+def validate_responses(monkeypatch):
+    # Valida las respuestas servidas sin response_model contra su esquema
+    monkeypatch.setattr(settings, "api_validate_responses", True)
+
+
+def test_fast_json_response_matches_stdlib():
+    content = {"título": "Ñandú", "n": [1, 2.5, None, True], "nested": {"a": "ü"}}
+    body = FastJSONResponse(content).body
+    assert json.loads(body) == content
+    assert "Ñandú".encode() in body
+
+
+async def test_screenplay_roundtrip_matches_schema(client):
+    project = (await client.post("/projects", json={"name": "Proyecto"})).json()
+    r = await client.post("/screenplays", json={"project_id": project["id"], "title": "Guion"})
+    assert r.status_code == 201
+    sp = r.json()
+
+    scenes = [
+        {"id": f"sc{i}", "header": f"INT. FARO {i}", "content": "Texto ñ", "order": i}
+        for i in range(1, 4)
+    ]
+    r = await client.patch(
+        f"/screenplays/{sp['id']}",
+        json={
+            "scenes": scenes,
+            "characters": [{"id": "c1", "name": "Lucía"}],
+            "turning_points": [{"id": "TP1", "description": "Empieza"}],
+        },
+    )
+    assert r.status_code == 200
+    body = r.json()
+    # Mismo contenido que la serialización completa con ScreenplayOut
+    assert body == ScreenplayOut.model_validate(body).model_dump(mode="json")
+    assert body["scenes"] == scenes
+    assert body["characters"][0]["bio"] is None
+    assert body["turning_points"][0]["title"]
+
+    r = await client.get(f"/screenplays/{sp['id']}")
+    assert r.json() == body
+
+    listed = (await client.get("/projects")).json()
+    assert [p["id"] for p in listed] == [project["id"]]
+    r = await client.delete(f"/projects/{project['id']}")
+    assert r.status_code == 204
+    assert r.content == b""
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.settings import ModelLimit, settings
+from app.utils.scheduler import GenerationScheduler, SchedulerBusy
+
+
+@pytest.fixture
+def limited(monkeypatch):
+    monkeypatch.setattr(
+        settings,
+        "ai_model_limits",
+        {"big": ModelLimit(concurrency=1, max_queue=1, max_wait=0.2)},
+    )
+    return GenerationScheduler()
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_and_queue_depth(limited):
+    first = await limited.acquire("big")
+    waiter = asyncio.create_task(limited.acquire("big"))
+    await asyncio.sleep(0)
+    assert limited.queue_depth("big") == 1
+    assert limited.stats()["big"]["active"] == 1
+
+    first.release()
+    second = await waiter
+    assert limited.queue_depth("big") == 0
+    second.release()
+    assert limited.stats()["big"]["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_fails_fast(limited):
+    first = await limited.acquire("big")
+    waiter = asyncio.create_task(limited.acquire("big"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(SchedulerBusy) as exc:
+        await limited.acquire("big")
+    assert exc.value.reason == "queue full"
+    assert exc.value.retry_after >= 1
+
+    first.release()
+    (await waiter).release()
+
+
+@pytest.mark.asyncio
+async def test_wait_timeout(limited):
+    first = await limited.acquire("big")
+    with pytest.raises(SchedulerBusy) as exc:
+        await limited.acquire("big")
+    assert exc.value.reason == "wait timeout"
+    assert limited.queue_depth("big") == 0
+    first.release()
+
+
+@pytest.mark.asyncio
+async def test_run_ai_maps_busy_to_429(limited, monkeypatch):
+    from app.ai.router import run_ai
+
+    monkeypatch.setattr("app.ai.router.scheduler", limited)
+
+    class FakeClient:
+        async def generate(self, model, prompt, **kwargs):
+            return "ok"
+
+    first = await limited.acquire("big")
+    waiter = asyncio.create_task(limited.acquire("big"))
+    await asyncio.sleep(0)
+    with pytest.raises(HTTPException) as exc:
+        await run_ai("big", "p", client=FakeClient())
+    assert exc.value.status_code == 429
+    assert int(exc.value.headers["Retry-After"]) >= 1
+
+    first.release()
+    (await waiter).release()
+    text, _ = await run_ai("big", "p", client=FakeClient())
+    assert text == "ok"
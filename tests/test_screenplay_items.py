@@ -0,0 +1,177 @@
+import pytest
+from sqlalchemy import event
+
+from app.settings import settings
+
+
+@pytest.fixture(autouse=True)
+def validate_responses(monkeypatch):
+    monkeypatch.setattr(settings, "api_validate_responses", True)
+
+
+async def new_screenplay(client) -> dict:
+    project = (await client.post("/projects", json={"name": "Proyecto"})).json()
+    r = await client.post("/screenplays", json={"project_id": project["id"], "title": "Guion"})
+    return r.json()
+
+
+def scene(i: int, content: str = "Texto") -> dict:
+    return {"id": f"sc{i}", "header": f"INT. FARO {i}", "content": content, "order": i}
+
+
+async def test_item_crud(client):
+    sp = await new_screenplay(client)
+    base = f"/screenplays/{sp['id']}"
+
+    for i in (1, 2, 3):
+        r = await client.post(f"{base}/scenes", json=scene(i))
+        assert r.status_code == 201
+        assert r.json() == scene(i)
+    assert (await client.post(f"{base}/scenes", json=scene(2))).status_code == 409
+    long_id = {**scene(4), "id": "x" * 101}
+    assert (await client.post(f"{base}/scenes", json=long_id)).status_code == 422
+
+    r = await client.patch(f"{base}/scenes/sc2", json={"content": "Otra cosa"})
+    assert r.json() == scene(2, "Otra cosa")
+    assert (await client.delete(f"{base}/scenes/sc1")).status_code == 204
+    assert (await client.delete(f"{base}/scenes/sc1")).status_code == 404
+    assert (await client.patch(f"{base}/scenes/nope", json={"order": 1})).status_code == 404
+
+    r = await client.post(f"{base}/characters", json={"id": "c1", "name": "Lucía"})
+    assert r.status_code == 201
+    r = await client.patch(f"{base}/characters/c1", json={"bio": "Farera"})
+    assert r.json()["bio"] == "Farera"
+
+    body = (await client.get(base)).json()
+    assert body["scenes"] == [scene(2, "Otra cosa"), scene(3)]
+    assert body["characters"] == [
+        {"id": "c1", "name": "Lucía", "bio": "Farera", "goal": None, "conflict": None, "arc": None}
+    ]
+    assert body["updated_at"] >= sp["updated_at"]
+
+    assert (await client.post("/screenplays/nope/scenes", json=scene(1))).status_code == 404
+
+
+async def test_list_patch_only_writes_changed_rows(client, engine):
+    sp = await new_screenplay(client)
+    base = f"/screenplays/{sp['id']}"
+    scenes = [scene(i) for i in range(1, 51)]
+    assert (await client.patch(base, json={"scenes": scenes})).status_code == 200
+
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0:3])
+
+    scenes[10]["content"] = "Cambiada"
+    r = await client.patch(base, json={"scenes": scenes})
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+    assert r.json()["scenes"] == scenes
+    writes = [s for s in statements if s[0] in ("INSERT", "UPDATE", "DELETE")]
+    assert ["UPDATE", "screenplay_scenes", "SET"] in writes
+    assert len(writes) == 2  # la escena y el updated_at del guion
+
+    # Reordenar y quitar escenas conserva el resto
+    r = await client.patch(base, json={"scenes": [scenes[2], scenes[0]]})
+    assert [s["id"] for s in r.json()["scenes"]] == ["sc3", "sc1"]
+    r = await client.patch(base, json={"scenes": [scene(1), scene(1)]})
+    assert r.status_code == 422
+
+
+async def test_ops_batch(client):
+    sp = await new_screenplay(client)
+    base = f"/screenplays/{sp['id']}"
+    await client.patch(base, json={"scenes": [scene(1), scene(2), scene(3)]})
+
+    r = await client.patch(
+        f"{base}/ops",
+        json={
+            "ops": [
+                {"op": "test", "path": "/scenes/sc2/content", "value": "Texto"},
+                {"op": "replace", "path": "/scenes/sc2/content", "value": "Nueva"},
+                {"op": "add", "path": "/scenes/sc2", "value": scene(9)},
+                {"op": "move", "from": "/scenes/sc3", "path": "/scenes/sc1"},
+                {"op": "remove", "path": "/scenes/sc1"},
+                {"op": "add", "path": "/characters/-", "value": {"id": "c1", "name": "Ana"}},
+                {"op": "replace", "path": "/characters/c1", "value": {"name": "Lucía"}},
+            ]
+        },
+    )
+    assert r.status_code == 200, r.text
+    results = r.json()["results"]
+    assert results[1]["value"] == {"id": "sc2", "content": "Nueva"}
+    assert results[2] == {"op": "add", "path": "/scenes/sc9", "value": scene(9)}
+    assert results[6]["value"]["name"] == "Lucía"
+
+    body = (await client.get(base)).json()
+    assert [s["id"] for s in body["scenes"]] == ["sc3", "sc9", "sc2"]
+    assert body["scenes"][2]["content"] == "Nueva"
+    assert body["characters"][0]["name"] == "Lucía"
+    assert body["updated_at"] == r.json()["updated_at"]
+
+    # Todo o nada: un test que falla deshace el replace anterior
+    r = await client.patch(
+        f"{base}/ops",
+        json={
+            "ops": [
+                {"op": "replace", "path": "/scenes/sc2/content", "value": "Perdida"},
+                {"op": "test", "path": "/scenes/sc2/content", "value": "Texto"},
+            ]
+        },
+    )
+    assert r.status_code == 409
+    assert r.json()["detail"]["value"] == {"content": "Perdida"}
+    assert (await client.get(base)).json()["scenes"][2]["content"] == "Nueva"
+
+    for op in (
+        {"op": "replace", "path": "/scenes/sc2/id", "value": "x"},
+        {"op": "replace", "path": "/scenes/sc2/order", "value": "uno"},
+        {"op": "remove", "path": "/turning_points/TP1"},
+        {"op": "move", "path": "/scenes/-"},
+    ):
+        assert (await client.patch(f"{base}/ops", json={"ops": [op]})).status_code == 422
+    r = await client.patch(f"{base}/ops", json={"ops": [{"op": "remove", "path": "/scenes/nope"}]})
+    assert r.status_code == 404
+
+
+async def test_sparse_fieldsets(client, engine):
+    sp = await new_screenplay(client)
+    base = f"/screenplays/{sp['id']}"
+    await client.patch(
+        base,
+        json={"synopsis": "Larga", "treatment": "Larguísimo", "scenes": [scene(1), scene(2)]},
+    )
+
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    r = await client.get(base, params={"fields": "title,state", "include": "scene_headers"})
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+    assert r.json() == {
+        "id": sp["id"],
+        "title": "Guion",
+        "state": "S1",
+        "scene_headers": [
+            {"id": "sc1", "header": "INT. FARO 1", "order": 1},
+            {"id": "sc2", "header": "INT. FARO 2", "order": 2},
+        ],
+    }
+    # Ni el texto largo del guion ni el contenido de las escenas salen de la BD
+    sql = " ".join(statements)
+    assert "synopsis" not in sql and "treatment" not in sql and "content" not in sql
+
+    r = await client.get(base, params={"fields": "scenes,updated_at"})
+    assert r.json()["scenes"] == [scene(1), scene(2)]
+    assert set(r.json()) == {"id", "scenes", "updated_at"}
+
+    r = await client.get(base, params={"include": "scene_headers"})
+    assert set(r.json()) == {"id", "scene_headers"}
+    assert all("content" not in s for s in r.json()["scene_headers"])
+    assert (await client.get(base, params={"fields": "title,nope"})).status_code == 422
+    assert (await client.get(base, params={"fields": ""})).status_code == 422
+    assert (await client.get(base, params={"fields": " , "})).status_code == 422
+    assert (await client.get(base, params={"include": "scenes"})).status_code == 422
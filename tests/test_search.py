@@ -0,0 +1,117 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.db.models import (
+    Project,
+    Screenplay,
+    ScreenplayCharacter,
+    ScreenplayScene,
+    User,
+)
+from app.search.index import SearchIndex
+from app.settings import settings
+
+VOCAB = ["playa", "noche", "pistola", "boda", "hospital", "lluvia"]
+
+
+class FakeEmbedder:
+    """Un eje por palabra del vocabulario."""
+
+    def __init__(self):
+        self.texts: list[str] = []
+
+    async def embed(self, model, input):
+        texts = [input] if isinstance(input, str) else input
+        self.texts.extend(texts)
+        return [[float(t.lower().count(w)) + 0.01 for w in VOCAB] for t in texts]
+
+
+@pytest.fixture
+def index(session_factory, monkeypatch):
+    idx = SearchIndex()
+    idx.start(session_factory, FakeEmbedder())
+    monkeypatch.setattr("app.search.router.search_index", idx)
+    monkeypatch.setattr(settings, "search_enabled", True)
+    monkeypatch.setattr(settings, "search_scan_batch", 2)
+    return idx
+
+
+async def make_screenplay(factory, email, scenes, characters=()):
+    async with factory() as s:
+        user = User(email=email, password_hash="x")
+        s.add(user)
+        await s.commit()
+        project = Project(name="P", owner_id=user.id)
+        s.add(project)
+        await s.commit()
+        sp = Screenplay(
+            project_id=project.id,
+            owner_id=user.id,
+            title=f"Guion de {email}",
+            scenes=[
+                ScreenplayScene(id=f"s{i}", position=i, header=h, content=c, order=i)
+                for i, (h, c) in enumerate(scenes, start=1)
+            ],
+            characters=[
+                ScreenplayCharacter(position=i, **ch) for i, ch in enumerate(characters)
+            ],
+            locations=[],
+        )
+        s.add(sp)
+        await s.commit()
+        return user, sp
+
+
+@pytest.mark.asyncio
+async def test_reindex_is_incremental(session_factory, index):
+    _, sp = await make_screenplay(
+        session_factory, "a@example.com", [("EXT. PLAYA - NOCHE", "Llueve."), ("INT. HOSPITAL", "Pitidos.")]
+    )
+    assert await index.reindex(sp.id) == 2
+    assert await index.reindex(sp.id) == 0
+
+    async with session_factory() as s:
+        await s.delete(await s.get(ScreenplayScene, {"screenplay_id": sp.id, "id": "s1"}))
+        scene = await s.get(ScreenplayScene, {"screenplay_id": sp.id, "id": "s2"})
+        scene.order = 1
+        s.add(
+            ScreenplayScene(
+                screenplay_id=sp.id,
+                id="s3",
+                position=3,
+                header="INT. IGLESIA",
+                content="Una boda.",
+                order=2,
+            )
+        )
+        await s.commit()
+    assert await index.reindex(sp.id) == 1
+    assert index.client.texts[-1] == "INT. IGLESIA\nUna boda."
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_items_and_isolates_users(session_factory, index, client):
+    user, sp = await make_screenplay(
+        session_factory,
+        "a@example.com",
+        [("EXT. PLAYA - NOCHE", "Olas."), ("INT. HOSPITAL", "Pitidos."), ("INT. IGLESIA", "Boda.")],
+        characters=[{"id": "c1", "name": "Ana", "bio": "Lleva una pistola."}],
+    )
+    _, other = await make_screenplay(session_factory, "b@example.com", [("EXT. PLAYA", "Boda en la playa.")])
+    await index.reindex(sp.id)
+    await index.reindex(other.id)
+
+    async with session_factory() as s:
+        hits = await index.search(s, user.id, "boda", k=2)
+    assert [h.screenplay_id for h in hits] == [sp.id, sp.id]
+    assert (hits[0].kind, hits[0].item_id, hits[0].position) == ("scene", "s3", 3)
+    assert hits[0].score >= hits[1].score
+
+    client.user = user
+    resp = await client.get("/search", params={"q": "pistola", "kind": "character"})
+    assert resp.status_code == 200
+    data = resp.json()["hits"]
+    assert data[0]["label"] == "Ana"
+    assert data[0]["screenplay_title"] == "Guion de a@example.com"
+    assert all(h["screenplay_id"] == sp.id for h in data)
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from app.utils.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_identical_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "result"
+
+    first = asyncio.create_task(flight.do("k", work))
+    second = asyncio.create_task(flight.do("k", work))
+    await asyncio.sleep(0)
+    assert flight.in_flight() == 1
+    release.set()
+
+    assert await first == ("result", False)
+    assert await second == ("result", True)
+    assert calls == 1
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_others():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def work():
+        await release.wait()
+        return 42
+
+    leader = asyncio.create_task(flight.do("k", work))
+    follower = asyncio.create_task(flight.do("k", work))
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    assert await follower == (42, True)
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+
+    async def boom():
+        await asyncio.sleep(0)
+        raise ValueError("nope")
+
+    results = await asyncio.gather(
+        flight.do("k", boom), flight.do("k", boom), return_exceptions=True
+    )
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_run_ai_marks_shared_results(monkeypatch):
+    from app.ai.router import run_ai
+    from app.settings import settings
+
+    monkeypatch.setattr(settings, "ai_singleflight_enabled", True)
+
+    release = asyncio.Event()
+
+    class SlowClient:
+        calls = 0
+
+        async def generate(self, model, prompt, **kwargs):
+            SlowClient.calls += 1
+            await release.wait()
+            return "text"
+
+    client = SlowClient()
+    a = asyncio.create_task(run_ai("m", "same prompt", client=client))
+    b = asyncio.create_task(run_ai("m", "same prompt", client=client))
+    await asyncio.sleep(0.01)
+    release.set()
+    (_, log_a), (_, log_b) = await asyncio.gather(a, b)
+    assert SlowClient.calls == 1
+    assert sorted([log_a.shared, log_b.shared]) == [False, True]